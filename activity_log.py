@@ -0,0 +1,221 @@
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+
+import mysql.connector
+import db_pool
+from config import ACTIVITY_LOG_CONFIG
+
+# Activity events (reservation_created, reservation_cancelled, ...) used to be written by
+# the reservation triggers inside every booking transaction. They are now buffered here
+# and written in the background with multi-row INSERTs, outside any booking transaction.
+# activity_log is partitioned by month (RANGE COLUMNS on created_at): maintain() adds
+# upcoming monthly partitions, rolls old months up into activity_daily and drops them.
+
+
+class ActivityLogger:
+    """Buffered, non-blocking writer for activity_log.
+
+    log() only appends to an in-memory buffer. A background thread flushes the
+    buffer when it holds `batch_size` events or every `flush_interval` seconds.
+    If MySQL is unavailable, events are kept and retried; past `max_buffer` the
+    oldest are dropped (and counted) rather than blocking requests.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=1.0, max_buffer=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._buffer = deque()
+        self._writer = None
+        self._stats = {'logged': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'flush_errors': 0,
+                       'last_flush_ms': 0.0}
+
+    def log(self, user_id, activity_type, entity_id=None, details=None):
+        if self._writer is None:
+            self._start()
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self._stats['dropped'] += 1
+            self._buffer.append((user_id, activity_type, entity_id, details, datetime.now()))
+            self._stats['logged'] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    # Write everything buffered so far; returns the number of events written
+    def flush(self):
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    return written
+                if not self._write(batch):
+                    with self._lock:
+                        # Put the batch back in front, keeping the newest events if over the cap
+                        self._buffer.extendleft(reversed(batch))
+                        while len(self._buffer) > self.max_buffer:
+                            self._buffer.popleft()
+                            self._stats['dropped'] += 1
+                    return written
+                written += len(batch)
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            conn = db_pool.get_connection()
+        except mysql.connector.Error as e:
+            print(f"Activity log error: {e}")
+            self._count('flush_errors')
+            return False
+        cursor = conn.cursor()
+        try:
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+            cursor.execute(f"""
+                INSERT INTO activity_log (user_id, activity_type, entity_id, details, created_at)
+                VALUES {placeholders}
+            """, tuple(value for event in batch for value in event))
+            conn.commit()
+        except mysql.connector.Error as e:
+            print(f"Activity log error: {e}")
+            conn.rollback()
+            self._count('flush_errors')
+            return False
+        finally:
+            cursor.close()
+            conn.close()
+        with self._lock:
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _start(self):
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name='activity-log', daemon=True)
+            self._writer.start()
+        atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['buffered'] = len(self._buffer)
+        return stats
+
+
+logger = ActivityLogger(ACTIVITY_LOG_CONFIG['batch_size'], ACTIVITY_LOG_CONFIG['flush_interval'],
+                        ACTIVITY_LOG_CONFIG['max_buffer'])
+
+
+def log(user_id, activity_type, entity_id=None, details=None):
+    logger.log(user_id, activity_type, entity_id, details)
+
+
+# --- partition maintenance / retention ---------------------------------------------
+
+def _month_start(day, offset=0):
+    month = day.year * 12 + day.month - 1 + offset
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def _partitions(cursor):
+    # [(name, upper bound as date or None for MAXVALUE)] in partition order
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'activity_log' AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = []
+    for name, description in cursor.fetchall():
+        bound = None if description == 'MAXVALUE' else datetime.strptime(description.strip("'")[:10], '%Y-%m-%d').date()
+        partitions.append((name, bound))
+    return partitions
+
+
+# Split the catch-all partition so every month up to `months_ahead` from now has its own
+def ensure_partitions(months_ahead=None, today=None):
+    months_ahead = ACTIVITY_LOG_CONFIG['months_ahead'] if months_ahead is None else months_ahead
+    today = today or date.today()
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        partitions = _partitions(cursor)
+        bounds = [bound for _, bound in partitions if bound]
+        last = max(bounds) if bounds else _month_start(today)
+        new = []
+        while last <= _month_start(today, months_ahead):
+            upper = _month_start(last, 1)
+            new.append(f"PARTITION p{last:%Y%m} VALUES LESS THAN ('{upper:%Y-%m-%d}')")
+            last = upper
+        if new:
+            cursor.execute(f"""
+                ALTER TABLE activity_log REORGANIZE PARTITION pmax INTO (
+                    {', '.join(new)}, PARTITION pmax VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+        return len(new)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# Roll months older than `retention_months` up into activity_daily, then drop their partitions.
+# Re-running is safe: a day's count is recomputed from the rows still present.
+def rollup_and_prune(retention_months=None, today=None):
+    retention_months = ACTIVITY_LOG_CONFIG['retention_months'] if retention_months is None else retention_months
+    cutoff = _month_start(today or date.today(), -retention_months)
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO activity_daily (activity_date, activity_type, event_count)
+            SELECT DATE(created_at), activity_type, COUNT(*)
+            FROM activity_log
+            WHERE created_at < %s
+            GROUP BY DATE(created_at), activity_type
+            ON DUPLICATE KEY UPDATE event_count = VALUES(event_count)
+        """, (cutoff,))
+        conn.commit()
+
+        expired = [name for name, bound in _partitions(cursor) if bound and bound <= cutoff]
+        if expired:
+            cursor.execute(f"ALTER TABLE activity_log DROP PARTITION {', '.join(expired)}")
+        return expired
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def maintain():
+    created = ensure_partitions()
+    dropped = rollup_and_prune()
+    return created, dropped
+
+
+# Run the monthly maintenance if the script is executed directly (e.g. daily from cron)
+if __name__ == "__main__":
+    created, dropped = maintain()
+    print(f"activity_log: {created} partitions added, {len(dropped)} dropped {dropped}")
@@ -1,9 +1,28 @@
-
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, session, flash
 import mysql.connector
 from dotenv import load_dotenv
 import os
-from osm_api import search_restaurants
+import csv
+import io
+import json
+import base64
+from decimal import Decimal, InvalidOperation
+from datetime import date, datetime, timedelta
+from osm_api import search_restaurants, cache_stats as osm_cache_stats
+import db_pool
+import occupancy
+import booking
+import booking_queue
+import activity_log
+import stats_cache
+import read_cache
+import session_store
+import geo_index
+from scheduler import scheduler
+from search_index import search_restaurants_and_menus
+from database import (save_osm_restaurants, osm_restaurant_key, get_slot_availability, list_restaurants,
+                      get_restaurant_reviews, get_review_summary, export_reviews)
+from config import OCCUPANCY_CONFIG, RESTAURANT_LIST_CONFIG
 from auth import auth_bp  # Ensure 'auth.py' is inside a folder called 'auth' or root
 
 # Load environment variables from .env
@@ -13,56 +32,33 @@ load_dotenv()
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = os.getenv('SECRET_KEY', 'fallback_secret_key')  # Secure load
 
+# Server-side sessions when SESSION_BACKEND is memory or sqlite
+if session_store.session_interface:
+    app.session_interface = session_store.session_interface
+
 # Register Blueprint
 app.register_blueprint(auth_bp)
 
-# DB Connection
+# Load the in-process occupancy engine and start its DB reconciliation thread,
+# plus the geo index's sync thread
+@app.before_first_request
+def start_occupancy_engine():
+    occupancy.start()
+    geo_index.start()
+    if booking_queue.queue:
+        booking_queue.queue.start()  # replays reservations queued before a restart
+
+# DB Connection (pooled, see db_pool.py)
 def get_db_connection():
     try:
-        return mysql.connector.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
-            user=os.getenv('DB_USER', 'root'),
-            password=os.getenv('DB_PASSWORD', 'archi@2245'),
-            database=os.getenv('DB_NAME', 'restaurant_db')
-        )
+        return db_pool.get_connection()
     except mysql.connector.Error as e:
         print(f"DB Connection Error: {e}")
         return None
 
 # Save OSM restaurant to DB
 def save_osm_restaurant_to_db(restaurant):
-    conn = get_db_connection()
-    if not conn:
-        return None
-    cursor = conn.cursor(dictionary=True)
-
-    # Check if already exists
-    cursor.execute("""
-        SELECT restaurant_id FROM restaurants 
-        WHERE name = %s AND location = %s AND source = 'osm'
-    """, (restaurant['name'], f"Lat: {restaurant['lat']}, Lon: {restaurant['lon']}"))
-    
-    existing = cursor.fetchone()
-    if existing:
-        cursor.close()
-        conn.close()
-        return existing['restaurant_id']
-    
-    # Insert new OSM restaurant
-    cursor.execute("""
-        INSERT INTO restaurants (name, location, seating_capacity, current_occupancy, menu, source)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """, (
-        restaurant['name'],
-        f"Lat: {restaurant['lat']}, Lon: {restaurant['lon']}",
-        50, 0,
-        "Menu not available", "osm"
-    ))
-    restaurant_id = cursor.lastrowid
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return restaurant_id
+    return save_osm_restaurants([restaurant]).get(osm_restaurant_key(restaurant))
 
 # Home Route
 @app.route('/')
@@ -80,19 +76,22 @@ def show_restaurants():
     cursor.execute("SELECT * FROM restaurants ORDER BY current_occupancy DESC LIMIT 20")
 
     db_restaurants = cursor.fetchall()
+    # Give the connection back before the (slow) OSM lookup
+    cursor.close()
+    conn.close()
 
     city = request.args.get('city', 'Pune')
     osm_results = search_restaurants(city)[:10]
-    
+
+    # Resolve/insert all OSM results in one batch
+    osm_ids = save_osm_restaurants(osm_results, city)
     osm_restaurants = []
     for r in osm_results:
-        restaurant_id = save_osm_restaurant_to_db(r)
+        restaurant_id = osm_ids.get(osm_restaurant_key(r))
         if restaurant_id:
             r['restaurant_id'] = restaurant_id
             osm_restaurants.append(r)
 
-    cursor.close()
-    conn.close()
     return render_template("restaurants.html", db_restaurants=db_restaurants, osm_restaurants=osm_restaurants)
 
 # Book table
@@ -103,49 +102,62 @@ def book_table(restaurant_id):
         return redirect(url_for('auth.login'))
 
     if request.method == 'POST':
-        num_people = int(request.form['num_people'])
-        user_id = session['user_id']
-        conn = get_db_connection()
-        if not conn:
-            flash("Database connection error.", "danger")
-            return redirect(url_for('show_restaurants'))
-
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT seating_capacity, current_occupancy FROM restaurants WHERE restaurant_id = %s", (restaurant_id,))
-        restaurant = cursor.fetchone()
-
-        if not restaurant:
-            flash("Restaurant not found", "danger")
-        elif (restaurant['current_occupancy'] + num_people) <= restaurant['seating_capacity']:
-            cursor.execute("""
-                INSERT INTO reservations (user_id, restaurant_id, num_people, reservation_time, status)
-                VALUES (%s, %s, %s, NOW(), 'Confirmed')
-            """, (user_id, restaurant_id, num_people))
-            cursor.execute("""
-                UPDATE restaurants
-                SET current_occupancy = current_occupancy + %s
-                WHERE restaurant_id = %s
-            """, (num_people, restaurant_id))
-            conn.commit()
+        try:
+            num_people = int(request.form['num_people'])
+        except (KeyError, ValueError):
+            num_people = 0
+        if num_people < 1:
+            flash("Please enter a valid number of people.", "danger")
+            return redirect(url_for('book_table', restaurant_id=restaurant_id))
+
+        status, _ = booking.reserve_seats(session['user_id'], restaurant_id, num_people)
+        if status == booking.CONFIRMED:
             flash("Reservation confirmed!", "success")
-        else:
+        elif status == booking.FULL:
             flash("Not enough seats available.", "danger")
-
-        cursor.close()
-        conn.close()
+        elif status == booking.NOT_FOUND:
+            flash("Restaurant not found", "danger")
+        else:
+            flash("Database connection error.", "danger")
         return redirect(url_for('show_restaurants'))
 
     return render_template('booking.html', restaurant_id=restaurant_id)
 
-# Suggested least crowded restaurant
+# Cancel a reservation
+@app.route('/reservations/<int:reservation_id>/cancel', methods=['POST'])
+def cancel_reservation(reservation_id):
+    if 'user_id' not in session:
+        flash("Login required", "warning")
+        return redirect(url_for('auth.login'))
+
+    status, _ = booking.cancel_reservation(session['user_id'], reservation_id)
+    if status == booking.CANCELLED:
+        flash("Reservation cancelled.", "info")
+    elif status == booking.NOT_FOUND:
+        flash("Reservation not found", "danger")
+    else:
+        flash("Database connection error.", "danger")
+    return redirect(url_for('show_restaurants'))
+
+# Suggested restaurant, spread across restaurants by the suggestion scheduler.
+# ?strategy= picks least_rate, power_of_two, weighted_free or predicted_load.
 @app.route('/suggested-restaurant')
 def suggested_restaurant():
+    strategy = request.args.get('strategy')
+    if strategy and strategy not in scheduler.strategies:
+        return jsonify({"error": f"Unknown strategy, use one of: {', '.join(scheduler.strategies)}"}), 400
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "DB error"}), 500
 
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM restaurants ORDER BY current_occupancy ASC LIMIT 1")
+    restaurant_id = scheduler.suggest(strategy)
+    if restaurant_id is not None:
+        cursor.execute("SELECT * FROM restaurants WHERE restaurant_id = %s", (restaurant_id,))
+    else:
+        # Engine not loaded yet
+        cursor.execute("SELECT * FROM restaurants ORDER BY occupancy_rate ASC LIMIT 1")
     restaurant = cursor.fetchone()
     cursor.close()
     conn.close()
@@ -161,55 +173,8 @@ def restaurant_stats():
         flash("Please login to view stats", "warning")
         return redirect(url_for('auth.login'))
 
-    conn = get_db_connection()
-    if not conn:
-        return render_template("stats.html", stats={})
-
-    cursor = conn.cursor(dictionary=True)
-    stats = {}
-
-    cursor.execute("""
-        SELECT r.name, COUNT(*) as booking_count
-        FROM reservations res
-        JOIN restaurants r ON res.restaurant_id = r.restaurant_id
-        GROUP BY res.restaurant_id
-        ORDER BY booking_count DESC
-        LIMIT 5
-    """)
-    stats['top_restaurants'] = cursor.fetchall()
-
-    cursor.execute("""
-        SELECT 
-            AVG(current_occupancy) as avg_occupancy,
-            MAX(current_occupancy) as max_occupancy,
-            SUM(current_occupancy) as total_customers,
-            AVG(current_occupancy / seating_capacity * 100) as avg_occupancy_percent
-        FROM restaurants
-    """)
-    stats['occupancy'] = cursor.fetchone()
-
-    cursor.execute("""
-        SELECT 
-            DAYNAME(reservation_time) as day_name,
-            COUNT(*) as booking_count
-        FROM reservations
-        GROUP BY DAYNAME(reservation_time)
-        ORDER BY FIELD(day_name, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
-    """)
-    stats['booking_by_day'] = cursor.fetchall()
-
-    cursor.execute("""
-        SELECT 
-            COALESCE(source, 'local') as source, 
-            COUNT(*) as restaurant_count,
-            SUM(current_occupancy) as total_customers
-        FROM restaurants
-        GROUP BY source
-    """)
-    stats['source_stats'] = cursor.fetchall()
-
-    cursor.close()
-    conn.close()
+    # ?refresh=1 bypasses the cache
+    stats = stats_cache.get_stats(force=request.args.get('refresh') == '1')
     return render_template("stats.html", stats=stats)
 
 # 404 error handler
@@ -217,235 +182,306 @@ def restaurant_stats():
 def page_not_found(e):
     return render_template('404.html'), 404
 
+# Occupancy for polling clients.
+#   ids=1,2,3       only these restaurants
+#   since=<version> only restaurants changed after that version (falls back to everything if too old)
+# Responses carry the current version as ETag; If-None-Match with it returns 304.
 @app.route('/api/restaurant-occupancy')
 def api_restaurant_occupancy():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT restaurant_id, current_occupancy FROM restaurants")
-    data = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(data)
-
-
-# Entry point
-if __name__ == '__main__':
-    app.run(debug=True)
-
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash
-import mysql.connector
-from dotenv import load_dotenv
-import os
-from osm_api import search_restaurants
-from auth import auth_bp  # Make sure auth.py is inside a folder called 'auth' or root
-
-# Load environment variables from .env
-load_dotenv()
-
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = 'archi12345'  # Replace with a secure secret key
-
-# Register Blueprint
-app.register_blueprint(auth_bp)
-
-# DB Connection
-def get_db_connection():
     try:
-        db_config = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'user': os.getenv('DB_USER', 'root'),
-            'password': os.getenv('DB_PASSWORD', 'archi@2245'),
-            'database': os.getenv('DB_NAME', 'restaurant_db')
-        }
-        return mysql.connector.connect(**db_config)
-    except mysql.connector.Error as e:
-        print(f"DB Connection Error: {e}")
-        return None
+        ids = [int(i) for i in request.args['ids'].split(',') if i] if request.args.get('ids') else None
+    except ValueError:
+        return jsonify({"error": "ids must be a comma separated list of restaurant ids"}), 400
+
+    if occupancy.engine.loaded:
+        feed = occupancy.engine.feed
+        etag = feed.token(feed.version)
+        if request.if_none_match.contains(etag):
+            return '', 304, {'ETag': f'"{etag}"'}
+
+        if 'since' not in request.args:
+            response = jsonify(occupancy.engine.snapshot(ids))
+        else:
+            since = feed.parse_token(request.args['since'])
+            version, changes = feed.changes_since(since) if since is not None else (None, None)
+            if changes is None:
+                version, rows = occupancy.engine.snapshot_with_version(ids)
+                payload = {'version': feed.token(version), 'full': True, 'restaurants': rows}
+            else:
+                if ids is not None:
+                    wanted = set(ids)
+                    changes = [c for c in changes if c['restaurant_id'] in wanted]
+                payload = {'version': feed.token(version), 'full': False, 'restaurants': changes}
+            etag = payload['version']
+            response = jsonify(payload)
+        response.set_etag(etag)
+        return response
 
-# Save OSM restaurant to DB
-def save_osm_restaurant_to_db(restaurant):
     conn = get_db_connection()
     if not conn:
-        return None
+        return jsonify({"error": "DB error"}), 500
     cursor = conn.cursor(dictionary=True)
-    
-    # Check existence
-    cursor.execute("""
-        SELECT restaurant_id FROM restaurants 
-        WHERE name = %s AND location = %s AND source = 'osm'
-    """, (restaurant['name'], f"Lat: {restaurant['lat']}, Lon: {restaurant['lon']}"))
-    
-    existing = cursor.fetchone()
-    if existing:
-        cursor.close()
-        conn.close()
-        return existing['restaurant_id']
-    
-    # Insert if not exists
-    cursor.execute("""
-        INSERT INTO restaurants (name, location, seating_capacity, current_occupancy, menu, source)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """, (
-        restaurant['name'],
-        f"Lat: {restaurant['lat']}, Lon: {restaurant['lon']}",
-        50, 0,
-        "Menu not available", "osm"
-    ))
-    restaurant_id = cursor.lastrowid
-    conn.commit()
+    if ids:
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"SELECT restaurant_id, current_occupancy FROM restaurants WHERE restaurant_id IN ({placeholders})",
+                       tuple(ids))
+    else:
+        cursor.execute("SELECT restaurant_id, current_occupancy FROM restaurants")
+    data = cursor.fetchall()
     cursor.close()
     conn.close()
-    return restaurant_id
-
-# Home Route
-@app.route('/')
-def home():
-    return render_template("index.html")
+    return jsonify(data)
 
-# Show restaurants route
-@app.route('/restaurants')
-def show_restaurants():
-    conn = get_db_connection()
-    if not conn:
-        return render_template("restaurants.html", db_restaurants=[], osm_restaurants=[])
-    
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM restaurants WHERE source = 'local' OR source IS NULL LIMIT 10")
-    db_restaurants = cursor.fetchall()
-    
-    city = request.args.get('city', 'Pune')
-    osm_results = search_restaurants(city)[:10]
-    
-    osm_restaurants = []
-    for r in osm_results:
-        restaurant_id = save_osm_restaurant_to_db(r)
-        if restaurant_id:
-            r['restaurant_id'] = restaurant_id
-            osm_restaurants.append(r)
-    
-    cursor.close()
-    conn.close()
-    return render_template("restaurants.html", db_restaurants=db_restaurants, osm_restaurants=osm_restaurants)
+# Server-Sent Events stream of occupancy changes: a snapshot on connect, then only deltas.
+# All clients read the same in-process change feed, so the DB load does not grow with them.
+@app.route('/api/occupancy/stream')
+def api_occupancy_stream():
+    occupancy.engine.ensure_loaded()
+    feed = occupancy.engine.feed
+    last_event_id = request.headers.get('Last-Event-ID')
+    keepalive = OCCUPANCY_CONFIG['stream_keepalive']
+
+    def event(name, version, payload):
+        payload['version'] = feed.token(version)
+        return f"event: {name}\nid: {payload['version']}\ndata: {json.dumps(payload)}\n\n"
+
+    def events():
+        # Reconnecting browsers send the last version they saw; resume from it if we still can
+        since = feed.parse_token(last_event_id)
+        version, changes = feed.changes_since(since) if since is not None else (None, None)
+        if changes is None:
+            version, rows = occupancy.engine.snapshot_with_version()
+            yield "retry: 3000\n" + event('snapshot', version, {'restaurants': rows})
+        elif changes:
+            yield event('delta', version, {'changes': changes})
+
+        while True:
+            new_version, changes = feed.wait(version, timeout=keepalive)
+            if changes is None:
+                # Fell behind the feed: start over from a fresh snapshot
+                new_version, rows = occupancy.engine.snapshot_with_version()
+                yield event('snapshot', new_version, {'restaurants': rows})
+            elif changes:
+                yield event('delta', new_version, {'changes': changes})
+            else:
+                yield ": keepalive\n\n"
+            version = new_version
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Opaque keyset page cursors: the sort key of the last row of a page
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode('|'.join(str(v) for v in values).encode()).decode()
+
+def decode_cursor(value):
+    return base64.urlsafe_b64decode(value.encode()).decode().split('|')
+
+def json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+# Paginated restaurant listing, least occupied first.
+# Filters: category, source, city, vegetarian=1. Pass next_cursor back as ?cursor= for the next page.
+@app.route('/api/restaurants')
+def api_restaurants():
+    try:
+        limit = int(request.args.get('limit', RESTAURANT_LIST_CONFIG['page_size']))
+        category_id = int(request.args['category']) if request.args.get('category') else None
+        after = None
+        if request.args.get('cursor'):
+            rate, restaurant_id = decode_cursor(request.args['cursor'])
+            after = (Decimal(rate), int(restaurant_id))
+    except (ValueError, TypeError, InvalidOperation, UnicodeDecodeError):
+        return jsonify({"error": "limit and category must be numbers and cursor a next_cursor value"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+    limit = min(limit, RESTAURANT_LIST_CONFIG['max_page_size'])
+
+    # One extra row tells us whether there is a next page
+    rows = list_restaurants(category_id=category_id,
+                            source=request.args.get('source'),
+                            city=request.args.get('city'),
+                            vegetarian=request.args.get('vegetarian') in ('1', 'true'),
+                            after=after,
+                            limit=limit + 1)
+    if rows is None:
+        return jsonify({"error": "DB error"}), 500
 
-# Book table
-@app.route('/book/<int:restaurant_id>', methods=['GET', 'POST'])
-def book_table(restaurant_id):
+    def generate():
+        yield '{"restaurants": ['
+        last = None
+        for count, row in enumerate(rows):
+            if count == limit:
+                break
+            yield (',' if last else '') + json.dumps(row, default=json_value)
+            last = row
+        else:
+            last = None  # ran out of rows: no next page
+        next_cursor = encode_cursor(last['occupancy_rate'], last['restaurant_id']) if last else None
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+    response = Response(generate(), mimetype='application/json')
+    response.call_on_close(rows.close)
+    return response
+
+# One page of a restaurant's reviews, newest first, plus the star histogram.
+# Pass next_cursor back as ?cursor= for older reviews.
+@app.route('/api/restaurants/<int:restaurant_id>/reviews')
+def api_restaurant_reviews(restaurant_id):
+    try:
+        limit = int(request.args.get('limit', 20))
+        after = None
+        if request.args.get('cursor'):
+            review_date, review_id = decode_cursor(request.args['cursor'])
+            after = (datetime.fromisoformat(review_date), int(review_id))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return jsonify({"error": "limit must be a number and cursor a next_cursor value"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    limit = min(limit, 100)
+    # One extra row tells us whether there are older reviews
+    reviews = get_restaurant_reviews(restaurant_id, after, limit + 1)
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        last = reviews[-1]
+        next_cursor = encode_cursor(last['review_date'].isoformat(), last['review_id'])
+    return jsonify({
+        'summary': get_review_summary(restaurant_id),
+        'reviews': [dict(r, review_date=r['review_date'].isoformat()) for r in reviews],
+        'next_cursor': next_cursor,
+    })
+
+# CSV dump of reviews, streamed row by row (all restaurants unless ?restaurant_id=)
+@app.route('/api/reviews/export')
+def api_export_reviews():
     if 'user_id' not in session:
-        flash("Login required", "warning")
-        return redirect(url_for('auth.login'))
-
-    if request.method == 'POST':
-        num_people = int(request.form['num_people'])
-        user_id = session['user_id']
-        conn = get_db_connection()
-        if not conn:
-            flash("Database connection error.", "danger")
-            return redirect(url_for('show_restaurants'))
-        
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT seating_capacity, current_occupancy FROM restaurants WHERE restaurant_id = %s", (restaurant_id,))
-        restaurant = cursor.fetchone()
+        return jsonify({"error": "Login required"}), 401
+    try:
+        restaurant_id = int(request.args['restaurant_id']) if request.args.get('restaurant_id') else None
+    except ValueError:
+        return jsonify({"error": "restaurant_id must be a number"}), 400
 
-        if not restaurant:
-            flash("Restaurant not found", "danger")
-        elif (restaurant['current_occupancy'] + num_people) <= restaurant['seating_capacity']:
-            cursor.execute("""
-                INSERT INTO reservations (user_id, restaurant_id, num_people, reservation_time, status)
-                VALUES (%s, %s, %s, NOW(), 'Confirmed')
-            """, (user_id, restaurant_id, num_people))
-            cursor.execute("""
-                UPDATE restaurants
-                SET current_occupancy = current_occupancy + %s
-                WHERE restaurant_id = %s
-            """, (num_people, restaurant_id))
-            conn.commit()
-            flash("Reservation confirmed!", "success")
-        else:
-            flash("Not enough seats available.", "danger")
+    rows = export_reviews(restaurant_id)
+    if rows is None:
+        return jsonify({"error": "DB error"}), 500
 
-        cursor.close()
-        conn.close()
-        return redirect(url_for('show_restaurants'))
+    columns = ['review_id', 'restaurant_id', 'user_id', 'rating', 'review_text', 'review_date']
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            # Flush every few KB rather than per row
+            if buffer.tell() > 8192:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = Response(generate(), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=reviews.csv'})
+    response.call_on_close(rows.close)
+    return response
+
+# Restaurant and menu search with autocomplete on the last word, e.g. /api/search?q=butter chi
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if not query.strip() or limit <= 0:
+        return jsonify({"error": "q is required and limit must be positive"}), 400
 
-    return render_template('booking.html', restaurant_id=restaurant_id)
+    return jsonify({'query': query, 'results': search_restaurants_and_menus(query, min(limit, 50))})
 
-# Suggest least crowded restaurant
-@app.route('/suggested-restaurant')
-def suggested_restaurant():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "DB error"}), 500
+# Nearby least-crowded restaurants (in-process geo index)
+@app.route('/api/restaurants/nearby')
+def api_nearby_restaurants():
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = float(request.args.get('radius', 5))
+        limit = int(request.args.get('limit', 10))
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat and lon are required; radius (km) and limit must be numbers"}), 400
 
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM restaurants ORDER BY current_occupancy ASC LIMIT 1")
-    restaurant = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    
-    if restaurant:
-        return jsonify(restaurant)
-    return jsonify({"error": "No restaurant found"}), 404
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius <= 0 or limit <= 0:
+        return jsonify({"error": "Invalid lat/lon/radius/limit"}), 400
 
-# Statistics and analytics
-@app.route('/stats')
-def restaurant_stats():
-    if 'user_id' not in session:
-        flash("Please login to view stats", "warning")
-        return redirect(url_for('auth.login'))
+    return jsonify(geo_index.nearby_restaurants(lat, lon, min(radius, 50), min(limit, 100)))
 
-    conn = get_db_connection()
-    if not conn:
-        return render_template("stats.html", stats={})
-    
-    cursor = conn.cursor(dictionary=True)
-    stats = {}
-
-    cursor.execute("""
-        SELECT r.name, COUNT(*) as booking_count
-        FROM reservations res
-        JOIN restaurants r ON res.restaurant_id = r.restaurant_id
-        GROUP BY res.restaurant_id
-        ORDER BY booking_count DESC
-        LIMIT 5
-    """)
-    stats['top_restaurants'] = cursor.fetchall()
-
-    cursor.execute("""
-        SELECT 
-            AVG(current_occupancy) as avg_occupancy,
-            MAX(current_occupancy) as max_occupancy,
-            SUM(current_occupancy) as total_customers,
-            AVG(current_occupancy / seating_capacity * 100) as avg_occupancy_percent
-        FROM restaurants
-    """)
-    stats['occupancy'] = cursor.fetchone()
-
-    cursor.execute("""
-        SELECT 
-            DAYNAME(reservation_time) as day_name,
-            COUNT(*) as booking_count
-        FROM reservations
-        GROUP BY DAYNAME(reservation_time)
-        ORDER BY FIELD(day_name, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
-    """)
-    stats['booking_by_day'] = cursor.fetchall()
-
-    cursor.execute("""
-        SELECT 
-            COALESCE(source, 'local') as source, 
-            COUNT(*) as restaurant_count,
-            SUM(current_occupancy) as total_customers
-        FROM restaurants
-        GROUP BY source
-    """)
-    stats['source_stats'] = cursor.fetchall()
+# Slot availability for a date range (default: one week)
+@app.route('/api/availability')
+def api_availability():
+    try:
+        restaurant_id = int(request.args['restaurant_id'])
+        start_date = datetime.strptime(request.args.get('from') or date.today().isoformat(), '%Y-%m-%d').date()
+        end_date = (datetime.strptime(request.args['to'], '%Y-%m-%d').date()
+                    if request.args.get('to') else start_date + timedelta(days=6))
+        party = int(request.args.get('party', 1))
+    except (KeyError, ValueError):
+        return jsonify({"error": "restaurant_id is required; from/to must be YYYY-MM-DD and party a number"}), 400
+
+    if end_date < start_date or (end_date - start_date).days > 31 or party < 1:
+        return jsonify({"error": "Invalid date range (max 31 days) or party size"}), 400
+
+    def fmt_time(value):
+        # TIME columns come back as timedelta
+        if isinstance(value, timedelta):
+            minutes = int(value.total_seconds()) // 60
+            return f"{minutes // 60:02d}:{minutes % 60:02d}"
+        return str(value)
+
+    availability = get_slot_availability(restaurant_id, start_date, end_date, party)
+    return jsonify({
+        'restaurant_id': restaurant_id,
+        'party': party,
+        'dates': {
+            day.isoformat(): [dict(slot, start_time=fmt_time(slot['start_time']), end_time=fmt_time(slot['end_time']))
+                              for slot in slots]
+            for day, slots in availability.items()
+        },
+    })
+
+@app.route('/api/db-pool-stats')
+def api_db_pool_stats():
+    return jsonify(db_pool.pool_stats())
+
+@app.route('/api/osm-cache-stats')
+def api_osm_cache_stats():
+    return jsonify(osm_cache_stats())
+
+@app.route('/api/read-cache-stats')
+def api_read_cache_stats():
+    return jsonify(read_cache.cache.stats())
+
+@app.route('/api/booking-queue-stats')
+def api_booking_queue_stats():
+    if not booking_queue.queue:
+        return jsonify({'enabled': False})
+    return jsonify(booking_queue.queue.stats())
+
+@app.route('/api/activity-log-stats')
+def api_activity_log_stats():
+    return jsonify(activity_log.logger.stats())
+
+@app.route('/api/session-stats')
+def api_session_stats():
+    if not session_store.session_interface:
+        return jsonify({'backend': 'cookie'})
+    return jsonify(session_store.session_interface.stats())
 
-    cursor.close()
-    conn.close()
-    return render_template("stats.html", stats=stats)
 
 # Entry point
 if __name__ == '__main__':
     app.run(debug=True)
-
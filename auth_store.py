@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import mysql.connector
+from mysql.connector import errorcode
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import db_pool
+from config import AUTH_CONFIG
+
+# Outcomes of authenticate / register_user
+OK = 'ok'
+INVALID = 'invalid'
+DUPLICATE = 'duplicate'
+BUSY = 'busy'
+DB_ERROR = 'error'
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a small, bounded thread pool.
+
+    PBKDF2 is CPU-bound (hashlib releases the GIL while it runs), so an unbounded
+    login burst would take every core away from the request threads. At most
+    `workers` hashes run at once and at most `queue` more wait; beyond that, or
+    after `timeout` seconds, callers get HasherBusy instead of piling up.
+    """
+
+    def __init__(self, workers=2, queue=64, timeout=5.0):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auth-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+
+hasher = PasswordHasher(AUTH_CONFIG['hash_workers'], AUTH_CONFIG['hash_queue'], AUTH_CONFIG['hash_timeout'])
+
+
+# Only the columns login needs, through the unique index on users.email.
+# Returns (user_id, name, password_hash) or None; raises mysql.connector.Error.
+def find_user(email):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT user_id, name, password_hash FROM users WHERE email = %s", (email,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# Check an email/password pair. Returns (status, {'user_id', 'name'}).
+def authenticate(email, password):
+    try:
+        user = find_user(email)
+    except mysql.connector.Error as e:
+        print(f"Login error: {e}")
+        return DB_ERROR, None
+    if user is None or not user[2]:
+        return INVALID, None
+
+    try:
+        valid = hasher.verify(user[2], password)
+    except HasherBusy:
+        return BUSY, None
+    if not valid:
+        return INVALID, None
+    return OK, {'user_id': user[0], 'name': user[1]}
+
+
+# Create a user. The unique key on users.email decides duplicates, so two
+# concurrent registrations for one email cannot both succeed.
+# Returns (status, user_id).
+def register_user(name, email, phone, password):
+    try:
+        password_hash = hasher.hash(password)
+    except HasherBusy:
+        return BUSY, None
+
+    try:
+        conn = db_pool.get_connection()
+    except mysql.connector.Error as e:
+        print(f"DB Connection Error: {e}")
+        return DB_ERROR, None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO users (name, email, phone, password_hash)
+            VALUES (%s, %s, %s, %s)
+        """, (name, email, phone, password_hash))
+        user_id = cursor.lastrowid
+        conn.commit()
+    except mysql.connector.Error as e:
+        conn.rollback()
+        if e.errno == errorcode.ER_DUP_ENTRY:
+            return DUPLICATE, None
+        print(f"Registration error: {e}")
+        return DB_ERROR, None
+    finally:
+        cursor.close()
+        conn.close()
+    return OK, user_id
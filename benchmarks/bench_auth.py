@@ -0,0 +1,131 @@
+# Login benchmark: logins per second during a burst, with the original inline
+# check_password_hash vs. auth_store's bounded hashing pool, and how long a
+# cheap concurrent request (pool checkout + SELECT 1) takes meanwhile.
+#
+# Needs a MySQL database with the restaurantbooking.sql schema (configured via .env).
+# Seeds bench users and removes them afterwards.
+#
+#   python -m benchmarks.bench_auth --users 200 --threads 32 --duration 10
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import auth_store
+import db_pool
+
+PASSWORD = 'correct horse battery staple'
+
+
+def seed(num_users, stamp):
+    password_hash = generate_password_hash(PASSWORD)
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO users (name, email, phone, password_hash)
+        VALUES (%s, %s, '0000000000', %s)
+    """, [(f"Bench {i}", f"bench-auth-{stamp}-{i}@example.com", password_hash) for i in range(num_users)])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def cleanup(stamp):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM users WHERE email LIKE %s", (f"bench-auth-{stamp}-%",))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+# The login route before auth_store: dictionary cursor and hashing on the request thread
+def legacy_login(email, password):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT user_id, name, password_hash FROM users WHERE email = %s", (email,))
+    user = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return auth_store.OK if user and check_password_hash(user['password_hash'], password) else auth_store.INVALID
+
+
+def current_login(email, password):
+    return auth_store.authenticate(email, password)[0]
+
+
+def probe(stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        conn = db_pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        conn.close()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def run(login, args, stamp):
+    stop = threading.Event()
+    outcomes = {}
+    lock = threading.Lock()
+    latencies = []
+
+    def worker():
+        rng = random.Random()
+        while not stop.is_set():
+            email = f"bench-auth-{stamp}-{rng.randrange(args.users)}@example.com"
+            status = login(email, PASSWORD)
+            with lock:
+                outcomes[status] = outcomes.get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    threads.append(threading.Thread(target=probe, args=(stop, latencies)))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'logins_per_sec': outcomes.get(auth_store.OK, 0) / args.duration,
+        'busy': outcomes.get(auth_store.BUSY, 0),
+        'errors': sum(count for status, count in outcomes.items() if status not in (auth_store.OK, auth_store.BUSY)),
+        'probe_p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        'probe_p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login benchmark")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32, help="concurrent login requests")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per mode")
+    args = parser.parse_args()
+
+    stamp = time.time_ns()
+    seed(args.users, stamp)
+    try:
+        print(f"{args.threads} concurrent logins, {auth_store.hasher.workers} hash workers")
+        print(f"{'mode':>8} {'logins/s':>9} {'busy':>6} {'errors':>7} {'probe p50 ms':>13} {'probe p99 ms':>13}")
+        for name, login in (('legacy', legacy_login), ('current', current_login)):
+            result = run(login, args, stamp)
+            print(f"{name:>8} {result['logins_per_sec']:>9.1f} {result['busy']:>6} {result['errors']:>7} "
+                  f"{result['probe_p50_ms']:>13.2f} {result['probe_p99_ms']:>13.2f}")
+    finally:
+        cleanup(stamp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# Booking stress benchmark: hammer one restaurant with concurrent bookings and
+# verify it is never overbooked.
+#
+# Needs a MySQL database with the restaurantbooking.sql schema (configured via .env).
+# Creates its own user and restaurant and removes them afterwards.
+#
+#   python -m benchmarks.bench_booking --bookings 500 --threads 50 --capacity 300
+#   python -m benchmarks.bench_booking --write-behind   # confirm in memory, batch the INSERTs
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_pool
+import activity_log
+import booking
+import booking_queue
+import occupancy
+
+
+def setup(capacity):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO users (name, email, phone, password_hash)
+        VALUES ('Bench User', %s, '0000000000', 'x')
+    """, (f"bench-{time.time_ns()}@example.com",))
+    user_id = cursor.lastrowid
+    cursor.execute("""
+        INSERT INTO restaurants (name, location, seating_capacity, current_occupancy, menu, source)
+        VALUES (%s, 'Benchmark', %s, 0, '', 'bench')
+    """, (f"Bench {time.time_ns()}", capacity))
+    restaurant_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return user_id, restaurant_id
+
+
+def verify(restaurant_id):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT seating_capacity, current_occupancy FROM restaurants WHERE restaurant_id = %s",
+                   (restaurant_id,))
+    capacity, current = cursor.fetchone()
+    cursor.execute("""
+        SELECT COALESCE(SUM(num_people), 0) FROM reservations
+        WHERE restaurant_id = %s AND status = 'Confirmed'
+    """, (restaurant_id,))
+    booked = int(cursor.fetchone()[0])
+    cursor.close()
+    conn.close()
+    return capacity, current, booked
+
+
+def cleanup(user_id, restaurant_id):
+    activity_log.logger.flush()
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM activity_log WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM restaurant_booking_stats WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM reservations WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM restaurants WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test")
+    parser.add_argument('--bookings', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--capacity', type=int, default=300)
+    parser.add_argument('--max-party', type=int, default=4)
+    parser.add_argument('--keep', action='store_true', help="don't delete the benchmark rows")
+    parser.add_argument('--write-behind', action='store_true', help="book through the write-behind queue")
+    args = parser.parse_args()
+
+    db_pool.get_pool().size = max(db_pool.get_pool().size, args.threads)
+    user_id, restaurant_id = setup(args.capacity)
+    if args.write_behind:
+        directory = tempfile.mkdtemp()
+        booking_queue.queue = booking_queue.ReservationQueue(os.path.join(directory, 'booking_queue.sqlite3'))
+        occupancy.engine.reconcile()  # pick up the benchmark restaurant
+    outcomes = {}
+    lock = threading.Lock()
+    latencies = []
+
+    def book(_):
+        party = random.randint(1, args.max_party)
+        start = time.perf_counter()
+        status, _ = booking.reserve_seats(user_id, restaurant_id, party)
+        elapsed = time.perf_counter() - start
+        with lock:
+            outcomes[status] = outcomes.get(status, 0) + 1
+            latencies.append(elapsed)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(book, range(args.bookings)))
+        elapsed = time.perf_counter() - start
+
+        if args.write_behind:
+            drain_start = time.perf_counter()
+            booking_queue.queue.drain()
+            stats = booking_queue.queue.stats()
+            print(f"queue drained      : {(time.perf_counter() - drain_start) * 1000:.1f} ms after the burst, "
+                  f"{stats['batches']} batches, max flush lag {stats['max_lag_ms']:.1f} ms")
+
+        capacity, current, booked = verify(restaurant_id)
+        latencies.sort()
+        print(f"bookings attempted : {args.bookings} ({args.threads} threads)")
+        print(f"outcomes           : {outcomes}")
+        print(f"throughput         : {args.bookings / elapsed:.1f} bookings/s")
+        print(f"latency p50 / p99  : {latencies[len(latencies) // 2] * 1000:.1f} ms / "
+              f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+        print(f"capacity           : {capacity}")
+        print(f"current_occupancy  : {current}")
+        print(f"confirmed seats    : {booked}")
+
+        ok = booked <= capacity and current == booked
+        print("RESULT             :", "OK, no overbooking" if ok else "FAILED")
+        return 0 if ok else 1
+    finally:
+        if not args.keep:
+            cleanup(user_id, restaurant_id)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
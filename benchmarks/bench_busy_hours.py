@@ -0,0 +1,173 @@
+# Busy-hours benchmark: the original 7 x 13 query loop vs. the single-query
+# update_busy_hours_prediction, plus the all-restaurants batch mode.
+#
+# Needs a MySQL database with the restaurantbooking.sql schema (configured via .env).
+# Seeds a restaurant with time slots and reservations over the last four weeks and
+# removes them afterwards.
+#
+#   python -m benchmarks.bench_busy_hours --reservations 5000
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_pool
+import database
+
+SLOTS = [(11, 14), (12, 15), (18, 21), (19, 23)]
+
+
+# The original implementation: COUNT + MAX(seating_capacity) + upsert per (day, hour)
+def legacy_update_busy_hours_prediction(restaurant_id):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+
+    for day in range(7):
+        for hour in range(10, 23):
+            four_weeks_ago = datetime.now() - timedelta(days=28)
+
+            cursor.execute("""
+                SELECT COUNT(*) / 4 AS avg_bookings
+                FROM reservations r
+                JOIN time_slots ts ON r.slot_id = ts.slot_id
+                WHERE r.restaurant_id = %s
+                AND DAYOFWEEK(r.reservation_date) = %s
+                AND HOUR(ts.start_time) <= %s AND HOUR(ts.end_time) > %s
+                AND r.reservation_date >= %s
+            """, (restaurant_id, (day + 1) % 7 + 1, hour, hour, four_weeks_ago))
+
+            result = cursor.fetchone()
+            avg_bookings = result[0] if result else 0
+
+            cursor.execute("""
+                SELECT MAX(seating_capacity) FROM restaurants WHERE restaurant_id = %s
+            """, (restaurant_id,))
+            max_capacity = cursor.fetchone()[0] or 50
+
+            busyness_score = min(1.0, avg_bookings / max_capacity)
+
+            cursor.execute("""
+                INSERT INTO busy_hours (restaurant_id, day_of_week, hour_of_day, busyness_score)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE busyness_score = %s
+            """, (restaurant_id, day, hour, busyness_score, busyness_score))
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return True
+
+
+def seed(num_reservations):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO users (name, email, phone, password_hash)
+        VALUES ('Bench User', %s, '0000000000', 'x')
+    """, (f"bench-{time.time_ns()}@example.com",))
+    user_id = cursor.lastrowid
+    cursor.execute("""
+        INSERT INTO restaurants (name, location, seating_capacity, current_occupancy, menu, source)
+        VALUES (%s, 'Benchmark', 40, 0, '', 'bench')
+    """, (f"Bench {time.time_ns()}",))
+    restaurant_id = cursor.lastrowid
+
+    slot_ids = []
+    for day in range(7):
+        for start, end in SLOTS:
+            cursor.execute("""
+                INSERT INTO time_slots (restaurant_id, start_time, end_time, max_capacity, day_of_week)
+                VALUES (%s, %s, %s, 40, %s)
+            """, (restaurant_id, f"{start:02d}:00:00", f"{end % 24:02d}:00:00", day))
+            slot_ids.append(cursor.lastrowid)
+
+    today = datetime.now().date()
+    rows = [(user_id, restaurant_id, random.randint(1, 4), 'Pending',
+             random.choice(slot_ids), today - timedelta(days=random.randint(0, 27)))
+            for _ in range(num_reservations)]
+    for i in range(0, len(rows), 1000):
+        cursor.executemany("""
+            INSERT INTO reservations (user_id, restaurant_id, num_people, status, slot_id, reservation_date)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, rows[i:i + 1000])
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return user_id, restaurant_id
+
+
+def read_scores(restaurant_id):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT day_of_week, hour_of_day, busyness_score FROM busy_hours
+        WHERE restaurant_id = %s
+    """, (restaurant_id,))
+    scores = {(day, hour): score for day, hour, score in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return scores
+
+
+def cleanup(user_id, restaurant_id):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM activity_log WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM busy_hours WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM restaurant_booking_stats WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM reservations WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM time_slots WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM restaurants WHERE restaurant_id = %s", (restaurant_id,))
+    cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def timed(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busy-hours recomputation benchmark")
+    parser.add_argument('--reservations', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-batch', action='store_true', help="don't time the all-restaurants batch mode")
+    args = parser.parse_args()
+
+    user_id, restaurant_id = seed(args.reservations)
+    try:
+        legacy = timed(legacy_update_busy_hours_prediction, restaurant_id, repeat=args.repeat)
+        legacy_scores = read_scores(restaurant_id)
+
+        current = timed(database.update_busy_hours_prediction, restaurant_id, repeat=args.repeat)
+        current_scores = read_scores(restaurant_id)
+
+        max_diff = max(abs(legacy_scores[key] - current_scores.get(key, -1)) for key in legacy_scores)
+        print(f"reservations        : {args.reservations}")
+        print(f"legacy loop         : {legacy * 1000:.1f} ms (273 queries)")
+        print(f"single query        : {current * 1000:.1f} ms ({legacy / current:.1f}x faster)")
+        print(f"max score difference: {max_diff:.6f}")
+
+        if not args.skip_batch:
+            batch = timed(database.update_all_busy_hours_predictions, repeat=args.repeat)
+            print(f"batch (all)         : {batch * 1000:.1f} ms")
+
+        return 0 if max_diff < 1e-4 else 1
+    finally:
+        cleanup(user_id, restaurant_id)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# Occupancy stream load test: connect N Server-Sent Events clients to
+# /api/occupancy/stream while bookings run, and show that database work per
+# second stays flat as N grows (every client reads the same in-process feed).
+#
+# Needs a MySQL database with the restaurantbooking.sql schema (configured via .env).
+#
+#   python -m benchmarks.bench_occupancy_stream --clients 10 100 500 --duration 10
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_pool
+import booking
+import occupancy
+from app import app
+from benchmarks.bench_booking import setup, cleanup
+
+
+def stream_client(url, stop, received):
+    try:
+        with requests.get(url, stream=True, timeout=30) as response:
+            for line in response.iter_lines(chunk_size=1):
+                if line.startswith(b'event: '):
+                    received.append(line[7:])
+                if stop.is_set():
+                    return
+    except requests.RequestException:
+        pass
+
+
+def run(url, num_clients, duration, user_id, restaurant_id, bookings_per_second):
+    stop = threading.Event()
+    received = [[] for _ in range(num_clients)]
+    clients = [threading.Thread(target=stream_client, args=(url, stop, received[i]), daemon=True)
+               for i in range(num_clients)]
+    for client in clients:
+        client.start()
+    time.sleep(1)  # let everyone connect and get their snapshot
+
+    before = db_pool.pool_stats()['checkouts']
+    start = time.perf_counter()
+    bookings = 0
+    while time.perf_counter() - start < duration:
+        status, reservation_id = booking.reserve_seats(user_id, restaurant_id, 1)
+        if status == booking.CONFIRMED:
+            booking.cancel_reservation(user_id, reservation_id)
+        bookings += 1
+        time.sleep(1 / bookings_per_second)
+    elapsed = time.perf_counter() - start
+    checkouts = db_pool.pool_stats()['checkouts'] - before
+
+    stop.set()
+    occupancy.engine.set_occupancy(restaurant_id, 0)  # wake the streams so they notice `stop`
+    deltas = [events.count(b'delta') for events in received]
+    connected = sum(1 for events in received if b'snapshot' in events)
+    return {
+        'clients': num_clients,
+        'connected': connected,
+        'bookings': bookings,
+        'db_checkouts_per_s': checkouts / elapsed,
+        'avg_deltas_per_client': sum(deltas) / max(len(deltas), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Occupancy SSE load test")
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rate', type=float, default=5, help="bookings per second")
+    args = parser.parse_args()
+
+    occupancy.start()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/occupancy/stream"
+
+    user_id, restaurant_id = setup(capacity=1000)
+    occupancy.engine.reconcile()
+    try:
+        print(f"{'clients':>8} {'connected':>10} {'bookings':>9} {'db checkouts/s':>15} {'deltas/client':>14}")
+        for num_clients in args.clients:
+            result = run(url, num_clients, args.duration, user_id, restaurant_id, args.rate)
+            print(f"{result['clients']:>8} {result['connected']:>10} {result['bookings']:>9} "
+                  f"{result['db_checkouts_per_s']:>15.1f} {result['avg_deltas_per_client']:>14.1f}")
+    finally:
+        server.shutdown()
+        cleanup(user_id, restaurant_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Overpass parsing benchmark: response.json() on the whole payload vs. the
+# incremental parser in osm_api, for growing `out center N` caps. Reports peak
+# Python memory in the client, time to the first restaurant and total time.
+#
+# Runs locally against fake_overpass.py started in a subprocess (so its memory
+# is not counted). No database or internet needed.
+#
+#   python -m benchmarks.bench_osm_parse --sizes 1000 10000 100000
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from osm_api import OverpassClient, parse_elements
+
+
+def start_fake(max_elements):
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'fake_overpass.py'), '--port', '0',
+                                '--elements', str(max_elements)],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    url = process.stdout.readline().split()[-1]
+    return process, url
+
+
+def measure(client, stream):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    if stream:
+        for _ in client.iter_restaurants('Bench City'):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+    else:
+        response = client._get('Bench City', stream=False)
+        results = parse_elements(response.json())
+        first = time.perf_counter() - start
+        count = len(results)
+        del response, results
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, first, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overpass parsing benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    process, url = start_fake(max(args.sizes))
+    try:
+        print(f"{'elements':>9} {'mode':>7} {'peak KB':>8} {'first ms':>9} {'total ms':>9}")
+        for size in args.sizes:
+            client = OverpassClient(url, timeout=60, rate_limit=0, max_results=size)
+            client.fetch('Bench City')  # warm the server's cached body and the connection
+            for mode in ('json', 'stream'):
+                count, first, total, peak = measure(client, mode == 'stream')
+                assert count == size, (count, size)
+                print(f"{size:>9} {mode:>7} {peak / 1024:>8.0f} {first * 1000:>9.1f} {total * 1000:>9.1f}")
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# OSM prefetch benchmark: fetch many cities from a local fake Overpass server one
+# at a time (the old per-city path) and with the bounded-concurrency fan-out in
+# osm_api, with simulated upstream latency and throttling.
+#
+# Runs entirely locally (no database, no internet).
+#
+#   python -m benchmarks.bench_osm_prefetch --cities 40 --latency 0.25 --concurrency 8
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_overpass import start_server
+from osm_api import OverpassClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSM prefetch benchmark")
+    parser.add_argument('--cities', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.25, help="simulated upstream latency in seconds")
+    parser.add_argument('--fail-rate', type=float, default=0.05, help="share of requests throttled (429/503)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate-limit', type=float, default=0, help="requests/sec per host (0 = unlimited)")
+    args = parser.parse_args()
+
+    server, url = start_server(latency=args.latency, fail_rate=args.fail_rate)
+    cities = [f"City {i}" for i in range(args.cities)]
+
+    # Sequential: what warming N cities through search() costs today
+    client = OverpassClient(url, retries=3, backoff=0.05, rate_limit=0)
+    start = time.perf_counter()
+    sequential = sum(len(client.fetch_with_retry(city)) for city in cities)
+    sequential_time = time.perf_counter() - start
+
+    client = OverpassClient(url, retries=3, backoff=0.05, rate_limit=args.rate_limit, concurrency=args.concurrency)
+    requests_before = server.requests
+    start = time.perf_counter()
+    fanned = failed = 0
+    for _, results, error in client.fetch_many(cities):
+        if error is None:
+            fanned += len(results)
+        else:
+            failed += 1
+    fanout_time = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"{args.cities} cities, {args.latency * 1000:.0f} ms upstream latency, {args.fail_rate:.0%} throttled")
+    print(f"sequential : {sequential_time:.2f} s ({sequential} restaurants)")
+    print(f"fan-out x{args.concurrency:<3}: {fanout_time:.2f} s ({fanned} restaurants, {failed} failed, "
+          f"{server.requests - requests_before} requests incl. {client.stats()['retries']} retries) "
+          f"{sequential_time / fanout_time:.1f}x faster")
+    return 0 if failed == 0 and fanned == sequential else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
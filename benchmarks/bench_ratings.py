@@ -0,0 +1,151 @@
+# Rating aggregates benchmark: suggestion latency with the original correlated
+# AVG(rating) subquery vs. the materialized avg_rating / occupancy_rate columns.
+#
+# Needs a MySQL database with the restaurantbooking.sql schema (configured via .env).
+# Seeds restaurants in a "Bench City" location with a large number of reviews and
+# removes them afterwards. Seeding 1M reviews takes a few minutes.
+#
+#   python -m benchmarks.bench_ratings --restaurants 1000 --reviews 1000000
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_pool
+import database
+import stats_cache
+
+CITY = 'Bench City'
+
+# The original fallback query in suggest_restaurants (and what SuggestRestaurants
+# computed by calling GetRestaurantRating per row)
+LEGACY_QUERY = """
+    SELECT
+        r.restaurant_id,
+        r.name,
+        r.location,
+        r.current_occupancy,
+        r.seating_capacity,
+        (r.current_occupancy / r.seating_capacity) AS occupancy_rate,
+        COALESCE(
+            (SELECT AVG(rating) FROM reviews
+             WHERE restaurant_id = r.restaurant_id),
+            0
+        ) AS avg_rating
+    FROM restaurants r
+    WHERE r.location LIKE %s
+    ORDER BY
+        occupancy_rate ASC,
+        avg_rating DESC
+    LIMIT %s
+"""
+
+
+def seed(num_restaurants, num_reviews):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO users (name, email, phone, password_hash)
+        VALUES ('Bench User', %s, '0000000000', 'x')
+    """, (f"bench-{time.time_ns()}@example.com",))
+    user_id = cursor.lastrowid
+
+    stamp = time.time_ns()
+    cursor.executemany("""
+        INSERT INTO restaurants (name, location, seating_capacity, current_occupancy, menu, source)
+        VALUES (%s, %s, %s, %s, '', 'bench')
+    """, [(f"Bench {stamp} {i}", CITY, 50, random.randint(0, 50)) for i in range(num_restaurants)])
+    cursor.execute("SELECT restaurant_id FROM restaurants WHERE source = 'bench' AND location = %s", (CITY,))
+    restaurant_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+
+    batch = 10000
+    for start in range(0, num_reviews, batch):
+        cursor.executemany("""
+            INSERT INTO reviews (user_id, restaurant_id, rating, review_text)
+            VALUES (%s, %s, %s, '')
+        """, [(user_id, random.choice(restaurant_ids), random.randint(1, 5))
+              for _ in range(min(batch, num_reviews - start))])
+        conn.commit()
+    cursor.close()
+    conn.close()
+    return user_id, restaurant_ids
+
+
+def cleanup(user_id, restaurant_ids):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    # Delete reviews in slices so one statement does not hold millions of row locks
+    while True:
+        cursor.execute("DELETE FROM reviews WHERE user_id = %s LIMIT 50000", (user_id,))
+        conn.commit()
+        if cursor.rowcount == 0:
+            break
+    for start in range(0, len(restaurant_ids), 1000):
+        chunk = restaurant_ids[start:start + 1000]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"DELETE FROM restaurant_rating_stats WHERE restaurant_id IN ({placeholders})", tuple(chunk))
+        cursor.execute(f"DELETE FROM restaurants WHERE restaurant_id IN ({placeholders})", tuple(chunk))
+    cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def legacy_suggest(max_results):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(LEGACY_QUERY, (f"%{CITY}%", max_results))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def timed(fn, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rating aggregates benchmark")
+    parser.add_argument('--restaurants', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=1000000)
+    parser.add_argument('--results', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    user_id, restaurant_ids = seed(args.restaurants, args.reviews)
+    print(f"seeded {args.restaurants} restaurants / {args.reviews} reviews in {time.perf_counter() - start:.1f} s")
+    try:
+        # Reviews were bulk inserted behind add_review's back, so rebuild the aggregates once
+        rebuild, _ = timed(stats_cache.rebuild_restaurant_aggregates, repeat=1)
+        legacy, legacy_rows = timed(legacy_suggest, args.results, repeat=args.repeat)
+        current, current_rows = timed(database.suggest_restaurants, CITY, None, args.results, repeat=args.repeat)
+
+        # Ties can come back in either order, so compare the sort keys rather than ids
+        same = len(legacy_rows) == len(current_rows) and all(
+            abs(float(a['occupancy_rate']) - float(b['occupancy_rate'])) < 1e-4
+            and abs(float(a['avg_rating']) - float(b['avg_rating'])) < 0.01
+            for a, b in zip(legacy_rows, current_rows))
+        print(f"aggregate rebuild   : {rebuild * 1000:.1f} ms (once, e.g. nightly)")
+        print(f"correlated AVG      : {legacy * 1000:.1f} ms")
+        print(f"materialized columns: {current * 1000:.1f} ms ({legacy / current:.1f}x faster)")
+        print(f"same ranking        : {same}")
+        return 0 if same else 1
+    finally:
+        cleanup(user_id, restaurant_ids)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
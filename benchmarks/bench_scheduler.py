@@ -0,0 +1,121 @@
+# Suggestion scheduler simulation: send waves of simultaneous users to the
+# restaurants each strategy suggests and compare how evenly the load spreads and
+# how long each decision takes.
+#
+# Runs entirely in memory (no database). "legacy" is the old behaviour: always
+# the lowest raw current_occupancy, no capacity, no pending suggestions.
+#
+#   python -m benchmarks.bench_scheduler --restaurants 500 --waves 50 --users 200
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from occupancy import OccupancyEngine
+from scheduler import SuggestionScheduler
+
+WAVE_INTERVAL = 60  # simulated seconds between waves; longer than the pending TTL below
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def build(num_restaurants, seed):
+    rng = random.Random(seed)
+    engine = OccupancyEngine()
+    busy = {}
+    for restaurant_id in range(1, num_restaurants + 1):
+        capacity = rng.randint(20, 120)
+        engine.set_occupancy(restaurant_id, int(capacity * rng.uniform(0, 0.6)), capacity)
+        busy[restaurant_id] = rng.random()
+    engine.loaded = True
+    return engine, busy
+
+
+def legacy_suggest(engine):
+    return min(engine.rows(), key=lambda row: row[2])[0]
+
+
+def simulate(strategy, args):
+    engine, busy = build(args.restaurants, args.seed)
+    clock = SimClock()
+    scheduler = SuggestionScheduler(engine, pending_ttl=30, busy_loader=lambda day, hour: busy,
+                                    rng=random.Random(args.seed), clock=clock)
+    rng = random.Random(args.seed + 1)
+    decisions = []
+    herd = []
+    spread = []
+    booked = rejected = 0
+
+    for _ in range(args.waves):
+        # Everyone in the wave asks before any of them has booked
+        suggested = []
+        for _ in range(args.users):
+            start = time.perf_counter()
+            if strategy == 'legacy':
+                restaurant_id = legacy_suggest(engine)
+            else:
+                restaurant_id = scheduler.suggest(strategy)
+            decisions.append(time.perf_counter() - start)
+            suggested.append(restaurant_id)
+        herd.append(max(suggested.count(r) for r in set(suggested)) / len(suggested))
+
+        for restaurant_id in suggested:
+            party = rng.randint(1, 4)
+            row = engine.get(restaurant_id)
+            if row['current_occupancy'] + party <= row['seating_capacity']:
+                engine.adjust(restaurant_id, party)
+                scheduler.release(restaurant_id)
+                booked += 1
+            else:
+                rejected += 1
+
+        rates = [current / capacity for _, capacity, current in engine.rows()]
+        spread.append(statistics.pstdev(rates))
+
+        # Some diners leave before the next wave
+        for restaurant_id, _, current in engine.rows():
+            engine.adjust(restaurant_id, -int(current * rng.uniform(0, 0.3)))
+        clock.now += WAVE_INTERVAL
+
+    decisions.sort()
+    return {
+        'strategy': strategy,
+        'decision_us_p50': decisions[len(decisions) // 2] * 1e6,
+        'decision_us_p99': decisions[int(len(decisions) * 0.99) - 1] * 1e6,
+        'herd': statistics.mean(herd),
+        'rate_stdev': statistics.mean(spread),
+        'rejected': rejected / max(booked + rejected, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggestion scheduler simulation")
+    parser.add_argument('--restaurants', type=int, default=500)
+    parser.add_argument('--waves', type=int, default=50)
+    parser.add_argument('--users', type=int, default=200, help="simultaneous users per wave")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    strategies = ['legacy', 'least_rate', 'power_of_two', 'weighted_free', 'predicted_load']
+    print(f"{args.restaurants} restaurants, {args.waves} waves of {args.users} simultaneous users")
+    print(f"{'strategy':>15} {'p50 us':>8} {'p99 us':>8} {'herd':>6} {'rate stdev':>11} {'rejected':>9}")
+    for strategy in strategies:
+        result = simulate(strategy, args)
+        print(f"{result['strategy']:>15} {result['decision_us_p50']:>8.1f} {result['decision_us_p99']:>8.1f} "
+              f"{result['herd']:>6.1%} {result['rate_stdev']:>11.3f} {result['rejected']:>9.1%}")
+    print("herd: share of a wave sent to the single most-suggested restaurant")
+
+
+if __name__ == '__main__':
+    main()
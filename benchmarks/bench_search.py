@@ -0,0 +1,83 @@
+# Search index benchmark: build the in-process menu search index over synthetic
+# restaurants and menu items, then time /api/search-style queries, including
+# single-letter-ish autocomplete prefixes.
+#
+# Runs entirely in memory (no database).
+#
+#   python -m benchmarks.bench_search --restaurants 10000 --items 100000
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import MenuSearchIndex
+
+DISHES = ['paneer', 'butter', 'chicken', 'tikka', 'masala', 'dal', 'makhani', 'naan', 'garlic', 'biryani',
+          'dosa', 'idli', 'sambar', 'vada', 'pav', 'bhaji', 'thali', 'lassi', 'kulfi', 'gulab', 'jamun',
+          'pizza', 'pasta', 'burger', 'fries', 'wrap', 'mojito', 'noodles', 'manchurian', 'momos',
+          'kebab', 'tandoori', 'roti', 'rice', 'pulao', 'korma', 'vindaloo', 'chaat', 'samosa', 'falooda']
+WORDS = ['spicy', 'creamy', 'smoky', 'crispy', 'fresh', 'house', 'special', 'classic', 'homestyle', 'royal']
+CATEGORIES = ['North Indian', 'South Indian', 'Chinese', 'Italian', 'Fast Food', 'Street Food', 'Cafe']
+QUERIES = ['paneer', 'butter chicken', 'pa', 'ch', 'bir', 'garlic naan', 'south dosa', 'spicy pan', 'momo', 'x']
+
+
+def build(num_restaurants, num_items, seed):
+    rng = random.Random(seed)
+    index = MenuSearchIndex()
+    items = {}
+    for item_id in range(num_items):
+        restaurant_id = rng.randint(1, num_restaurants)
+        name = ' '.join(rng.sample(DISHES, 2)) + f" {item_id}"
+        description = ' '.join(rng.sample(WORDS, 2) + rng.sample(DISHES, 1))
+        items.setdefault(restaurant_id, []).append((item_id, name, description))
+
+    start = time.perf_counter()
+    for restaurant_id in range(1, num_restaurants + 1):
+        index.set_restaurant(restaurant_id, f"{rng.choice(WORDS).title()} {rng.choice(DISHES).title()} {restaurant_id}",
+                             city='Pune', category=rng.choice(CATEGORIES), menu=', '.join(rng.sample(DISHES, 3)),
+                             items=items.get(restaurant_id, ()))
+    return index, items, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index benchmark")
+    parser.add_argument('--restaurants', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    index, items, build_time = build(args.restaurants, args.items, args.seed)
+    rng = random.Random(args.seed)
+    loads = {restaurant_id: rng.random() for restaurant_id in range(1, args.restaurants + 1)}
+    print(f"indexed {args.restaurants} restaurants / {args.items} menu items in {build_time:.2f} s")
+
+    # Incremental update: one restaurant's menu changes
+    restaurant_id = 1
+    start = time.perf_counter()
+    index.set_restaurant(restaurant_id, "Royal Paneer 1", city='Pune', category='North Indian',
+                         items=items.get(restaurant_id, [])[1:] + [(10 ** 9, "Paneer Pizza", "fusion")])
+    print(f"re-index one restaurant: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(f"{'query':>16} {'results':>8} {'p50 ms':>8} {'max ms':>8}")
+    worst = 0.0
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = index.search(query, 10, load_of=loads.get)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        worst = max(worst, timings[len(timings) // 2])
+        print(f"{query!r:>16} {len(results):>8} {timings[len(timings) // 2] * 1000:>8.2f} {timings[-1] * 1000:>8.2f}")
+
+    print("RESULT:", "OK, every p50 under 10 ms" if worst < 0.010 else "slowest p50 over 10 ms")
+    return 0 if worst < 0.010 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# Session backend benchmark: per-request session cost with Flask's signed-cookie
+# sessions vs. the server-side memory and SQLite stores, for an anonymous API
+# request (never touches the session) and a logged-in page (reads user_id).
+#
+# Runs entirely in memory with Flask's test client (no database); the SQLite
+# store uses a temporary file.
+#
+#   python -m benchmarks.bench_sessions --requests 5000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session
+
+from session_store import MemorySessionStore, SQLiteSessionStore, ServerSessionInterface
+
+
+def build_app(interface):
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+    if interface:
+        app.session_interface = interface
+
+    @app.route('/login')
+    def login():
+        session['user_id'] = 42
+        session['username'] = 'Bench User'
+        return 'ok'
+
+    @app.route('/api/ping')
+    def anonymous():
+        return 'ok'
+
+    @app.route('/book')
+    def logged_in():
+        return 'ok' if 'user_id' in session else 'login'
+
+    return app
+
+
+def timed(client, path, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session backend benchmark")
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = [
+            ('cookie', None),
+            ('memory', ServerSessionInterface(MemorySessionStore(), sweep_interval=3600)),
+            ('sqlite', ServerSessionInterface(SQLiteSessionStore(os.path.join(directory, 'sessions.sqlite3')),
+                                              sweep_interval=3600)),
+        ]
+        print(f"{'backend':>8} {'anonymous us':>13} {'logged-in us':>13} {'cookie bytes':>13}")
+        for name, interface in backends:
+            client = build_app(interface).test_client()
+            response = client.get('/login')
+            cookie = response.headers['Set-Cookie'].split(';', 1)[0].split('=', 1)[1]
+            anonymous = timed(client, '/api/ping', args.requests)
+            logged_in = timed(client, '/book', args.requests)
+            print(f"{name:>8} {anonymous:>13.1f} {logged_in:>13.1f} {len(cookie):>13}")
+
+
+if __name__ == '__main__':
+    main()
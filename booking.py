@@ -0,0 +1,128 @@
+import mysql.connector
+import sqlite3
+import activity_log
+import db_pool
+import booking_queue
+import occupancy
+import scheduler
+
+# Outcomes of reserve_seats / cancel_reservation
+CONFIRMED = 'confirmed'
+CANCELLED = 'cancelled'
+FULL = 'full'
+NOT_FOUND = 'not_found'
+DB_ERROR = 'error'
+
+
+# Reserve seats atomically. The restaurant row is locked (SELECT ... FOR UPDATE) for
+# the whole check-and-insert, so concurrent bookings are serialized per restaurant
+# and can never overbook. The after_reservation_insert trigger adds the seats to
+# current_occupancy in the same transaction; the activity log entry is written later
+# by activity_log's background writer.
+# Returns (status, reservation_id).
+def reserve_seats(user_id, restaurant_id, num_people):
+    if booking_queue.queue:
+        return _reserve_write_behind(user_id, restaurant_id, num_people)
+    try:
+        conn = db_pool.get_connection()
+    except mysql.connector.Error as e:
+        print(f"DB Connection Error: {e}")
+        return DB_ERROR, None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT seating_capacity, current_occupancy FROM restaurants
+            WHERE restaurant_id = %s
+            FOR UPDATE
+        """, (restaurant_id,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return NOT_FOUND, None
+
+        capacity, current = row[0] or 0, row[1] or 0
+        if current + num_people > capacity:
+            conn.rollback()
+            occupancy.engine.set_occupancy(restaurant_id, current, capacity)
+            return FULL, None
+
+        cursor.execute("""
+            INSERT INTO reservations (user_id, restaurant_id, num_people, reservation_time, status)
+            VALUES (%s, %s, %s, NOW(), 'Confirmed')
+        """, (user_id, restaurant_id, num_people))
+        reservation_id = cursor.lastrowid
+        conn.commit()
+    except mysql.connector.Error as e:
+        print(f"Booking error: {e}")
+        conn.rollback()
+        return DB_ERROR, None
+    finally:
+        cursor.close()
+        conn.close()
+
+    # We held the row lock, so the committed value is exactly current + num_people
+    occupancy.engine.set_occupancy(restaurant_id, current + num_people, capacity)
+    activity_log.log(user_id, 'reservation_created', reservation_id,
+                     f"Restaurant ID: {restaurant_id}, People: {num_people}")
+    # The seats are now in current_occupancy; stop counting a pending suggestion for them
+    scheduler.scheduler.release(restaurant_id)
+    return CONFIRMED, reservation_id
+
+
+# Write-behind mode: confirmed against the in-process occupancy engine, written to MySQL
+# later by the booking queue, so there is no reservation_id yet.
+def _reserve_write_behind(user_id, restaurant_id, num_people):
+    try:
+        reserved = booking_queue.queue.submit(user_id, restaurant_id, num_people)
+    except sqlite3.Error as e:
+        print(f"Booking queue error: {e}")
+        return DB_ERROR, None
+    if reserved is None:
+        return NOT_FOUND, None
+    if not reserved:
+        return FULL, None
+    scheduler.scheduler.release(restaurant_id)
+    activity_log.log(user_id, 'reservation_created', None, f"Restaurant ID: {restaurant_id}, People: {num_people}")
+    return CONFIRMED, None
+
+
+# Cancel one of the user's reservations; the after_reservation_update trigger gives the seats back.
+# Returns (status, restaurant_id).
+def cancel_reservation(user_id, reservation_id):
+    try:
+        conn = db_pool.get_connection()
+    except mysql.connector.Error as e:
+        print(f"DB Connection Error: {e}")
+        return DB_ERROR, None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT restaurant_id, status, num_people FROM reservations
+            WHERE reservation_id = %s AND user_id = %s
+            FOR UPDATE
+        """, (reservation_id, user_id))
+        row = cursor.fetchone()
+        if row is None or row[1] == 'Cancelled':
+            conn.rollback()
+            return NOT_FOUND, None
+
+        restaurant_id, num_people = row[0], row[2]
+        cursor.execute("UPDATE reservations SET status = 'Cancelled' WHERE reservation_id = %s", (reservation_id,))
+        cursor.execute("SELECT seating_capacity, current_occupancy FROM restaurants WHERE restaurant_id = %s",
+                       (restaurant_id,))
+        capacity, current = cursor.fetchone()
+        conn.commit()
+    except mysql.connector.Error as e:
+        print(f"Cancellation error: {e}")
+        conn.rollback()
+        return DB_ERROR, None
+    finally:
+        cursor.close()
+        conn.close()
+
+    occupancy.engine.set_occupancy(restaurant_id, current, capacity)
+    activity_log.log(user_id, 'reservation_cancelled', reservation_id,
+                     f"Restaurant ID: {restaurant_id}, People: {num_people}")
+    return CANCELLED, restaurant_id
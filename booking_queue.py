@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+import time
+import uuid
+
+import mysql.connector
+import db_pool
+import occupancy
+from config import BOOKING_QUEUE_CONFIG
+from sqlite_file import SQLiteFile
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queued_reservations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    restaurant_id INTEGER NOT NULL,
+    num_people INTEGER NOT NULL,
+    reserved_at REAL NOT NULL
+);
+"""
+
+
+INSERT_RESERVATION = """
+    INSERT INTO reservations (user_id, restaurant_id, num_people, reservation_time, status, queue_id)
+    VALUES (%s, %s, %s, FROM_UNIXTIME(%s), 'Confirmed', %s)
+    ON DUPLICATE KEY UPDATE queue_id = queue_id
+"""
+
+
+# (seq, queue_id, user_id, restaurant_id, num_people, reserved_at) -> INSERT_RESERVATION parameters
+def _params(row):
+    return row[2], row[3], row[4], row[5], row[1]
+
+
+class ReservationQueue:
+    """Write-behind path for bookings (BOOKING_WRITE_BEHIND=1).
+
+    A booking is confirmed against the in-process occupancy engine and appended
+    to a local SQLite WAL file (synchronous=FULL, so it survives a crash once
+    submit() returns). A background writer moves queued reservations into MySQL
+    in batches: one executemany INSERT and one commit per batch, with the usual
+    after_reservation_insert trigger per row. Rows leave the file only after
+    MySQL has committed them; each carries a queue_id with a unique key in
+    reservations, so a batch replayed after a crash between the two steps is not
+    inserted twice. Queued rows are replayed on startup.
+
+    Seats queued but not yet in MySQL are reported to the occupancy engine
+    (engine.unflushed) so reconcile passes don't hand them out again. The engine
+    is per process, so this mode needs a single worker process.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=0.05, engine=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.engine = engine or occupancy.engine
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one flush at a time (writer thread vs. drain())
+        self._wakeup = threading.Event()
+        self._writer = None
+        self._unflushed = {}         # restaurant_id -> seats queued but not yet in MySQL
+        self._depth = 0
+        self._stats = {'queued': 0, 'flushed': 0, 'rejected': 0, 'batches': 0, 'flush_errors': 0, 'replayed': 0,
+                       'last_batch_ms': 0.0, 'max_batch_ms': 0.0, 'last_lag_ms': 0.0, 'max_lag_ms': 0.0}
+
+        self._conn = SQLiteFile(path, SCHEMA, synchronous='FULL').connect(check_same_thread=False)
+
+        # Replay: whatever is still in the file was never confirmed as written to MySQL
+        for restaurant_id, seats, count in self._conn.execute("""
+                SELECT restaurant_id, SUM(num_people), COUNT(*) FROM queued_reservations GROUP BY restaurant_id
+        """):
+            self._unflushed[restaurant_id] = seats
+            self._depth += count
+        self._stats['replayed'] = self._depth
+        self.engine.unflushed = self.unflushed
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def unflushed(self):
+        with self._lock:
+            return dict(self._unflushed)
+
+    def _add_unflushed(self, restaurant_id, seats):
+        with self._lock:
+            remaining = self._unflushed.get(restaurant_id, 0) + seats
+            if remaining > 0:
+                self._unflushed[restaurant_id] = remaining
+            else:
+                self._unflushed.pop(restaurant_id, None)
+
+    def submit(self, user_id, restaurant_id, num_people):
+        """Confirm and durably queue a booking.
+
+        Returns None if the restaurant is unknown, False if it is full and True
+        once the booking is queued. Raises sqlite3.Error if it could not be queued.
+        """
+        self.start()
+        self.engine.ensure_loaded()
+        # Count the seats as unflushed before taking them, so a concurrent reconcile over-counts rather than under-counts
+        self._add_unflushed(restaurant_id, num_people)
+        reserved = self.engine.reserve(restaurant_id, num_people)
+        if not reserved:
+            self._add_unflushed(restaurant_id, -num_people)
+            return reserved
+
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.execute("""
+                        INSERT INTO queued_reservations (queue_id, user_id, restaurant_id, num_people, reserved_at)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (uuid.uuid4().hex, user_id, restaurant_id, num_people, time.time()))
+                self._depth += 1
+                self._stats['queued'] += 1
+        except sqlite3.Error:
+            self._add_unflushed(restaurant_id, -num_people)
+            self.engine.adjust(restaurant_id, -num_people)
+            raise
+
+        if self._depth >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # Move one batch to MySQL; returns the number of reservations written (0 if empty or on error)
+    def flush(self):
+        # Held from the SELECT to the DELETE, so two flushes never write the same rows
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT seq, queue_id, user_id, restaurant_id, num_people, reserved_at
+                FROM queued_reservations ORDER BY seq LIMIT ?
+            """, (self.batch_size,)).fetchall()
+        if not rows:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            conn = db_pool.get_connection()
+        except mysql.connector.Error as e:
+            print(f"Booking queue flush error: {e}")
+            self._count('flush_errors')
+            return 0
+        cursor = conn.cursor()
+        rejected = []
+        try:
+            try:
+                cursor.executemany(INSERT_RESERVATION, [_params(row) for row in rows])
+                conn.commit()
+            except (mysql.connector.IntegrityError, mysql.connector.DataError):
+                # One bad row (e.g. its restaurant was deleted) must not block the queue:
+                # write the batch row by row and drop the rows MySQL rejects
+                conn.rollback()
+                for row in rows:
+                    try:
+                        cursor.execute(INSERT_RESERVATION, _params(row))
+                    except (mysql.connector.IntegrityError, mysql.connector.DataError) as e:
+                        print(f"Booking queue dropped reservation {row[1]}: {e}")
+                        rejected.append(row)
+                conn.commit()
+        except mysql.connector.Error as e:
+            print(f"Booking queue flush error: {e}")
+            conn.rollback()
+            self._count('flush_errors')
+            return 0
+        finally:
+            cursor.close()
+            conn.close()
+
+        for row in rejected:
+            self.engine.adjust(row[3], -row[4])
+        # Committed in MySQL: drop the rows locally, then stop counting their seats as unflushed
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM queued_reservations WHERE seq <= ?", (rows[-1][0],))
+            self._depth -= len(rows)
+            for row in rows:
+                remaining = self._unflushed.get(row[3], 0) - row[4]
+                if remaining > 0:
+                    self._unflushed[row[3]] = remaining
+                else:
+                    self._unflushed.pop(row[3], None)
+            batch_ms = (time.perf_counter() - started) * 1000
+            lag_ms = (now - rows[0][5]) * 1000
+            self._stats['flushed'] += len(rows) - len(rejected)
+            self._stats['rejected'] += len(rejected)
+            self._stats['batches'] += 1
+            self._stats['last_batch_ms'] = round(batch_ms, 2)
+            self._stats['max_batch_ms'] = round(max(self._stats['max_batch_ms'], batch_ms), 2)
+            self._stats['last_lag_ms'] = round(lag_ms, 2)
+            self._stats['max_lag_ms'] = round(max(self._stats['max_lag_ms'], lag_ms), 2)
+        return len(rows)
+
+    # Flush until the queue is empty (or MySQL fails); used by benchmarks and shutdown
+    def drain(self):
+        while self._depth and self.flush():
+            pass
+        return self._depth
+
+    def start(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='booking-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # Keep going while full batches are waiting; back off after an error
+            while self.flush() == self.batch_size:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['depth'] = self._depth
+            stats['unflushed_seats'] = sum(self._unflushed.values())
+            oldest = self._conn.execute("SELECT MIN(reserved_at) FROM queued_reservations").fetchone()[0]
+        stats['oldest_age_ms'] = round((time.time() - oldest) * 1000, 2) if oldest else 0.0
+        stats['batch_size'] = self.batch_size
+        return stats
+
+
+queue = ReservationQueue(BOOKING_QUEUE_CONFIG['path'], BOOKING_QUEUE_CONFIG['batch_size'],
+                         BOOKING_QUEUE_CONFIG['flush_interval']) if BOOKING_QUEUE_CONFIG['enabled'] else None
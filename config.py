@@ -9,3 +9,105 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', ''),
     'database': os.getenv('DB_NAME', 'restaurant_db')}
 
+# Connection pool settings (see db_pool.py)
+DB_POOL_CONFIG = {
+    'size': int(os.getenv('DB_POOL_SIZE', '10')),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),            # seconds to wait for a free connection
+    'ping_on_borrow': os.getenv('DB_POOL_PING', '1') == '1',        # health-check connections on checkout
+    'recycle': int(os.getenv('DB_POOL_RECYCLE', '3600'))}           # reopen connections older than N seconds
+
+# OpenStreetMap / Overpass client settings (see osm_api.py)
+OSM_CONFIG = {
+    'url': os.getenv('OVERPASS_URL', 'https://overpass-api.de/api/interpreter'),
+    'timeout': float(os.getenv('OVERPASS_TIMEOUT', '10')),
+    'ttl': int(os.getenv('OSM_CACHE_TTL', '600')),                  # serve cached results without refreshing
+    'stale_ttl': int(os.getenv('OSM_CACHE_STALE_TTL', '86400')),    # serve stale results while refreshing in background
+    'max_cities': int(os.getenv('OSM_CACHE_SIZE', '256')),
+    # Persistent element store so cold starts skip Overpass; set OSM_STORE_PATH= to disable
+    'store_path': os.getenv('OSM_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'osm_cache.sqlite3')),
+    'full_refresh': int(os.getenv('OSM_FULL_REFRESH', str(7 * 86400))),  # seconds between full (non-incremental) refreshes
+    'max_results': int(os.getenv('OSM_MAX_RESULTS', '20')),         # restaurants per city query (`out center N`)
+    'stream': os.getenv('OSM_STREAM', '1') == '1',                  # parse responses incrementally as they download
+    # Bulk prefetch (osm_prefetch.py)
+    'concurrency': int(os.getenv('OSM_FETCH_CONCURRENCY', '4')),    # parallel Overpass requests
+    'rate_limit': float(os.getenv('OSM_RATE_LIMIT', '2')),          # max requests per second per host (0 = unlimited)
+    'retries': int(os.getenv('OSM_FETCH_RETRIES', '3')),
+    'backoff': float(os.getenv('OSM_FETCH_BACKOFF', '1'))}          # seconds, doubled on every retry
+
+# In-process geospatial index for nearby-restaurant queries (see geo_index.py)
+GEO_INDEX_CONFIG = {
+    'cell_size': float(os.getenv('GEO_CELL_SIZE', '0.01')),               # grid cell size in degrees (~1.1 km)
+    'refresh_interval': float(os.getenv('GEO_REFRESH_INTERVAL', '5')),    # seconds between incremental syncs
+    'rebuild_interval': float(os.getenv('GEO_REBUILD_INTERVAL', '3600'))}  # seconds between full reloads (drops deleted rows)
+
+# In-process occupancy engine (see occupancy.py)
+OCCUPANCY_CONFIG = {
+    'reconcile_interval': float(os.getenv('OCCUPANCY_RECONCILE_INTERVAL', '30')),  # seconds between DB reconciliation passes
+    'feed_size': int(os.getenv('OCCUPANCY_FEED_SIZE', '10000')),                   # changes kept for stream/delta clients
+    'stream_keepalive': float(os.getenv('OCCUPANCY_STREAM_KEEPALIVE', '15'))}       # seconds between SSE keepalives
+
+# /stats page cache (see stats_cache.py)
+STATS_CONFIG = {
+    'ttl': float(os.getenv('STATS_CACHE_TTL', '60'))}  # seconds
+
+# Suggestion scheduler (see scheduler.py)
+SCHEDULER_CONFIG = {
+    'strategy': os.getenv('SUGGEST_STRATEGY', 'least_rate'),       # least_rate, power_of_two, weighted_free, predicted_load
+    'pending_ttl': float(os.getenv('SUGGEST_PENDING_TTL', '120')),  # seconds a suggestion counts against a restaurant
+    'pending_seats': int(os.getenv('SUGGEST_PENDING_SEATS', '2')),  # seats assumed per pending suggestion
+    'busy_weight': float(os.getenv('SUGGEST_BUSY_WEIGHT', '0.5')),  # weight of the busy_hours score in predicted_load
+    'busy_refresh': float(os.getenv('SUGGEST_BUSY_REFRESH', '3600'))}  # seconds between busy_hours reloads
+
+# /api/restaurants listing
+RESTAURANT_LIST_CONFIG = {
+    'page_size': int(os.getenv('RESTAURANT_PAGE_SIZE', '20')),
+    'max_page_size': int(os.getenv('RESTAURANT_MAX_PAGE_SIZE', '200'))}
+
+# In-process restaurant/menu search index (see search_index.py)
+SEARCH_CONFIG = {
+    'refresh_interval': float(os.getenv('SEARCH_REFRESH_INTERVAL', '5')),     # seconds between incremental syncs
+    'rebuild_interval': float(os.getenv('SEARCH_REBUILD_INTERVAL', '3600')),  # seconds between full rebuilds
+    'capacity_weight': float(os.getenv('SEARCH_CAPACITY_WEIGHT', '1.0')),     # boost for restaurants with free seats
+    'max_expansions': int(os.getenv('SEARCH_MAX_EXPANSIONS', '50'))}          # terms a prefix may expand to
+
+# Read-through cache for menus, reviews and categories (see read_cache.py)
+READ_CACHE_CONFIG = {
+    'max_entries': int(os.getenv('READ_CACHE_SIZE', '4096')),
+    'ttls': {                                                       # seconds, per namespace
+        'categories': float(os.getenv('READ_CACHE_TTL_CATEGORIES', '3600')),
+        'menu': float(os.getenv('READ_CACHE_TTL_MENU', '600')),
+        'reviews': float(os.getenv('READ_CACHE_TTL_REVIEWS', '120'))},
+    'default_ttl': float(os.getenv('READ_CACHE_TTL', '300')),
+    # Optional SQLite file shared by all workers on the host; empty = per-process only
+    'shared_path': os.getenv('READ_CACHE_SHARED_PATH', ''),
+    'generation_ttl': float(os.getenv('READ_CACHE_GENERATION_TTL', '1'))}  # shared store only: max delay before other workers see an invalidation
+
+# Login/registration data path (see auth_store.py)
+AUTH_CONFIG = {
+    # Threads that run password hashing/verification; caps the CPU a login burst can take
+    'hash_workers': int(os.getenv('AUTH_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2)))),
+    'hash_queue': int(os.getenv('AUTH_HASH_QUEUE', '64')),          # queued hashes before logins are turned away
+    'hash_timeout': float(os.getenv('AUTH_HASH_TIMEOUT', '5'))}     # seconds a request waits for its hash
+
+# Server-side sessions (see session_store.py)
+SESSION_CONFIG = {
+    'backend': os.getenv('SESSION_BACKEND', 'cookie'),             # cookie (Flask default), sqlite (shared by workers) or memory (one worker only)
+    'path': os.getenv('SESSION_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions.sqlite3')),
+    'ttl': float(os.getenv('SESSION_TTL', str(7 * 86400))),         # seconds of inactivity before a session expires
+    'max_sessions': int(os.getenv('SESSION_MAX', '100000')),        # memory backend only; least recently written are evicted
+    'sweep_interval': float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))}  # seconds between expired-session sweeps
+
+# Write-behind booking queue (see booking_queue.py)
+BOOKING_QUEUE_CONFIG = {
+    'enabled': os.getenv('BOOKING_WRITE_BEHIND', '0') == '1',     # confirm in memory, write reservations to MySQL in batches
+    'path': os.getenv('BOOKING_QUEUE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'booking_queue.sqlite3')),
+    'batch_size': int(os.getenv('BOOKING_QUEUE_BATCH', '500')),     # reservations per MySQL commit
+    'flush_interval': float(os.getenv('BOOKING_QUEUE_FLUSH_INTERVAL', '0.05'))}  # seconds between flushes
+
+# Application-level activity logging (see activity_log.py)
+ACTIVITY_LOG_CONFIG = {
+    'batch_size': int(os.getenv('ACTIVITY_LOG_BATCH', '200')),              # events per multi-row INSERT
+    'flush_interval': float(os.getenv('ACTIVITY_LOG_FLUSH_INTERVAL', '1')),  # seconds between flushes
+    'max_buffer': int(os.getenv('ACTIVITY_LOG_MAX_BUFFER', '10000')),        # events kept while MySQL is unavailable
+    'retention_months': int(os.getenv('ACTIVITY_LOG_RETENTION_MONTHS', '12')),  # older months are rolled up and dropped
+    'months_ahead': int(os.getenv('ACTIVITY_LOG_MONTHS_AHEAD', '3'))}        # monthly partitions created in advance
@@ -1,22 +1,26 @@
-
 # Create a new file: database.py
 
 import mysql.connector
-from config import DB_CONFIG
+import db_pool
+import occupancy
+from read_cache import cache
 from datetime import datetime, timedelta
 
 def get_db_connection():
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return db_pool.get_connection()
     except mysql.connector.Error as e:
         print(f"Database connection error: {e}")
         return None
 
-# Function to get restaurant categories
+# Function to get restaurant categories (cached, see read_cache.py)
 def get_restaurant_categories():
+    return cache.get('categories', None, (), _load_restaurant_categories) or []
+
+def _load_restaurant_categories():
     conn = get_db_connection()
     if not conn:
-        return []
+        return None
     
     cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT * FROM restaurant_categories")
@@ -25,11 +29,14 @@ def get_restaurant_categories():
     conn.close()
     return categories
 
-# Function to get restaurant menu items
+# Function to get restaurant menu items (cached until the menu changes or the TTL runs out)
 def get_restaurant_menu(restaurant_id):
+    return cache.get('menu', restaurant_id, (), lambda: _load_restaurant_menu(restaurant_id)) or []
+
+def _load_restaurant_menu(restaurant_id):
     conn = get_db_connection()
     if not conn:
-        return []
+        return None
     
     cursor = conn.cursor(dictionary=True)
     cursor.execute("""
@@ -42,50 +49,145 @@ def get_restaurant_menu(restaurant_id):
     conn.close()
     return menu_items
 
-# Function to find available time slots
-def find_available_slots(restaurant_id, date_str, party_size):
+# Function to add or update a menu item; returns the item id or None
+def save_menu_item(restaurant_id, name, price, description=None, is_vegetarian=False, is_available=True,
+                   item_id=None):
     conn = get_db_connection()
     if not conn:
-        return []
-    
+        return None
+
+    cursor = conn.cursor()
+    try:
+        if item_id is None:
+            cursor.execute("""
+                INSERT INTO menu_items (restaurant_id, name, description, price, is_vegetarian, is_available)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (restaurant_id, name, description, price, is_vegetarian, is_available))
+            item_id = cursor.lastrowid
+        else:
+            cursor.execute("""
+                UPDATE menu_items
+                SET name = %s, description = %s, price = %s, is_vegetarian = %s, is_available = %s
+                WHERE item_id = %s AND restaurant_id = %s
+            """, (name, description, price, is_vegetarian, is_available, item_id, restaurant_id))
+        conn.commit()
+    except mysql.connector.Error as e:
+        print(f"Error saving menu item: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+    cache.invalidate('menu', restaurant_id)
+    return item_id
+
+# Function to delete a menu item
+def delete_menu_item(restaurant_id, item_id):
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM menu_items WHERE item_id = %s AND restaurant_id = %s", (item_id, restaurant_id))
+        conn.commit()
+    except mysql.connector.Error as e:
+        print(f"Error deleting menu item: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+    cache.invalidate('menu', restaurant_id)
+    return True
+
+# Function to get slot availability for a range of dates in one call.
+# Returns {date: [slot, ...]} where each slot carries seats_taken, seats_left and
+# available (room for party_size). Two queries regardless of the number of dates:
+# the restaurant's time slots, and seats taken grouped by (slot_id, reservation_date).
+def get_slot_availability(restaurant_id, start_date, end_date, party_size):
+    conn = get_db_connection()
+    if not conn:
+        return {}
+
     cursor = conn.cursor(dictionary=True)
-    
+    try:
+        cursor.execute("""
+            SELECT slot_id, start_time, end_time, max_capacity, day_of_week
+            FROM time_slots
+            WHERE restaurant_id = %s
+            ORDER BY start_time
+        """, (restaurant_id,))
+        slots_by_day = {}
+        for slot in cursor.fetchall():
+            slots_by_day.setdefault(slot['day_of_week'], []).append(slot)
+
+        cursor.execute("""
+            SELECT slot_id, reservation_date, SUM(num_people) AS seats_taken
+            FROM reservations
+            WHERE restaurant_id = %s
+            AND reservation_date BETWEEN %s AND %s
+            AND status != 'Cancelled'
+            GROUP BY slot_id, reservation_date
+        """, (restaurant_id, start_date, end_date))
+        seats_taken = {(row['slot_id'], row['reservation_date']): int(row['seats_taken'])
+                       for row in cursor.fetchall()}
+    except mysql.connector.Error as e:
+        print(f"Error fetching availability: {e}")
+        return {}
+    finally:
+        cursor.close()
+        conn.close()
+
+    availability = {}
+    day = start_date
+    while day <= end_date:
+        day_slots = []
+        for slot in slots_by_day.get(day.weekday() + 1, ()):  # 1=Monday, 7=Sunday
+            taken = seats_taken.get((slot['slot_id'], day), 0)
+            seats_left = slot['max_capacity'] - taken
+            day_slots.append({
+                'slot_id': slot['slot_id'],
+                'start_time': slot['start_time'],
+                'end_time': slot['end_time'],
+                'max_capacity': slot['max_capacity'],
+                'seats_taken': taken,
+                'seats_left': max(seats_left, 0),
+                'available': seats_left >= party_size,
+            })
+        availability[day] = day_slots
+        day += timedelta(days=1)
+    return availability
+
+# Function to find available time slots
+def find_available_slots(restaurant_id, date_str, party_size):
     # Convert date string to date object
     try:
         booking_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        day_of_week = booking_date.weekday() + 1  # 1=Monday, 7=Sunday
     except ValueError:
         return []
-    
-    # Use stored procedure if available, otherwise use direct query
-    try:
-        cursor.callproc('FindAvailableTables', (restaurant_id, booking_date, party_size))
-        for result in cursor.stored_results():
-            available_slots = result.fetchall()
-            cursor.close()
-            conn.close()
-            return available_slots
-    except mysql.connector.Error:
-        # Fallback to direct query if stored procedure doesn't exist
-        cursor.execute("""
-            SELECT ts.slot_id, ts.start_time, ts.end_time, ts.max_capacity 
-            FROM time_slots ts
-            WHERE ts.restaurant_id = %s
-            AND ts.day_of_week = %s
-            AND (
-                SELECT COUNT(*) FROM reservations r
-                WHERE r.slot_id = ts.slot_id
-                AND r.reservation_date = %s
-            ) + %s <= ts.max_capacity
-        """, (restaurant_id, day_of_week, booking_date, party_size))
-        
-        available_slots = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return available_slots
 
-# Function to add a restaurant review
+    slots = get_slot_availability(restaurant_id, booking_date, booking_date, party_size).get(booking_date, [])
+    return [
+        {'slot_id': s['slot_id'], 'start_time': s['start_time'], 'end_time': s['end_time'],
+         'max_capacity': s['max_capacity']}
+        for s in slots if s['available']
+    ]
+
+# Function to add a restaurant review; rating must be a whole number of stars from 1 to 5
 def add_review(user_id, restaurant_id, rating, review_text):
+    try:
+        stars = int(rating)
+    except (TypeError, ValueError):
+        stars = None
+    # int() would quietly truncate 4.5, so the value must also round-trip
+    if stars is None or stars != float(rating) or not 1 <= stars <= 5:
+        print(f"Error adding review: invalid rating {rating!r}")
+        return False
+    rating = stars
+
     conn = get_db_connection()
     if not conn:
         return False
@@ -96,9 +198,21 @@ def add_review(user_id, restaurant_id, rating, review_text):
             INSERT INTO reviews (user_id, restaurant_id, rating, review_text)
             VALUES (%s, %s, %s, %s)
         """, (user_id, restaurant_id, rating, review_text))
+        # Keep the materialized rating aggregates in step, in the same transaction
+        cursor.execute("""
+            UPDATE restaurants
+            SET rating_sum = rating_sum + %s, rating_count = rating_count + 1
+            WHERE restaurant_id = %s
+        """, (rating, restaurant_id))
+        cursor.execute("""
+            INSERT INTO restaurant_rating_stats (restaurant_id, rating, review_count)
+            VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE review_count = review_count + 1
+        """, (restaurant_id, rating))
         conn.commit()
         cursor.close()
         conn.close()
+        cache.invalidate('reviews', restaurant_id)
         return True
     except mysql.connector.Error as e:
         print(f"Error adding review: {e}")
@@ -107,27 +221,96 @@ def add_review(user_id, restaurant_id, rating, review_text):
         conn.close()
         return False
 
-# Function to get restaurant reviews
-def get_restaurant_reviews(restaurant_id):
+# Function to get one page of restaurant reviews, newest first.
+# after is the (review_date, review_id) of the last review already shown; each page is a
+# range scan on idx_reviews_restaurant_date however deep it is, and is cached separately.
+def get_restaurant_reviews(restaurant_id, after=None, page_size=20):
+    page_size = max(min(page_size, 101), 1)  # 100 plus the caller's has-more row
+    after = tuple(after) if after else None
+    return cache.get('reviews', restaurant_id, ('page', after, page_size),
+                     lambda: _load_review_page(restaurant_id, after, page_size)) or []
+
+def _load_review_page(restaurant_id, after, page_size):
     conn = get_db_connection()
     if not conn:
-        return []
+        return None
     
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
+    query = """
         SELECT r.review_id, r.rating, r.review_text, r.review_date,
                u.name as user_name
         FROM reviews r
         JOIN users u ON r.user_id = u.user_id
         WHERE r.restaurant_id = %s
-        ORDER BY r.review_date DESC
-    """, (restaurant_id,))
-    
+    """
+    params = [restaurant_id]
+    if after:
+        query += " AND (r.review_date < %s OR (r.review_date = %s AND r.review_id < %s))"
+        params.extend((after[0], after[0], after[1]))
+    query += " ORDER BY r.review_date DESC, r.review_id DESC LIMIT %s"
+    params.append(page_size)
+
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query, tuple(params))
     reviews = cursor.fetchall()
     cursor.close()
     conn.close()
     return reviews
 
+# Function to get a restaurant's review count, average and 1-5 star histogram
+# from the precomputed counters (no scan over reviews)
+def get_review_summary(restaurant_id):
+    return cache.get('reviews', restaurant_id, ('summary',),
+                     lambda: _load_review_summary(restaurant_id)) or {}
+
+def _load_review_summary(restaurant_id):
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT rating, review_count FROM restaurant_rating_stats
+        WHERE restaurant_id = %s
+    """, (restaurant_id,))
+    histogram = {rating: 0 for rating in range(1, 6)}
+    for rating, count in cursor.fetchall():
+        histogram[rating] = count
+    cursor.close()
+    conn.close()
+
+    count = sum(histogram.values())
+    average = sum(rating * n for rating, n in histogram.items()) / count if count else 0
+    return {'review_count': count, 'average_rating': round(average, 2), 'histogram': histogram}
+
+# Function to stream every review (optionally of one restaurant) for bulk exports.
+# Rows come from an unbuffered (server-side) cursor one at a time instead of being
+# loaded into memory; returns a RowStream, or None on a database error.
+def export_reviews(restaurant_id=None):
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    query = """
+        SELECT r.review_id, r.restaurant_id, r.user_id, r.rating, r.review_text, r.review_date
+        FROM reviews r
+    """
+    params = ()
+    if restaurant_id is not None:
+        query += " WHERE r.restaurant_id = %s ORDER BY r.review_date DESC, r.review_id DESC"
+        params = (restaurant_id,)
+    else:
+        query += " ORDER BY r.review_id"
+
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params)
+    except mysql.connector.Error as e:
+        print(f"Error exporting reviews: {e}")
+        cursor.close()
+        conn.close()
+        return None
+    return RowStream(conn, cursor)
+
 # Function to get advanced restaurant suggestions (load balancing)
 def suggest_restaurants(city=None, category_id=None, max_results=5):
     conn = get_db_connection()
@@ -135,6 +318,27 @@ def suggest_restaurants(city=None, category_id=None, max_results=5):
         return []
     
     cursor = conn.cursor(dictionary=True)
+
+    # Unfiltered: the occupancy engine already knows the least crowded restaurants
+    least_crowded = occupancy.engine.least_crowded(max_results) if not city and not category_id else []
+    if least_crowded:
+        placeholders = ", ".join(["%s"] * len(least_crowded))
+        cursor.execute(f"""
+            SELECT 
+                r.restaurant_id, 
+                r.name, 
+                r.location,
+                r.current_occupancy,
+                r.seating_capacity,
+                r.occupancy_rate,
+                r.avg_rating
+            FROM restaurants r
+            WHERE r.restaurant_id IN ({placeholders})
+        """, tuple(least_crowded))
+        by_id = {r['restaurant_id']: r for r in cursor.fetchall()}
+        cursor.close()
+        conn.close()
+        return [by_id[restaurant_id] for restaurant_id in least_crowded if restaurant_id in by_id]
     
     # Try using stored procedure
     try:
@@ -153,12 +357,8 @@ def suggest_restaurants(city=None, category_id=None, max_results=5):
                 r.location,
                 r.current_occupancy,
                 r.seating_capacity,
-                (r.current_occupancy / r.seating_capacity) AS occupancy_rate,
-                COALESCE(
-                    (SELECT AVG(rating) FROM reviews 
-                     WHERE restaurant_id = r.restaurant_id), 
-                    0
-                ) AS avg_rating
+                r.occupancy_rate,
+                r.avg_rating
             FROM restaurants r
             WHERE 1=1
         """
@@ -174,8 +374,8 @@ def suggest_restaurants(city=None, category_id=None, max_results=5):
         
         query += """
             ORDER BY 
-                occupancy_rate ASC,
-                avg_rating DESC
+                r.occupancy_rate ASC,
+                r.avg_rating DESC
             LIMIT %s
         """
         params.append(max_results)
@@ -186,282 +386,273 @@ def suggest_restaurants(city=None, category_id=None, max_results=5):
         conn.close()
         return restaurants
 
-# Function to update busy hours prediction
-def update_busy_hours_prediction(restaurant_id):
-    conn = get_db_connection()
-    if not conn:
-        return False
-    
-    cursor = conn.cursor()
-    
-    # Calculate busyness based on reservation history
-    for day in range(7):  # 0=Sunday to 6=Saturday
-        for hour in range(10, 23):  # Typical restaurant hours 10AM to 10PM
-            # Count reservations for this day and hour over the past 4 weeks
-            four_weeks_ago = datetime.now() - timedelta(days=28)
-            
-            cursor.execute("""
-                SELECT COUNT(*) / 4 AS avg_bookings
-                FROM reservations r
-                JOIN time_slots ts ON r.slot_id = ts.slot_id
-                WHERE r.restaurant_id = %s
-                AND DAYOFWEEK(r.reservation_date) = %s  # 1=Sunday, 7=Saturday
-                AND HOUR(ts.start_time) <= %s AND HOUR(ts.end_time) > %s
-                AND r.reservation_date >= %s
-            """, (restaurant_id, (day + 1) % 7 + 1, hour, hour, four_weeks_ago))
-            
-            result = cursor.fetchone()
-            avg_bookings = result[0] if result else 0
-            
-            # Calculate busyness score (normalize to 0-1)
-            cursor.execute("""
-                SELECT MAX(seating_capacity) FROM restaurants WHERE restaurant_id = %s
-            """, (restaurant_id,))
-            max_capacity = cursor.fetchone()[0] or 50  # Default to 50 if NULL
-            
-            busyness_score = min(1.0, avg_bookings / max_capacity)
-            
-            # Update or insert busy_hours record
-            cursor.execute("""
-                INSERT INTO busy_hours (restaurant_id, day_of_week, hour_of_day, busyness_score)
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE busyness_score = %s
-            """, (restaurant_id, day, hour, busyness_score, busyness_score))
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
-# Create a new file: database.py
+class RowStream:
+    """Rows from an unbuffered cursor, read as they are iterated.
 
-import mysql.connector
-from config import DB_CONFIG
-from datetime import datetime, timedelta
+    Holds its pooled connection until the rows run out or close() is called
+    (e.g. from Response.call_on_close when a client disconnects mid-stream).
+    """
 
-def get_db_connection():
-    try:
-        return mysql.connector.connect(**DB_CONFIG)
-    except mysql.connector.Error as e:
-        print(f"Database connection error: {e}")
-        return None
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
 
-# Function to get restaurant categories
-def get_restaurant_categories():
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM restaurant_categories")
-    categories = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return categories
+    def __iter__(self):
+        try:
+            for row in self._cursor:
+                yield row
+        finally:
+            self.close()
 
-# Function to get restaurant menu items
-def get_restaurant_menu(restaurant_id):
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT * FROM menu_items 
-        WHERE restaurant_id = %s AND is_available = TRUE
-        ORDER BY name
-    """, (restaurant_id,))
-    menu_items = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return menu_items
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            self._cursor.close()
+        except mysql.connector.Error:
+            pass
+        conn.close()
 
-# Function to find available time slots
-def find_available_slots(restaurant_id, date_str, party_size):
+# Restaurants ordered by (occupancy_rate, restaurant_id), one keyset page at a time.
+# after is the (occupancy_rate, restaurant_id) of the last row already seen, so every
+# page is an index range scan no matter how deep. Returns a RowStream of up to `limit`
+# rows, or None on a database error.
+def list_restaurants(category_id=None, source=None, city=None, vegetarian=False, after=None, limit=20):
     conn = get_db_connection()
     if not conn:
-        return []
-    
-    cursor = conn.cursor(dictionary=True)
-    
-    # Convert date string to date object
-    try:
-        booking_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        day_of_week = booking_date.weekday() + 1  # 1=Monday, 7=Sunday
-    except ValueError:
-        return []
-    
-    # Use stored procedure if available, otherwise use direct query
+        return None
+
+    query = """
+        SELECT r.restaurant_id, r.name, r.location, r.city, r.source, r.category_id,
+               r.seating_capacity, r.current_occupancy, r.occupancy_rate, r.avg_rating,
+               r.latitude, r.longitude
+        FROM restaurants r
+        WHERE 1=1
+    """
+    params = []
+
+    if category_id:
+        query += " AND r.category_id = %s"
+        params.append(category_id)
+
+    if source:
+        query += " AND r.source = %s"
+        params.append(source)
+
+    if city:
+        query += " AND r.city = %s"
+        params.append(city)
+
+    if vegetarian:
+        query += """
+            AND EXISTS (SELECT 1 FROM menu_items m
+                        WHERE m.restaurant_id = r.restaurant_id
+                        AND m.is_vegetarian = TRUE AND m.is_available = TRUE)
+        """
+
+    if after:
+        query += " AND (r.occupancy_rate > %s OR (r.occupancy_rate = %s AND r.restaurant_id > %s))"
+        params.extend((after[0], after[0], after[1]))
+
+    query += " ORDER BY r.occupancy_rate, r.restaurant_id LIMIT %s"
+    params.append(limit)
+
+    # Unbuffered: rows are pulled from the server as the response is written
+    cursor = conn.cursor(dictionary=True, buffered=False)
     try:
-        cursor.callproc('FindAvailableTables', (restaurant_id, booking_date, party_size))
-        for result in cursor.stored_results():
-            available_slots = result.fetchall()
-            cursor.close()
-            conn.close()
-            return available_slots
-    except mysql.connector.Error:
-        # Fallback to direct query if stored procedure doesn't exist
-        cursor.execute("""
-            SELECT ts.slot_id, ts.start_time, ts.end_time, ts.max_capacity 
-            FROM time_slots ts
-            WHERE ts.restaurant_id = %s
-            AND ts.day_of_week = %s
-            AND (
-                SELECT COUNT(*) FROM reservations r
-                WHERE r.slot_id = ts.slot_id
-                AND r.reservation_date = %s
-            ) + %s <= ts.max_capacity
-        """, (restaurant_id, day_of_week, booking_date, party_size))
-        
-        available_slots = cursor.fetchall()
+        cursor.execute(query, tuple(params))
+    except mysql.connector.Error as e:
+        print(f"Error listing restaurants: {e}")
         cursor.close()
         conn.close()
-        return available_slots
+        return None
+    return RowStream(conn, cursor)
 
-# Function to add a restaurant review
-def add_review(user_id, restaurant_id, rating, review_text):
+BUSY_HOURS = range(10, 23)  # Typical restaurant hours 10AM to 10PM
+BUSY_HOURS_WEEKS = 4
+
+# Build busy_hours rows for one restaurant from grouped slot counts.
+# slot_counts holds (day, start_hour, end_hour, bookings) with day = WEEKDAY() (0=Monday).
+# A reservation counts towards every hour its slot covers (start <= hour < end), so we
+# add +bookings at the start hour and -bookings at the end hour and take a running sum.
+def _busy_hours_rows(restaurant_id, seating_capacity, slot_counts):
+    max_capacity = seating_capacity or 50  # Default to 50 if NULL
+    diff = [[0] * 25 for _ in range(7)]
+    for day, start_hour, end_hour, bookings in slot_counts:
+        if day is None or start_hour is None or end_hour is None or end_hour <= start_hour:
+            continue
+        diff[day][start_hour] += bookings
+        diff[day][end_hour] -= bookings
+
+    rows = []
+    for day in range(7):
+        running = 0
+        for hour in range(24):
+            running += diff[day][hour]
+            if hour in BUSY_HOURS:
+                avg_bookings = running / BUSY_HOURS_WEEKS
+                rows.append((restaurant_id, day, hour, min(1.0, avg_bookings / max_capacity)))
+    return rows
+
+def _write_busy_hours(cursor, rows, batch_size=1000):
+    for i in range(0, len(rows), batch_size):
+        cursor.executemany("""
+            INSERT INTO busy_hours (restaurant_id, day_of_week, hour_of_day, busyness_score)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE busyness_score = VALUES(busyness_score)
+        """, rows[i:i + batch_size])
+
+# Function to update busy hours prediction
+def update_busy_hours_prediction(restaurant_id):
     conn = get_db_connection()
     if not conn:
         return False
-    
+
     cursor = conn.cursor()
+    four_weeks_ago = datetime.now() - timedelta(days=7 * BUSY_HOURS_WEEKS)
     try:
+        cursor.execute("SELECT seating_capacity FROM restaurants WHERE restaurant_id = %s", (restaurant_id,))
+        restaurant = cursor.fetchone()
+        if restaurant is None:
+            return False
+
+        # One pass over the last four weeks, grouped by weekday and slot hours
         cursor.execute("""
-            INSERT INTO reviews (user_id, restaurant_id, rating, review_text)
-            VALUES (%s, %s, %s, %s)
-        """, (user_id, restaurant_id, rating, review_text))
+            SELECT WEEKDAY(r.reservation_date), HOUR(ts.start_time), HOUR(ts.end_time), COUNT(*)
+            FROM reservations r
+            JOIN time_slots ts ON r.slot_id = ts.slot_id
+            WHERE r.restaurant_id = %s
+            AND r.reservation_date >= %s
+            GROUP BY 1, 2, 3
+        """, (restaurant_id, four_weeks_ago))
+
+        _write_busy_hours(cursor, _busy_hours_rows(restaurant_id, restaurant[0], cursor.fetchall()))
         conn.commit()
-        cursor.close()
-        conn.close()
         return True
     except mysql.connector.Error as e:
-        print(f"Error adding review: {e}")
+        print(f"Error updating busy hours: {e}")
         conn.rollback()
+        return False
+    finally:
         cursor.close()
         conn.close()
-        return False
 
-# Function to get restaurant reviews
-def get_restaurant_reviews(restaurant_id):
+# Function to update busy hours prediction for every restaurant in one pass
+def update_all_busy_hours_predictions():
     conn = get_db_connection()
     if not conn:
-        return []
-    
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT r.review_id, r.rating, r.review_text, r.review_date,
-               u.name as user_name
-        FROM reviews r
-        JOIN users u ON r.user_id = u.user_id
-        WHERE r.restaurant_id = %s
-        ORDER BY r.review_date DESC
-    """, (restaurant_id,))
-    
-    reviews = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return reviews
+        return False
 
-# Function to get advanced restaurant suggestions (load balancing)
-def suggest_restaurants(city=None, category_id=None, max_results=5):
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
-    cursor = conn.cursor(dictionary=True)
-    
-    # Try using stored procedure
+    cursor = conn.cursor()
+    four_weeks_ago = datetime.now() - timedelta(days=7 * BUSY_HOURS_WEEKS)
     try:
-        cursor.callproc('SuggestRestaurants', (city, max_results, category_id))
-        for result in cursor.stored_results():
-            restaurants = result.fetchall()
-            cursor.close()
-            conn.close()
-            return restaurants
-    except mysql.connector.Error:
-        # Fallback to direct query
-        query = """
-            SELECT 
-                r.restaurant_id, 
-                r.name, 
-                r.location,
-                r.current_occupancy,
-                r.seating_capacity,
-                (r.current_occupancy / r.seating_capacity) AS occupancy_rate,
-                COALESCE(
-                    (SELECT AVG(rating) FROM reviews 
-                     WHERE restaurant_id = r.restaurant_id), 
-                    0
-                ) AS avg_rating
-            FROM restaurants r
-            WHERE 1=1
-        """
-        params = []
-        
-        if city:
-            query += " AND r.location LIKE %s"
-            params.append(f"%{city}%")
-        
-        if category_id:
-            query += " AND r.category_id = %s"
-            params.append(category_id)
-        
-        query += """
-            ORDER BY 
-                occupancy_rate ASC,
-                avg_rating DESC
-            LIMIT %s
-        """
-        params.append(max_results)
-        
-        cursor.execute(query, tuple(params))
+        cursor.execute("SELECT restaurant_id, seating_capacity FROM restaurants")
         restaurants = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT r.restaurant_id, WEEKDAY(r.reservation_date), HOUR(ts.start_time), HOUR(ts.end_time), COUNT(*)
+            FROM reservations r
+            JOIN time_slots ts ON r.slot_id = ts.slot_id
+            WHERE r.reservation_date >= %s
+            GROUP BY 1, 2, 3, 4
+        """, (four_weeks_ago,))
+        slot_counts = {}
+        for restaurant_id, day, start_hour, end_hour, bookings in cursor.fetchall():
+            slot_counts.setdefault(restaurant_id, []).append((day, start_hour, end_hour, bookings))
+
+        rows = []
+        for restaurant_id, seating_capacity in restaurants:
+            rows.extend(_busy_hours_rows(restaurant_id, seating_capacity, slot_counts.get(restaurant_id, ())))
+        _write_busy_hours(cursor, rows)
+        conn.commit()
+        return True
+    except mysql.connector.Error as e:
+        print(f"Error updating busy hours: {e}")
+        conn.rollback()
+        return False
+    finally:
         cursor.close()
         conn.close()
-        return restaurants
 
-# Function to update busy hours prediction
-def update_busy_hours_prediction(restaurant_id):
+# Location string used for OSM restaurants
+def osm_location(restaurant):
+    return f"Lat: {restaurant['lat']}, Lon: {restaurant['lon']}"
+
+# OSM restaurants are identified by their stable OSM element type/id
+def osm_restaurant_key(restaurant):
+    return (restaurant['osm_type'], restaurant['osm_id'])
+
+# Function to bulk save OSM restaurants, returns {osm_restaurant_key: restaurant_id}.
+# city is the city they were searched under; it is stored for new rows and rows without one.
+def save_osm_restaurants(restaurants, city=None):
+    by_key = {osm_restaurant_key(r): r for r in restaurants}
+    if not by_key:
+        return {}
+
     conn = get_db_connection()
     if not conn:
-        return False
-    
+        return {}
+
     cursor = conn.cursor()
-    
-    # Calculate busyness based on reservation history
-    for day in range(7):  # 0=Sunday to 6=Saturday
-        for hour in range(10, 23):  # Typical restaurant hours 10AM to 10PM
-            # Count reservations for this day and hour over the past 4 weeks
-            four_weeks_ago = datetime.now() - timedelta(days=28)
-            
-            cursor.execute("""
-                SELECT COUNT(*) / 4 AS avg_bookings
-                FROM reservations r
-                JOIN time_slots ts ON r.slot_id = ts.slot_id
-                WHERE r.restaurant_id = %s
-                AND DAYOFWEEK(r.reservation_date) = %s  # 1=Sunday, 7=Saturday
-                AND HOUR(ts.start_time) <= %s AND HOUR(ts.end_time) > %s
-                AND r.reservation_date >= %s
-            """, (restaurant_id, (day + 1) % 7 + 1, hour, hour, four_weeks_ago))
-            
-            result = cursor.fetchone()
-            avg_bookings = result[0] if result else 0
-            
-            # Calculate busyness score (normalize to 0-1)
-            cursor.execute("""
-                SELECT MAX(seating_capacity) FROM restaurants WHERE restaurant_id = %s
-            """, (restaurant_id,))
-            max_capacity = cursor.fetchone()[0] or 50  # Default to 50 if NULL
-            
-            busyness_score = min(1.0, avg_bookings / max_capacity)
-            
-            # Update or insert busy_hours record
-            cursor.execute("""
-                INSERT INTO busy_hours (restaurant_id, day_of_week, hour_of_day, busyness_score)
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE busyness_score = %s
-            """, (restaurant_id, day, hour, busyness_score, busyness_score))
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        def fetch_ids(wanted):
+            placeholders = ", ".join(["(%s, %s)"] * len(wanted))
+            cursor.execute(f"""
+                SELECT restaurant_id, osm_type, osm_id FROM restaurants
+                WHERE (osm_type, osm_id) IN ({placeholders})
+            """, tuple(value for key in wanted for value in key))
+            return {(osm_type, osm_id): restaurant_id for restaurant_id, osm_type, osm_id in cursor.fetchall()}
+
+        # Resolve everything we already have in one query
+        ids = fetch_ids(list(by_key))
+        missing = [key for key in by_key if key not in ids]
+
+        if missing:
+            # Rows saved before OSM ids were tracked have no id yet: adopt them by name and
+            # location in one UPDATE. The condition repeats uniq_restaurant_identity's first
+            # key part so the lookup uses that index.
+            placeholders = " UNION ALL ".join(["SELECT %s AS name, %s AS location, %s AS osm_type, %s AS osm_id"] * len(missing))
+            params = []
+            for key in missing:
+                r = by_key[key]
+                params.extend((r['name'], osm_location(r), r['osm_type'], r['osm_id']))
+            cursor.execute(f"""
+                UPDATE restaurants r
+                JOIN ({placeholders}) m
+                    ON IF(r.osm_id IS NULL, r.source, NULL) = 'osm' AND r.name = m.name AND r.location = m.location
+                SET r.osm_type = m.osm_type, r.osm_id = m.osm_id, r.city = COALESCE(r.city, %s)
+            """, tuple(params) + (city,))
+            if cursor.rowcount:
+                ids.update(fetch_ids(missing))
+                missing = [key for key in missing if key not in ids]
 
-    return True
\ No newline at end of file
+        if missing:
+            # One multi-row insert. OSM rows are unique by (osm_type, osm_id) only, so two
+            # elements with the same name and coordinates get a row each; a row inserted
+            # concurrently by another process is a no-op apart from the coordinates.
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, 50, 0, 'Menu not available', 'osm', %s, %s)"] * len(missing))
+            params = []
+            for key in missing:
+                r = by_key[key]
+                params.extend((r['name'], osm_location(r), city, r['lat'], r['lon'], r['osm_type'], r['osm_id']))
+            cursor.execute(f"""
+                INSERT INTO restaurants (name, location, city, latitude, longitude, seating_capacity, current_occupancy,
+                                         menu, source, osm_type, osm_id)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE latitude = VALUES(latitude), longitude = VALUES(longitude),
+                                        city = COALESCE(city, VALUES(city))
+            """, tuple(params))
+            ids.update(fetch_ids(missing))
+
+        conn.commit()
+        return ids
+    except mysql.connector.Error as e:
+        print(f"Error saving OSM restaurants: {e}")
+        conn.rollback()
+        return {}
+    finally:
+        cursor.close()
+        conn.close()
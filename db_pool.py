@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+from config import DB_CONFIG, DB_POOL_CONFIG
+
+
+class PooledConnection:
+    """Thin wrapper around a MySQL connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to pool")
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, db_config, size=10, timeout=5.0, ping_on_borrow=True, recycle=3600):
+        self.db_config = dict(db_config)
+        self.size = size
+        self.timeout = timeout
+        self.ping_on_borrow = ping_on_borrow
+        self.recycle = recycle
+
+        self._idle = deque()  # (raw connection, created_at)
+        self._opened = 0
+        self._cond = threading.Condition()
+
+        # Stats
+        self._in_use = 0
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recycled = 0
+        self._failed_pings = 0
+
+    def get_connection(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        raw = created_at = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    # Reserve a slot; the connection is opened outside the lock
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._checkout_failures += 1
+                    raise PoolError(f"No connection available within {self.timeout}s "
+                                    f"(pool size {self.size})")
+                self._cond.wait(remaining)
+
+        if raw is not None and not self._is_usable(raw, created_at):
+            self._discard(raw, release_slot=False)
+            raw = None
+
+        if raw is None:
+            try:
+                raw = mysql.connector.connect(**self.db_config)
+                created_at = time.monotonic()
+            except mysql.connector.Error:
+                with self._cond:
+                    self._opened -= 1
+                    self._checkout_failures += 1
+                    self._cond.notify()
+                raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return PooledConnection(self, raw, created_at)
+
+    def _is_usable(self, raw, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._recycled += 1
+            return False
+        if self.ping_on_borrow:
+            try:
+                raw.ping(reconnect=False)
+            except mysql.connector.Error:
+                with self._cond:
+                    self._failed_pings += 1
+                return False
+        return True
+
+    def _discard(self, raw, release_slot=True):
+        try:
+            raw.close()
+        except mysql.connector.Error:
+            pass
+        if release_slot:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+
+    def _release(self, raw, created_at):
+        # Never hand out a connection with a half-finished transaction
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except mysql.connector.Error:
+            with self._cond:
+                self._in_use -= 1
+            self._discard(raw)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((raw, created_at))
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._opened -= len(idle)
+        for raw, _ in idle:
+            try:
+                raw.close()
+            except mysql.connector.Error:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'checkout_failures': self._checkout_failures,
+                'wait_time_total': round(self._wait_total, 6),
+                'wait_time_avg': round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                'wait_time_max': round(self._wait_max, 6),
+                'recycled': self._recycled,
+                'failed_pings': self._failed_pings,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+    return _pool
+
+
+# Shared entry point used by app.py, auth.py and database.py.
+# Raises mysql.connector.Error (PoolError on checkout timeout).
+def get_connection():
+    return get_pool().get_connection()
+
+
+def pool_stats():
+    return get_pool().stats()
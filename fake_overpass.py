@@ -0,0 +1,150 @@
+# Local stand-in for the Overpass API, for exercising osm_api / osm_prefetch
+# without hitting overpass-api.de.
+#
+# Answers the queries built by osm_api.build_query with deterministic synthetic
+# restaurants (the same city or bounding box always gets the same elements) and
+# can add latency and throttling errors.
+#
+#   python fake_overpass.py --port 8099 --latency 0.2 --fail-rate 0.1
+#   OVERPASS_URL=http://127.0.0.1:8099/api/interpreter python osm_prefetch.py --cities Pune Mumbai
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+AREA_RE = re.compile(r'area\["name"="([^"]*)"\]')
+BBOX_RE = re.compile(r'\((-?[\d.]+),(-?[\d.]+),(-?[\d.]+),(-?[\d.]+)\)')
+OUT_RE = re.compile(r'out center (\d+)')
+TYPES = ('node', 'way', 'relation')
+
+
+# Same target -> same elements, so repeated fetches are idempotent in the database
+def synthetic_elements(target, count):
+    rng = random.Random(zlib.crc32(target.encode()))
+    south, west = rng.uniform(8, 30), rng.uniform(68, 90)
+    base_id = zlib.crc32(target.encode()) * 1000
+    elements = []
+    for i in range(count):
+        element_type = TYPES[i % 3]
+        lat, lon = south + rng.uniform(0, 0.2), west + rng.uniform(0, 0.2)
+        element = {'type': element_type, 'id': base_id + i, 'tags': {'amenity': 'restaurant', 'name': f"{target} Diner {i}"}}
+        if element_type == 'node':
+            element.update(lat=lat, lon=lon)
+        else:
+            element['center'] = {'lat': lat, 'lon': lon}
+        elements.append(element)
+    return elements
+
+
+@lru_cache(maxsize=64)
+def response_body(target, count):
+    return json.dumps({'version': 0.6, 'generator': 'fake_overpass',
+                       'elements': synthetic_elements(target, count)}).encode()
+
+
+class FakeOverpassHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query).get('data', [''])[0]
+        area = AREA_RE.search(query)
+        bbox = BBOX_RE.search(query)
+        limit = OUT_RE.search(query)
+        target = area.group(1) if area else ','.join(bbox.groups()) if bbox else ''
+        count = min(server.elements, int(limit.group(1))) if limit else server.elements
+
+        with server.lock:
+            server.requests += 1
+            server.request_times.append(time.monotonic())
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            fail = server.requests <= server.fail_first or target in server.fail_targets
+        try:
+            time.sleep(server.latency)
+            if fail or (server.fail_rate and server.rng.random() < server.fail_rate):
+                self.send_failure()
+            else:
+                self.send_elements(target, count)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def send_failure(self):
+        # Alternate between throttling and gateway errors, like the real service under load
+        self.send_response(self.server.fail_status or (429 if self.server.rng.random() < 0.5 else 503))
+        if self.server.retry_after is not None:
+            self.send_header('Retry-After', self.server.retry_after)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_elements(self, target, count):
+        server = self.server
+        body = response_body(target, count)
+        # Chunked, so clients see the body arrive in pieces as they do from Overpass
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for start in range(0, len(body), server.chunk_size):
+            chunk = body[start:start + server.chunk_size]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_server(port=0, latency=0.0, fail_rate=0.0, elements=20, chunk_size=4096, seed=0, verbose=False,
+                 fail_first=0, fail_targets=(), retry_after='0', fail_status=None):
+    """Start a fake Overpass server in a background thread; returns (server, url).
+
+    Besides the random `fail_rate`, the first `fail_first` requests and every request
+    for a city / bounding box in `fail_targets` fail, with `fail_status` or else a
+    random 429/503. Failures carry `retry_after` as their Retry-After header (None to
+    leave it out). The server records its requests (`requests`, `request_times`) and
+    the most it handled at once (`max_active`).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOverpassHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.elements = elements
+    server.chunk_size = chunk_size
+    server.verbose = verbose
+    server.rng = random.Random(seed)
+    server.fail_first = fail_first
+    server.fail_targets = set(fail_targets)
+    server.retry_after = retry_after
+    server.fail_status = fail_status
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.request_times = []
+    server.active = 0
+    server.max_active = 0
+    threading.Thread(target=server.serve_forever, name='fake-overpass', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/interpreter"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake Overpass API server")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="share of requests answered with 429/503")
+    parser.add_argument('--elements', type=int, default=20, help="restaurants per city or bounding box")
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.latency, args.fail_rate, args.elements, verbose=True)
+    print(f"Fake Overpass listening on {url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
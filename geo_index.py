@@ -0,0 +1,249 @@
+import heapq
+import math
+import threading
+import time
+
+import mysql.connector
+import db_pool
+import occupancy
+from config import GEO_INDEX_CONFIG
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoGridIndex:
+    """Fixed-size lat/lon grid of restaurants for radius queries.
+
+    Each restaurant lives in exactly one cell; a radius query only looks at the
+    cells overlapping the query's bounding box.
+    """
+
+    def __init__(self, cell_size=0.01):
+        self.cell_size = cell_size
+        self._cells = {}   # (lat_idx, lon_idx) -> set of restaurant ids
+        self._rows = {}    # restaurant_id -> row dict
+        self._cell_of = {}  # restaurant_id -> cell
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def upsert(self, row):
+        restaurant_id = row['restaurant_id']
+        cell = self._cell(row['latitude'], row['longitude'])
+        old_cell = self._cell_of.get(restaurant_id)
+        if old_cell != cell:
+            if old_cell is not None:
+                self._discard_from_cell(restaurant_id, old_cell)
+            self._cells.setdefault(cell, set()).add(restaurant_id)
+            self._cell_of[restaurant_id] = cell
+        self._rows[restaurant_id] = row
+
+    def remove(self, restaurant_id):
+        cell = self._cell_of.pop(restaurant_id, None)
+        if cell is not None:
+            self._discard_from_cell(restaurant_id, cell)
+        self._rows.pop(restaurant_id, None)
+
+    def _discard_from_cell(self, restaurant_id, cell):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(restaurant_id)
+            if not members:
+                del self._cells[cell]
+
+    def _candidate_ids(self, lat, lon, radius_km):
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lon_lo = self._cell(lat - dlat, lon - dlon)
+        lat_hi, lon_hi = self._cell(lat + dlat, lon + dlon)
+
+        # Large radius: walking the occupied cells is cheaper than walking the bounding box
+        if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > len(self._cells):
+            for (lat_idx, lon_idx), members in self._cells.items():
+                if lat_lo <= lat_idx <= lat_hi and lon_lo <= lon_idx <= lon_hi:
+                    yield from members
+            return
+
+        for lat_idx in range(lat_lo, lat_hi + 1):
+            for lon_idx in range(lon_lo, lon_hi + 1):
+                members = self._cells.get((lat_idx, lon_idx))
+                if members:
+                    yield from members
+
+    # Least-loaded restaurants within radius_km, nearest first among equally loaded ones.
+    # live(restaurant_id) returns current seating_capacity/current_occupancy, or None
+    # to rank by the values stored with the row.
+    def nearby(self, lat, lon, radius_km, limit, live=None):
+        candidates = []
+        for restaurant_id in self._candidate_ids(lat, lon, radius_km):
+            row = self._rows[restaurant_id]
+            distance = haversine_km(lat, lon, row['latitude'], row['longitude'])
+            if distance <= radius_km:
+                current = live(restaurant_id) if live else None
+                candidates.append((occupancy_rate(current or row), distance, restaurant_id, current))
+
+        results = []
+        for rate, distance, restaurant_id, current in heapq.nsmallest(limit, candidates):
+            result = dict(self._rows[restaurant_id])
+            if current:
+                result.update(current)
+            result['occupancy_rate'] = round(rate, 4)
+            result['distance_km'] = round(distance, 3)
+            results.append(result)
+        return results
+
+
+def occupancy_rate(row):
+    capacity = row.get('seating_capacity') or 0
+    if capacity <= 0:
+        return 1.0
+    return (row.get('current_occupancy') or 0) / capacity
+
+
+class RestaurantGeoIndex:
+    """GeoGridIndex kept in sync with the restaurants table via its updated_at column.
+
+    Rows that lose their coordinates are dropped at the next incremental sync.
+    Restaurants deleted outright disappear at the next full reload. Syncing runs
+    on a background thread (see start()), so queries never wait on MySQL once
+    the first load is done; ranking uses live occupancy from occupancy.engine.
+    """
+
+    def __init__(self, cell_size=0.01, refresh_interval=5.0, rebuild_interval=3600.0, first_load_wait=10.0):
+        self.grid = GeoGridIndex(cell_size)
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.first_load_wait = first_load_wait
+        self._lock = threading.Lock()          # guards the grid
+        self._sync_lock = threading.Lock()     # only one thread talks to the DB at a time
+        self._watermark = None                 # max(updated_at) seen so far
+        self._last_sync = 0.0
+        self._last_rebuild = 0.0
+        self._loaded = threading.Event()       # set after the first successful sync
+        self._start_lock = threading.Lock()
+        self._syncer = None
+
+    # Pull rows changed since the last sync; a full reload on first use and every rebuild_interval
+    def sync(self, full=False):
+        with self._sync_lock:
+            full = (full or self._watermark is None
+                    or time.monotonic() - self._last_rebuild > self.rebuild_interval)
+            try:
+                conn = db_pool.get_connection()
+            except mysql.connector.Error as e:
+                print(f"Geo index sync error: {e}")
+                return False
+
+            cursor = conn.cursor(dictionary=True)
+            try:
+                started = time.monotonic()
+                query = """
+                    SELECT restaurant_id, name, location, latitude, longitude,
+                           seating_capacity, current_occupancy, updated_at
+                    FROM restaurants
+                """
+                params = ()
+                if full:
+                    query += " WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+                else:
+                    # >= so rows updated within the same second as the watermark are not missed.
+                    # Rows without coordinates are included so they can be dropped from the grid.
+                    query += " WHERE updated_at >= %s"
+                    params = (self._watermark,)
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+            except mysql.connector.Error as e:
+                print(f"Geo index sync error: {e}")
+                return False
+            finally:
+                cursor.close()
+                conn.close()
+
+            watermark = self._watermark
+            for row in rows:
+                updated_at = row.pop('updated_at')
+                if updated_at is not None and (watermark is None or updated_at > watermark):
+                    watermark = updated_at
+
+            if full:
+                # Build the replacement off to the side so queries keep running meanwhile
+                grid = GeoGridIndex(self.grid.cell_size)
+                self._apply(grid, rows)
+                with self._lock:
+                    self.grid = grid
+            else:
+                with self._lock:
+                    self._apply(self.grid, rows)
+            self._watermark = watermark
+            self._last_sync = started
+            if full:
+                self._last_rebuild = started
+            self._loaded.set()
+            return True
+
+    @staticmethod
+    def _apply(grid, rows):
+        for row in rows:
+            if row['latitude'] is None or row['longitude'] is None:
+                grid.remove(row['restaurant_id'])
+                continue
+            row['latitude'] = float(row['latitude'])
+            row['longitude'] = float(row['longitude'])
+            grid.upsert(row)
+
+    def _sync_loop(self, stop):
+        while True:
+            self.sync()
+            if stop.wait(self.refresh_interval):
+                return
+
+    # Start the background sync thread (idempotent)
+    def start(self):
+        with self._start_lock:
+            if self._syncer is None:
+                stop = threading.Event()
+                thread = threading.Thread(target=self._sync_loop, args=(stop,),
+                                          name='geo-index-sync', daemon=True)
+                thread.start()
+                self._syncer = (thread, stop)
+
+    def nearby(self, lat, lon, radius_km, limit):
+        if not self._loaded.is_set():
+            # Queries before the first load wait for the sync thread rather than
+            # each running the full SELECT themselves
+            self.start()
+            self._loaded.wait(self.first_load_wait)
+        with self._lock:
+            return self.grid.nearby(lat, lon, radius_km, limit, live=_live_occupancy)
+
+    def __len__(self):
+        return len(self.grid)
+
+
+# Live capacity/occupancy from the occupancy engine once it has loaded, None if it does not know the restaurant
+def _live_occupancy(restaurant_id):
+    if not occupancy.engine.loaded:
+        return None
+    return occupancy.engine.get(restaurant_id)
+
+
+_index = RestaurantGeoIndex(**GEO_INDEX_CONFIG)
+
+
+def start():
+    _index.start()
+
+
+def nearby_restaurants(lat, lon, radius_km=5.0, limit=10):
+    return _index.nearby(lat, lon, radius_km, limit)
@@ -0,0 +1,305 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mysql.connector
+import db_pool
+
+# Versioned schema migrations, applied on top of restaurantbooking.sql.
+# Each migration is (version, description, statements). Applied versions are recorded
+# in schema_migrations, so `python migrations.py` only runs the ones a database lacks.
+# `python migrations.py check` EXPLAINs the hot queries registered below and fails
+# when one of them falls back to scanning a whole table or index.
+
+ER_DUP_KEYNAME = 1061
+LOCK_NAME = 'restaurant_db.schema_migrations'
+LOCK_TIMEOUT = 30  # seconds to wait for another process that is migrating
+
+MIGRATIONS = [
+    (1, "Menu items by restaurant, available only, sorted by name", [
+        """ALTER TABLE menu_items
+           ADD INDEX idx_menu_items_available_name (restaurant_id, is_available, name)""",
+    ]),
+    (2, "Time slots by restaurant and weekday, covering slot times", [
+        """ALTER TABLE time_slots
+           ADD INDEX idx_time_slots_restaurant_day (restaurant_id, day_of_week, start_time, end_time, max_capacity)""",
+    ]),
+    (3, "Reservations by slot and date, by reservation time and by date across restaurants", [
+        """ALTER TABLE reservations
+           ADD INDEX idx_reservations_slot_date (slot_id, reservation_date, status, num_people)""",
+        """ALTER TABLE reservations
+           ADD INDEX idx_reservations_restaurant_time (restaurant_id, reservation_time, status, num_people)""",
+        """ALTER TABLE reservations
+           ADD INDEX idx_reservations_date (reservation_date, slot_id, restaurant_id)""",
+    ]),
+    (4, "Restaurants ordered by current occupancy", [
+        "ALTER TABLE restaurants ADD INDEX idx_restaurants_occupancy (current_occupancy)",
+    ]),
+    (5, "Busy hours of every restaurant for one weekday and hour", [
+        """ALTER TABLE busy_hours
+           ADD INDEX idx_busy_hours_day_hour (day_of_week, hour_of_day, restaurant_id, busyness_score)""",
+    ]),
+    (6, "OSM restaurants are unique by OSM element only, not by name and location", [
+        # Rows with an OSM id leave the first key part NULL, so the key no longer applies to them
+        """ALTER TABLE restaurants
+           DROP INDEX uniq_restaurant_identity,
+           ADD UNIQUE KEY uniq_restaurant_identity ((IF(osm_id IS NULL, source, NULL)), name, location)""",
+    ]),
+    (7, "Reviews always have a date, so keyset pages on (review_date, review_id) reach every review", [
+        # Undated reviews sorted last (NULL is lowest in DESC order); the oldest date keeps them there
+        "SET @first_review_date = (SELECT COALESCE(MIN(review_date), NOW()) FROM reviews)",
+        "UPDATE reviews SET review_date = @first_review_date WHERE review_date IS NULL",
+        "ALTER TABLE reviews MODIFY review_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP",
+    ]),
+]
+
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _applied(cursor):
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+# [(version, description, applied_at or None)] for every known migration
+def status():
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        _ensure_table(cursor)
+        applied = _applied(cursor)
+        return [(version, description, applied.get(version)) for version, description, _ in MIGRATIONS]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# Apply pending migrations in version order (up to `target`); returns the versions applied.
+# DDL commits implicitly in MySQL, so each version is recorded as soon as its statements ran.
+# An index that already exists (added by hand, or by a run that died halfway) is skipped.
+def migrate(target=None):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise mysql.connector.errors.OperationalError("Another process is applying migrations")
+        try:
+            _ensure_table(cursor)
+            applied = _applied(cursor)
+            done = []
+            for version, description, statements in sorted(MIGRATIONS):
+                if version in applied or (target is not None and version > target):
+                    continue
+                for statement in statements:
+                    try:
+                        cursor.execute(statement)
+                    except mysql.connector.Error as e:
+                        if e.errno != ER_DUP_KEYNAME:
+                            raise
+                        print(f"Migration {version}: {e.msg}, skipped")
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (version, description))
+                conn.commit()
+                done.append(version)
+            return done
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# --- hot query checker ---------------------------------------------------------------
+
+# (name, query, sample parameters).
+# The queries app.py, database.py and the request-path modules run per request or per
+# page; full rebuilds (stats_cache, search index, occupancy load) scan on purpose and
+# are left out, as is suggest_restaurants' `location LIKE '%city%'` fallback.
+_TODAY = date.today()
+_WEEK = _TODAY + timedelta(days=7)
+_FOUR_WEEKS_AGO = _TODAY - timedelta(days=28)
+
+HOT_QUERIES = [
+    ('menu', """
+        SELECT * FROM menu_items
+        WHERE restaurant_id = %s AND is_available = TRUE
+        ORDER BY name
+    """, (1,)),
+    ('time_slots', """
+        SELECT slot_id, start_time, end_time, max_capacity, day_of_week
+        FROM time_slots
+        WHERE restaurant_id = %s
+        ORDER BY start_time
+    """, (1,)),
+    ('slot_availability', """
+        SELECT slot_id, reservation_date, SUM(num_people) AS seats_taken
+        FROM reservations
+        WHERE restaurant_id = %s
+        AND reservation_date BETWEEN %s AND %s
+        AND status != 'Cancelled'
+        GROUP BY slot_id, reservation_date
+    """, (1, _TODAY, _WEEK)),
+    ('available_slots_procedure', """
+        SELECT ts.slot_id, ts.max_capacity
+        FROM time_slots ts
+        WHERE ts.restaurant_id = %s
+        AND ts.day_of_week = WEEKDAY(%s) + 1
+        AND %s BETWEEN ts.start_time AND ts.end_time
+        AND (
+            SELECT COUNT(*) FROM reservations r
+            WHERE r.slot_id = ts.slot_id
+            AND r.reservation_date = %s
+        ) + %s <= ts.max_capacity
+    """, (1, _TODAY, '19:00:00', _TODAY, 2)),
+    ('popularity_procedure', """
+        SELECT COUNT(*) FROM reservations
+        WHERE restaurant_id = %s
+        AND reservation_time >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+    """, (1,)),
+    ('review_page', """
+        SELECT r.review_id, r.rating, r.review_text, r.review_date, u.name as user_name
+        FROM reviews r
+        JOIN users u ON r.user_id = u.user_id
+        WHERE r.restaurant_id = %s
+        AND (r.review_date < %s OR (r.review_date = %s AND r.review_id < %s))
+        ORDER BY r.review_date DESC, r.review_id DESC LIMIT %s
+    """, (1, _TODAY, _TODAY, 1000, 20)),
+    ('review_summary', """
+        SELECT rating, review_count FROM restaurant_rating_stats
+        WHERE restaurant_id = %s
+    """, (1,)),
+    ('review_export', """
+        SELECT r.review_id, r.restaurant_id, r.user_id, r.rating, r.review_text, r.review_date
+        FROM reviews r
+        WHERE r.restaurant_id = %s ORDER BY r.review_date DESC, r.review_id DESC
+    """, (1,)),
+    ('suggest_by_category', """
+        SELECT r.restaurant_id, r.name, r.location, r.current_occupancy, r.seating_capacity,
+               r.occupancy_rate, r.avg_rating
+        FROM restaurants r
+        WHERE 1=1 AND r.category_id = %s
+        ORDER BY r.occupancy_rate ASC, r.avg_rating DESC
+        LIMIT %s
+    """, (1, 5)),
+    ('restaurant_listing', """
+        SELECT r.restaurant_id, r.name, r.occupancy_rate FROM restaurants r
+        WHERE (r.occupancy_rate > %s OR (r.occupancy_rate = %s AND r.restaurant_id > %s))
+        ORDER BY r.occupancy_rate, r.restaurant_id LIMIT %s
+    """, (0.5, 0.5, 1000, 20)),
+    ('restaurant_listing_by_city', """
+        SELECT r.restaurant_id, r.name, r.occupancy_rate FROM restaurants r
+        WHERE r.city = %s
+        ORDER BY r.occupancy_rate, r.restaurant_id LIMIT %s
+    """, ('Mumbai', 20)),
+    ('restaurant_listing_vegetarian', """
+        SELECT r.restaurant_id, r.name, r.occupancy_rate FROM restaurants r
+        WHERE r.source = %s
+        AND EXISTS (SELECT 1 FROM menu_items m
+                    WHERE m.restaurant_id = r.restaurant_id
+                    AND m.is_vegetarian = TRUE AND m.is_available = TRUE)
+        ORDER BY r.occupancy_rate, r.restaurant_id LIMIT %s
+    """, ('local', 20)),
+    ('busy_hours_restaurant', """
+        SELECT WEEKDAY(r.reservation_date), HOUR(ts.start_time), HOUR(ts.end_time), COUNT(*)
+        FROM reservations r
+        JOIN time_slots ts ON r.slot_id = ts.slot_id
+        WHERE r.restaurant_id = %s
+        AND r.reservation_date >= %s
+        GROUP BY 1, 2, 3
+    """, (1, _FOUR_WEEKS_AGO)),
+    ('busy_hours_all', """
+        SELECT r.restaurant_id, WEEKDAY(r.reservation_date), HOUR(ts.start_time), HOUR(ts.end_time), COUNT(*)
+        FROM reservations r
+        JOIN time_slots ts ON r.slot_id = ts.slot_id
+        WHERE r.reservation_date >= %s
+        GROUP BY 1, 2, 3, 4
+    """, (_FOUR_WEEKS_AGO,)),
+    ('busy_hours_now', """
+        SELECT restaurant_id, busyness_score FROM busy_hours
+        WHERE day_of_week = %s AND hour_of_day = %s
+    """, (0, 19)),
+    ('osm_ids', """
+        SELECT restaurant_id, osm_type, osm_id FROM restaurants
+        WHERE (osm_type, osm_id) IN ((%s, %s), (%s, %s))
+    """, ('node', 1, 'way', 2)),
+    ('most_occupied', "SELECT * FROM restaurants ORDER BY current_occupancy DESC LIMIT 20", ()),
+    ('least_occupied', "SELECT * FROM restaurants ORDER BY occupancy_rate ASC LIMIT 1", ()),
+    ('occupancy_by_ids', """
+        SELECT restaurant_id, current_occupancy FROM restaurants WHERE restaurant_id IN (%s, %s, %s)
+    """, (1, 2, 3)),
+    ('booking_capacity', """
+        SELECT seating_capacity, current_occupancy FROM restaurants
+        WHERE restaurant_id = %s
+    """, (1,)),
+    ('cancel_lookup', """
+        SELECT restaurant_id, status, num_people FROM reservations
+        WHERE reservation_id = %s AND user_id = %s
+    """, (1, 1)),
+    ('login', "SELECT user_id, name, password_hash FROM users WHERE email = %s", ('someone@example.com',)),
+    ('search_changes', """
+        SELECT restaurant_id, updated_at FROM restaurants WHERE updated_at >= %s
+        UNION ALL
+        SELECT restaurant_id, updated_at FROM menu_items WHERE updated_at >= %s
+    """, (_TODAY, _TODAY)),
+]
+
+FULL_SCANS = ('ALL', 'index')  # EXPLAIN access types that read a whole table or index
+
+
+# EXPLAIN every registered query; returns [(name, table, access type, estimated rows)]
+# for the steps that scan at least `min_rows` rows of a table or index
+def check(min_rows=1000, queries=None):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    failures = []
+    try:
+        for name, query, params in queries or HOT_QUERIES:
+            cursor.execute("EXPLAIN " + query, params)
+            for step in cursor.fetchall():
+                if step['type'] in FULL_SCANS and (step['rows'] or 0) >= min_rows:
+                    failures.append((name, step['table'], step['type'], step['rows']))
+        return failures
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations and hot query checks")
+    parser.add_argument('command', nargs='?', default='migrate', choices=('migrate', 'status', 'check'))
+    parser.add_argument('--to', type=int, help="migrate up to this version")
+    parser.add_argument('--min-rows', type=int, default=1000,
+                        help="report scans estimated at this many rows or more (the optimizer scans small tables on purpose)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'migrate':
+            done = migrate(args.to)
+            print(f"Applied migrations: {', '.join(map(str, done))}" if done else "Schema is up to date")
+        elif args.command == 'status':
+            for version, description, applied_at in status():
+                print(f"{version:>4}  {str(applied_at or 'pending'):<19}  {description}")
+        else:
+            failures = check(args.min_rows)
+            for name, table, access, rows in failures:
+                print(f"FULL SCAN  {name}: {table} (type={access}, ~{rows} rows)")
+            print(f"{len(HOT_QUERIES)} hot queries checked, {len(failures)} full scans")
+            return 1 if failures else 0
+    except mysql.connector.Error as e:
+        print(f"Migration error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
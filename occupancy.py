@@ -0,0 +1,323 @@
+import heapq
+import threading
+import uuid
+from array import array
+from collections import deque
+
+import mysql.connector
+import db_pool
+from config import OCCUPANCY_CONFIG
+
+
+class ChangeFeed:
+    """Versioned log of occupancy changes shared by every stream subscriber.
+
+    Each change bumps a monotonically increasing version. Subscribers remember the
+    last version they saw and ask for everything after it, so publishing is O(1)
+    no matter how many clients are connected. Only the last `maxlen` changes are
+    kept; a subscriber that falls further behind gets None and must resync from
+    a snapshot.
+
+    Versions are only meaningful inside one process, so clients get them as
+    opaque "<epoch>-<version>" tokens; a token from another worker or an earlier
+    run simply does not parse and forces a full resync.
+    """
+
+    def __init__(self, maxlen=10000):
+        self._cond = threading.Condition()
+        self._log = deque(maxlen=maxlen)  # (version, restaurant_id, occupancy, capacity)
+        self.version = 0
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def token(self, version):
+        return f"{self.epoch}-{version}"
+
+    # Version for a token issued by this feed, else None
+    def parse_token(self, token):
+        epoch, _, version = (token or '').partition('-')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def publish(self, restaurant_id, occupancy, capacity):
+        with self._cond:
+            self.version += 1
+            self._log.append((self.version, restaurant_id, occupancy, capacity))
+            self._cond.notify_all()
+
+    # Latest change per restaurant after `since`: (version, changes), or (version, None) on a gap
+    def changes_since(self, since):
+        with self._cond:
+            return self._changes_since(since)
+
+    def _changes_since(self, since):
+        version = self.version
+        if since == version:
+            return version, []
+        if since > version or not self._log or self._log[0][0] > since + 1:
+            return version, None
+
+        latest = {}
+        for entry_version, restaurant_id, occupancy, capacity in reversed(self._log):
+            if entry_version <= since:
+                break
+            if restaurant_id not in latest:
+                latest[restaurant_id] = {'restaurant_id': restaurant_id,
+                                         'current_occupancy': occupancy,
+                                         'seating_capacity': capacity}
+        return version, list(latest.values())
+
+    # Block until something changes after `since` (or timeout), then return changes_since(since)
+    def wait(self, since, timeout=None):
+        with self._cond:
+            if self.version == since:
+                self._cond.wait(timeout)
+            return self._changes_since(since)
+
+
+class OccupancyEngine:
+    """Process-wide view of restaurant capacity/occupancy.
+
+    Restaurants are stored in parallel arrays (id, capacity, occupancy) addressed by
+    slot. A min-heap keyed on occupancy rate, with lazily discarded stale entries,
+    answers least-crowded lookups in O(log n) without touching the database.
+
+    MySQL stays the source of truth: the booking/cancel paths write to the DB and
+    then update the engine in place with the committed value, and a periodic
+    reconcile() pass corrects drift caused by other writers (other workers,
+    triggers, manual SQL).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = array('i')
+        self._capacity = array('i')
+        self._occupancy = array('i')
+        self._version = array('I')   # bumped on every change; heap entries carry the version they saw
+        self._touched = array('Q')   # sequence number of the last local update, see reconcile()
+        self._slot = {}              # restaurant_id -> slot
+        self._heap = []              # (rate, restaurant_id, slot, version)
+        self._seq = 0
+        self.loaded = False
+        self.stats = {'reconciles': 0, 'corrections': 0}
+        self.feed = ChangeFeed(OCCUPANCY_CONFIG['feed_size'])
+        # Optional callable: restaurant_id -> seats reserved in memory but not yet in MySQL
+        # (write-behind bookings, see booking_queue.py). Added on top of every committed value.
+        self.unflushed = None
+
+    def __len__(self):
+        return len(self._slot)
+
+    @staticmethod
+    def _rate(capacity, occupancy):
+        return occupancy / capacity if capacity > 0 else 1.0
+
+    def _push(self, slot):
+        heapq.heappush(self._heap, (self._rate(self._capacity[slot], self._occupancy[slot]),
+                                    self._ids[slot], slot, self._version[slot]))
+
+    def _set(self, restaurant_id, capacity, occupancy, local=True):
+        slot = self._slot.get(restaurant_id)
+        if slot is None or self._capacity[slot] != capacity or self._occupancy[slot] != occupancy:
+            self.feed.publish(restaurant_id, occupancy, capacity)
+        if slot is None:
+            slot = len(self._ids)
+            self._slot[restaurant_id] = slot
+            self._ids.append(restaurant_id)
+            self._capacity.append(capacity)
+            self._occupancy.append(occupancy)
+            self._version.append(0)
+            self._touched.append(0)
+        else:
+            self._capacity[slot] = capacity
+            self._occupancy[slot] = occupancy
+            self._version[slot] += 1
+        if local:
+            self._seq += 1
+            self._touched[slot] = self._seq
+        self._push(slot)
+
+        # Stale heap entries pile up with every update; rebuild once they dominate
+        if len(self._heap) > 4 * len(self._slot) + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(self._rate(self._capacity[s], self._occupancy[s]), self._ids[s], s, self._version[s])
+                      for s in self._slot.values()]
+        heapq.heapify(self._heap)
+
+    def _valid(self, entry):
+        return entry[3] == self._version[entry[2]]
+
+    # --- loading / reconciliation -------------------------------------------------
+
+    def _fetch_rows(self):
+        conn = db_pool.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT restaurant_id, seating_capacity, current_occupancy FROM restaurants")
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def reconcile(self):
+        """Reload every row from MySQL and fix any drift. Also used for the initial load."""
+        with self._lock:
+            started_seq = self._seq
+        # Read before the SELECT: a batch flushed in between is counted twice (safe), never missed
+        unflushed = self.unflushed() if self.unflushed else {}
+        try:
+            rows = self._fetch_rows()
+        except mysql.connector.Error as e:
+            print(f"Occupancy reconcile error: {e}")
+            return False
+
+        with self._lock:
+            seen = set()
+            corrections = 0
+            for restaurant_id, capacity, occupancy in rows:
+                capacity, occupancy = capacity or 0, (occupancy or 0) + unflushed.get(restaurant_id, 0)
+                seen.add(restaurant_id)
+                slot = self._slot.get(restaurant_id)
+                if slot is not None:
+                    # Updated locally after our SELECT started: the in-memory value is newer
+                    if self._touched[slot] > started_seq:
+                        continue
+                    if self._capacity[slot] == capacity and self._occupancy[slot] == occupancy:
+                        continue
+                    corrections += 1
+                self._set(restaurant_id, capacity, occupancy, local=False)
+
+            for restaurant_id in [r for r in self._slot if r not in seen]:
+                self._remove(restaurant_id)
+
+            if self.loaded:
+                self.stats['corrections'] += corrections
+            self.stats['reconciles'] += 1
+            self.loaded = True
+        return True
+
+    def _remove(self, restaurant_id):
+        # Slots are not reused; the id leaves the lookup map and its heap entries become invalid
+        slot = self._slot.pop(restaurant_id)
+        self._version[slot] += 1
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.reconcile()
+
+    # --- updates ----------------------------------------------------------------------
+
+    def set_occupancy(self, restaurant_id, occupancy, capacity=None):
+        """Record a committed occupancy value (after a booking or cancellation)."""
+        unflushed = self.unflushed().get(restaurant_id, 0) if self.unflushed else 0
+        with self._lock:
+            slot = self._slot.get(restaurant_id)
+            if capacity is None:
+                if slot is None:
+                    return
+                capacity = self._capacity[slot]
+            self._set(restaurant_id, capacity, occupancy + unflushed)
+
+    def reserve(self, restaurant_id, seats):
+        """Take `seats` if they fit. None if the restaurant is unknown, else whether they fit."""
+        with self._lock:
+            slot = self._slot.get(restaurant_id)
+            if slot is None:
+                return None
+            if self._occupancy[slot] + seats > self._capacity[slot]:
+                return False
+            self._set(restaurant_id, self._capacity[slot], self._occupancy[slot] + seats)
+            return True
+
+    def adjust(self, restaurant_id, delta):
+        with self._lock:
+            slot = self._slot.get(restaurant_id)
+            if slot is not None:
+                self._set(restaurant_id, self._capacity[slot], max(0, self._occupancy[slot] + delta))
+
+    # --- lookups ----------------------------------------------------------------------
+
+    def get(self, restaurant_id):
+        with self._lock:
+            slot = self._slot.get(restaurant_id)
+            if slot is None:
+                return None
+            return {'restaurant_id': restaurant_id,
+                    'seating_capacity': self._capacity[slot],
+                    'current_occupancy': self._occupancy[slot]}
+
+    def least_crowded(self, k=1):
+        """The k restaurant ids with the lowest occupancy rate, in O(k log n)."""
+        with self._lock:
+            heap = self._heap
+            taken = []
+            while heap and len(taken) < k:
+                entry = heapq.heappop(heap)
+                if self._valid(entry):
+                    taken.append(entry)
+            for entry in taken:
+                heapq.heappush(heap, entry)
+            return [entry[1] for entry in taken]
+
+    def rows(self, ids=None):
+        """(restaurant_id, capacity, occupancy) tuples, for all restaurants or just `ids`."""
+        with self._lock:
+            return [(self._ids[slot], self._capacity[slot], self._occupancy[slot]) for slot in self._slots(ids)]
+
+    def sample(self, k, rng):
+        """Up to k distinct random (restaurant_id, capacity, occupancy) tuples in O(k)."""
+        with self._lock:
+            live = len(self._slot)
+            if live <= k:
+                return self.rows()
+            picked = {}
+            # Removed restaurants leave dead slots behind; they are rare, so just redraw
+            while len(picked) < k:
+                slot = rng.randrange(len(self._ids))
+                restaurant_id = self._ids[slot]
+                if self._slot.get(restaurant_id) == slot:
+                    picked[restaurant_id] = (restaurant_id, self._capacity[slot], self._occupancy[slot])
+            return list(picked.values())
+
+    def _slots(self, ids):
+        if ids is None:
+            return self._slot.values()
+        return [self._slot[r] for r in ids if r in self._slot]
+
+    def snapshot(self, ids=None):
+        with self._lock:
+            return [{'restaurant_id': self._ids[slot], 'current_occupancy': self._occupancy[slot]}
+                    for slot in self._slots(ids)]
+
+    # State plus the feed version it corresponds to (changes are published under our lock)
+    def snapshot_with_version(self, ids=None):
+        with self._lock:
+            return self.feed.version, [
+                {'restaurant_id': self._ids[slot],
+                 'current_occupancy': self._occupancy[slot],
+                 'seating_capacity': self._capacity[slot]}
+                for slot in self._slots(ids)]
+
+
+engine = OccupancyEngine()
+_reconciler = None
+
+
+def _reconcile_loop(interval, stop):
+    while not stop.wait(interval):
+        engine.reconcile()
+
+
+# Load the engine and start the periodic reconciliation thread (idempotent)
+def start(interval=None):
+    global _reconciler
+    engine.ensure_loaded()
+    if _reconciler is None:
+        stop = threading.Event()
+        thread = threading.Thread(target=_reconcile_loop,
+                                  args=(interval or OCCUPANCY_CONFIG['reconcile_interval'], stop),
+                                  name='occupancy-reconcile', daemon=True)
+        thread.start()
+        _reconciler = (thread, stop)
@@ -1,74 +1,424 @@
+import codecs
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, as_completed
+from urllib.parse import urlparse
 
 import requests
+from config import OSM_CONFIG
+from osm_store import OsmElementStore
 
-def search_restaurants(city):
-    query = f"""
+
+# A prefetch target is a city name or a (south, west, north, east) bounding box.
+# With `since`, only elements changed after that time are returned (incremental refresh)
+def build_query(target, since=None, max_results=20):
+    newer = f'(newer:"{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(since))}")' if since else ''
+    if isinstance(target, str):
+        area = f'area["name"="{target}"]->.searchArea;'
+        scope = '(area.searchArea)'
+    else:
+        area = ''
+        scope = '({},{},{},{})'.format(*target)
+    return f"""
     [out:json];
-    area["name"="{city}"]->.searchArea;
+    {area}
     (
-      node["amenity"="restaurant"](area.searchArea);
-      way["amenity"="restaurant"](area.searchArea);
-      relation["amenity"="restaurant"](area.searchArea);
+      node["amenity"="restaurant"]{scope}{newer};
+      way["amenity"="restaurant"]{scope}{newer};
+      relation["amenity"="restaurant"]{scope}{newer};
     );
-    out center 20;
+    out center {max_results};
     """
-    url = "https://overpass-api.de/api/interpreter"
+
+
+class HostRateLimiter:
+    """Spaces out request starts so each host sees at most `rate` requests per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = {}  # host -> earliest monotonic time the next request may start
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, 0.0))
+            self._next[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+RESTAURANT_FIELDS = ('osm_type', 'osm_id', 'name', 'lat', 'lon')
+
+
+# Restaurant dict for one Overpass element, limited to `fields`; None if it has no name or position
+def element_to_restaurant(element, fields=RESTAURANT_FIELDS):
+    name = element.get('tags', {}).get('name', 'Unnamed Restaurant')
+    lat = element.get('lat') or element.get('center', {}).get('lat')
+    lon = element.get('lon') or element.get('center', {}).get('lon')
+    if not (name and lat and lon):
+        return None
+    restaurant = {'osm_type': element.get('type'), 'osm_id': element.get('id'), 'name': name, 'lat': lat, 'lon': lon}
+    if fields is not RESTAURANT_FIELDS:
+        restaurant = {field: restaurant[field] for field in fields}
+    return restaurant
+
+
+def parse_elements(data, fields=RESTAURANT_FIELDS):
     results = []
-    
-    try:
-        response = requests.get(url, params={'data': query}, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad responses
-        data = response.json()
-        
-        for element in data.get('elements', []):
-            name = element.get('tags', {}).get('name', 'Unnamed Restaurant')
-            lat = element.get('lat') or element.get('center', {}).get('lat')
-            lon = element.get('lon') or element.get('center', {}).get('lon')
-            
-            if name and lat and lon:
-                results.append({
-                    'name': name,
-                    'lat': lat,
-                    'lon': lon
-                })
-    except (requests.RequestException, ValueError) as e:
-        print(f"Error fetching restaurants from OSM: {e}")
-        # Return empty list on error
+    for element in data.get('elements', []):
+        restaurant = element_to_restaurant(element, fields)
+        if restaurant is not None:
+            results.append(restaurant)
+    return results
 
-import requests
 
-def search_restaurants(city):
-    query = f"""
-    [out:json];
-    area["name"="{city}"]->.searchArea;
-    (
-      node["amenity"="restaurant"](area.searchArea);
-      way["amenity"="restaurant"](area.searchArea);
-      relation["amenity"="restaurant"](area.searchArea);
-    );
-    out center 20;
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = ',]}' + _WHITESPACE
+
+
+def iter_elements(chunks):
+    """Yield the members of the top-level "elements" array of an Overpass JSON
+    document, decoding each one as soon as its text has arrived.
+
+    `chunks` is an iterable of bytes (e.g. response.iter_content()). Only the
+    element being decoded and the unread part of the current chunk are held in
+    memory, so memory stays flat however large the response is.
     """
-    url = "https://overpass-api.de/api/interpreter"
-    results = []
-    
-    try:
-        response = requests.get(url, params={'data': query}, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad responses
-        data = response.json()
-        
-        for element in data.get('elements', []):
-            name = element.get('tags', {}).get('name', 'Unnamed Restaurant')
-            lat = element.get('lat') or element.get('center', {}).get('lat')
-            lon = element.get('lon') or element.get('center', {}).get('lon')
-            
-            if name and lat and lon:
-                results.append({
-                    'name': name,
-                    'lat': lat,
-                    'lon': lon
-                })
-    except (requests.RequestException, ValueError) as e:
-        print(f"Error fetching restaurants from OSM: {e}")
-        # Return empty list on error
-    
-    return results
\ No newline at end of file
+    chunks = iter(chunks)
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+
+    # Make sure buf[pos:] holds at least one non-whitespace character; returns it, or '' at end of input
+    def fill():
+        nonlocal buf, pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not more():
+                return ''
+
+    def more():
+        nonlocal buf, pos
+        for chunk in chunks:
+            text = utf8.decode(chunk)
+            if text:
+                buf = buf[pos:] + text
+                pos = 0
+                return True
+        return False
+
+    # Decode the next complete JSON value, reading more input until it is complete
+    def value():
+        nonlocal pos
+        fill()
+        while True:
+            try:
+                result, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not more():
+                    raise
+                continue
+            # A number or literal is only complete once a delimiter follows it ("0." may be "0.6")
+            if buf[pos] not in '{["' and (end == len(buf) or buf[end] not in _DELIMITERS) and more():
+                continue
+            pos = end
+            return result
+
+    def expect(char):
+        nonlocal pos
+        found = fill()
+        if found != char:
+            raise ValueError(f"Malformed Overpass response: expected {char!r}, got {found!r}")
+        pos += 1
+
+    expect('{')
+    while fill() != '}':
+        key = value()
+        expect(':')
+        if key != 'elements':
+            value()  # version, generator, osm3s: small, skipped
+        else:
+            expect('[')
+            if fill() == ']':
+                return
+            while True:
+                yield value()
+                if fill() == ']':
+                    return
+                expect(',')
+        if fill() == ',':
+            pos += 1
+    # No "elements" key: an empty result
+
+
+# Restaurants from a streamed (stream=True) Overpass response, as they arrive
+def stream_restaurants(response, fields=RESTAURANT_FIELDS, chunk_size=16384):
+    for element in iter_elements(response.iter_content(chunk_size)):
+        restaurant = element_to_restaurant(element, fields)
+        if restaurant is not None:
+            yield restaurant
+
+
+class OverpassClient:
+    """Overpass client with a per-city TTL/LRU cache.
+
+    Fresh entries are served directly. Stale entries are served immediately while
+    a background worker refreshes them. Concurrent misses for the same city share
+    a single upstream request.
+    """
+
+    def __init__(self, url, timeout=10, ttl=600, stale_ttl=86400, max_cities=256,
+                 refresh_workers=2, store=None, full_refresh=7 * 86400,
+                 concurrency=4, rate_limit=2.0, retries=3, backoff=1.0, max_results=20, stream=True):
+        self.url = url
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_cities = max_cities
+        self.store = store                # optional OsmElementStore backing the in-memory cache
+        self.full_refresh = full_refresh  # seconds between full (non-incremental) refreshes
+        self.concurrency = concurrency    # parallel requests in fetch_many
+        self.retries = retries            # fetch_many retries per target (429/5xx/connection errors)
+        self.backoff = backoff            # base delay in seconds, doubled per retry
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        self.max_results = max_results    # `out center N` cap per query
+        self.stream = stream              # parse responses incrementally instead of response.json()
+        self._host = urlparse(url).netloc
+
+        self.session = requests.Session()  # keep-alive to the Overpass host
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='osm-refresh')
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # city -> (results, fetched_at)
+        self._inflight = {}          # city -> Future
+        self._stats = dict.fromkeys(
+            ('hits', 'stale_hits', 'misses', 'coalesced', 'refreshes', 'store_loads',
+             'fetches', 'incremental_fetches', 'fetch_errors', 'evictions', 'retries'), 0)
+
+    def _get(self, target, since=None, stream=None):
+        self.rate_limiter.wait(self._host)
+        return self.session.get(self.url, params={'data': build_query(target, since, self.max_results)},
+                                timeout=self.timeout, stream=self.stream if stream is None else stream)
+
+    def _parse(self, response, fields=RESTAURANT_FIELDS):
+        try:
+            response.raise_for_status()  # Raise an exception for bad responses
+            if self.stream:
+                return list(stream_restaurants(response, fields))
+            return parse_elements(response.json(), fields)
+        finally:
+            response.close()
+
+    # Blocking upstream call, raises on failure
+    def fetch(self, city, since=None, fields=RESTAURANT_FIELDS):
+        return self._parse(self._get(city, since), fields)
+
+    def iter_restaurants(self, target, since=None, fields=RESTAURANT_FIELDS):
+        """Yield restaurants for a city / bounding box while the response is still downloading.
+
+        `fields` limits each dict to the keys the caller uses. Raises like fetch().
+        """
+        response = self._get(target, since, stream=True)
+        try:
+            response.raise_for_status()
+            yield from stream_restaurants(response, fields)
+        finally:
+            response.close()
+
+    # fetch() with retries and exponential backoff (honouring Retry-After) for throttling,
+    # gateway errors and dropped connections
+    def fetch_with_retry(self, target, since=None):
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = self._get(target, since)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                delay = None
+            else:
+                if response.status_code not in (429, 500, 502, 503, 504) or last_attempt:
+                    return self._parse(response)
+                retry_after = response.headers.get('Retry-After', '')
+                response.close()
+                delay = float(retry_after) if retry_after.isdigit() else None
+            with self._lock:
+                self._stats['retries'] += 1
+            time.sleep(delay if delay is not None else self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    def fetch_many(self, targets, since=None, concurrency=None):
+        """Fetch many cities / bounding boxes, `concurrency` at a time.
+
+        Yields (target, results, error) as each one finishes, so callers can ingest
+        early results while the rest are still downloading. Every request goes
+        through the per-host rate limiter.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, concurrency or self.concurrency), thread_name_prefix='osm-fetch') as pool:
+            futures = {pool.submit(self.fetch_with_retry, target, since): target for target in targets}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except (requests.RequestException, ValueError) as e:
+                    yield futures[future], None, e
+
+    # Record a complete fetch of `city` fetched elsewhere (e.g. by fetch_many) in the store and cache
+    def remember(self, city, results, fetched_at):
+        key = city.strip()
+        if self.store:
+            self.store.apply(key, results, fetched_at=fetched_at, full=True)
+        with self._lock:
+            self._put(key, _copy(results), fetched_at)
+
+    def search(self, city):
+        key = city.strip()
+        results = self._cached(key)
+        if results is not None:
+            return results
+
+        # Cold process: seed the in-memory cache from the persistent store
+        try:
+            stored = self.store.load(key) if self.store else None
+        except sqlite3.Error as e:
+            print(f"Error reading OSM store: {e}")
+            stored = None
+        if stored is not None:
+            with self._lock:
+                self._stats['store_loads'] += 1
+                if key not in self._cache:
+                    self._put(key, *stored)
+            results = self._cached(key)
+            if results is not None:
+                return results
+
+        with self._lock:
+            # Miss: join an in-flight fetch or start one
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self._stats['misses'] += 1
+                self._inflight[key] = future = Future()
+            else:
+                self._stats['coalesced'] += 1
+
+        if leader:
+            self._load(key, future)
+        try:
+            results = future.result(timeout=self.timeout * 3)
+        except TimeoutError:
+            results = None
+        return _copy(results or [])
+
+    # Serve from memory if fresh or stale-but-usable (scheduling a background refresh), else None
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            results, fetched_at = entry
+            age = time.time() - fetched_at
+            if age > self.stale_ttl:
+                return None
+            self._cache.move_to_end(key)
+            if age <= self.ttl:
+                self._stats['hits'] += 1
+            else:
+                self._stats['stale_hits'] += 1
+                if key not in self._inflight:
+                    self._stats['refreshes'] += 1
+                    self._inflight[key] = future = Future()
+                    self._executor.submit(self._load, key, future)
+            return _copy(results)
+
+    def _put(self, key, results, fetched_at):
+        self._cache[key] = (results, fetched_at)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cities:
+            self._cache.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _load(self, key, future):
+        results = None
+        started = time.time()
+        try:
+            results = self._fetch_and_store(key, started)
+        except (requests.RequestException, ValueError, sqlite3.Error) as e:
+            print(f"Error fetching restaurants from OSM: {e}")
+        finally:
+            # Always release the city, or every later search() would wait on a future nobody resolves
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._stats['fetches'] += 1
+                if results is None:
+                    self._stats['fetch_errors'] += 1
+                else:
+                    self._put(key, results, started)
+            future.set_result(results)
+
+    def _fetch_and_store(self, key, started):
+        if not self.store:
+            return self.fetch(key)
+
+        times = self.store.fetch_times(key)
+        if times is not None and started - times[1] < self.full_refresh:
+            # Only ask Overpass for elements changed since the last fetch (minus a margin for replication lag)
+            changed = self.fetch(key, since=times[0] - 300)
+            with self._lock:
+                self._stats['incremental_fetches'] += 1
+            self.store.apply(key, changed, fetched_at=started)
+        else:
+            self.store.apply(key, self.fetch(key), fetched_at=started, full=True)
+        return self.store.load(key)[0]
+
+    def invalidate(self, city=None):
+        with self._lock:
+            if city is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(city.strip(), None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_cities'] = len(self._cache)
+            stats['inflight'] = len(self._inflight)
+        return stats
+
+
+# Callers mutate the returned dicts (e.g. adding restaurant_id), so never hand out cached ones
+def _copy(results):
+    return [dict(r) for r in results]
+
+
+def _build_client(config):
+    config = dict(config)
+    store_path = config.pop('store_path', None)
+    return OverpassClient(store=OsmElementStore(store_path) if store_path else None, **config)
+
+
+_client = _build_client(OSM_CONFIG)
+
+
+def search_restaurants(city):
+    return _client.search(city)
+
+
+def cache_stats():
+    return _client.stats()
+
+
+def fetch_many(targets, since=None, concurrency=None):
+    return _client.fetch_many(targets, since, concurrency)
+
+
+def remember(city, results, fetched_at):
+    _client.remember(city, results, fetched_at)
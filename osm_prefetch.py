@@ -0,0 +1,84 @@
+# Bulk OpenStreetMap prefetch: fetch many cities / bounding boxes from Overpass
+# in parallel and save them to the restaurants table, so the first visitor to a
+# city does not wait on Overpass. Meant to be run from cron.
+#
+#   python osm_prefetch.py --cities Pune Mumbai Bengaluru
+#   python osm_prefetch.py --file cities.txt --concurrency 8
+#   python osm_prefetch.py --bbox 18.4,73.7,18.6,73.9
+#
+# Concurrency, per-host rate limit and retries come from OSM_CONFIG
+# (OSM_FETCH_CONCURRENCY, OSM_RATE_LIMIT, OSM_FETCH_RETRIES, OSM_FETCH_BACKOFF).
+
+import argparse
+import sqlite3
+import sys
+import time
+
+import osm_api
+from database import save_osm_restaurants
+
+
+def parse_bbox(value):
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("bounding box must be south,west,north,east")
+    return tuple(parts)
+
+
+def read_targets(path):
+    # One city or "south,west,north,east" per line; blank lines and # comments are skipped
+    targets = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                try:
+                    targets.append(parse_bbox(line))
+                except (ValueError, argparse.ArgumentTypeError):
+                    targets.append(line)
+    return targets
+
+
+def prefetch(targets, save=True, concurrency=None):
+    """Fetch every target and ingest it as it arrives; returns (restaurants saved, failed targets)."""
+    saved = 0
+    failed = []
+    started = time.time()
+    for target, results, error in osm_api.fetch_many(targets, concurrency=concurrency):
+        if error is not None:
+            print(f"{target}: failed ({error})")
+            failed.append(target)
+            continue
+        city = target if isinstance(target, str) else None
+        if city:
+            # Warm the OSM cache / store so the web app serves this city without calling Overpass
+            try:
+                osm_api.remember(city, results, started)
+            except sqlite3.Error as e:
+                # The fetch itself worked: still save it to MySQL and go on with the other cities
+                print(f"{target}: could not cache ({e})")
+        if save:
+            save_osm_restaurants(results, city)
+        saved += len(results)
+        print(f"{target}: {len(results)} restaurants")
+    return saved, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prefetch OpenStreetMap restaurants into the database")
+    parser.add_argument('--cities', nargs='*', default=[], help="city names")
+    parser.add_argument('--bbox', action='append', type=parse_bbox, default=[], help="south,west,north,east")
+    parser.add_argument('--file', help="file with one city or bounding box per line")
+    parser.add_argument('--concurrency', type=int, help="parallel requests (default OSM_FETCH_CONCURRENCY)")
+    parser.add_argument('--no-db', action='store_true', help="only warm the OSM cache, skip the restaurants table")
+    args = parser.parse_args()
+
+    targets = args.cities + args.bbox + (read_targets(args.file) if args.file else [])
+    if not targets:
+        parser.error("no cities or bounding boxes given")
+
+    start = time.perf_counter()
+    saved, failed = prefetch(targets, save=not args.no_db, concurrency=args.concurrency)
+    print(f"Prefetched {len(targets) - len(failed)}/{len(targets)} targets, {saved} restaurants "
+          f"in {time.perf_counter() - start:.1f} s")
+    sys.exit(1 if failed else 0)
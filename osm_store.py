@@ -0,0 +1,117 @@
+import time
+
+from sqlite_file import SQLiteFile
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS osm_elements (
+    city TEXT NOT NULL,
+    osm_type TEXT NOT NULL,
+    osm_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (city, osm_type, osm_id)
+);
+CREATE TABLE IF NOT EXISTS osm_cities (
+    city TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    full_fetched_at REAL NOT NULL
+);
+"""
+
+
+class OsmElementStore:
+    """On-disk (SQLite) store of OSM restaurant elements, keyed by OSM type/id per city.
+
+    Lets a cold process serve restaurant lists without touching Overpass, and lets
+    refreshes write only the elements that actually changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = SQLiteFile(path, SCHEMA)
+
+    def _connect(self):
+        return self._file.connect()
+
+    # Returns (elements, fetched_at) or None if the city has never been fetched
+    def load(self, city):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT fetched_at FROM osm_cities WHERE city = ?", (city,)).fetchone()
+            if row is None:
+                return None
+            elements = [
+                {'osm_type': osm_type, 'osm_id': osm_id, 'name': name, 'lat': lat, 'lon': lon}
+                for osm_type, osm_id, name, lat, lon in conn.execute("""
+                    SELECT osm_type, osm_id, name, lat, lon FROM osm_elements
+                    WHERE city = ? ORDER BY rowid
+                """, (city,))
+            ]
+            return elements, row[0]
+        finally:
+            conn.close()
+
+    # Returns (fetched_at, full_fetched_at) or None
+    def fetch_times(self, city):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT fetched_at, full_fetched_at FROM osm_cities WHERE city = ?", (city,)).fetchone()
+        finally:
+            conn.close()
+
+    # Diff fetched elements against what is stored and write only the differences.
+    # With full=True, stored elements missing from the fetch are removed.
+    def apply(self, city, elements, fetched_at=None, full=False):
+        fetched_at = fetched_at or time.time()
+        conn = self._connect()
+        try:
+            stored = {
+                (osm_type, osm_id): (name, lat, lon)
+                for osm_type, osm_id, name, lat, lon in conn.execute(
+                    "SELECT osm_type, osm_id, name, lat, lon FROM osm_elements WHERE city = ?", (city,))
+            }
+
+            upserts = []
+            added = changed = 0
+            seen = set()
+            for e in elements:
+                key = (e['osm_type'], e['osm_id'])
+                seen.add(key)
+                current = stored.get(key)
+                if current == (e['name'], e['lat'], e['lon']):
+                    continue
+                if current is None:
+                    added += 1
+                else:
+                    changed += 1
+                upserts.append((city, e['osm_type'], e['osm_id'], e['name'], e['lat'], e['lon'], fetched_at))
+
+            removed = [(city,) + key for key in stored if key not in seen] if full else []
+
+            with conn:
+                if upserts:
+                    conn.executemany("""
+                        INSERT INTO osm_elements (city, osm_type, osm_id, name, lat, lon, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (city, osm_type, osm_id) DO UPDATE SET
+                            name = excluded.name, lat = excluded.lat,
+                            lon = excluded.lon, updated_at = excluded.updated_at
+                    """, upserts)
+                if removed:
+                    conn.executemany(
+                        "DELETE FROM osm_elements WHERE city = ? AND osm_type = ? AND osm_id = ?", removed)
+                conn.execute("""
+                    INSERT INTO osm_cities (city, fetched_at, full_fetched_at) VALUES (?, ?, ?)
+                    ON CONFLICT (city) DO UPDATE SET
+                        fetched_at = excluded.fetched_at,
+                        full_fetched_at = CASE WHEN ? THEN excluded.full_fetched_at
+                                               ELSE osm_cities.full_fetched_at END
+                """, (city, fetched_at, fetched_at, full))
+
+            return {'added': added, 'changed': changed, 'removed': len(removed)}
+        finally:
+            conn.close()
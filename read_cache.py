@@ -0,0 +1,216 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import READ_CACHE_CONFIG
+from sqlite_file import SQLiteFile
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_generations (
+    scope TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+
+class SharedCacheStore:
+    """SQLite file shared by every worker process on the host.
+
+    Holds cached values (pickled; the file is only ever written by this app) and
+    the per-scope generation counters used for invalidation, so one worker's
+    invalidate() is seen by all of them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = SQLiteFile(path, SCHEMA)
+
+    def _connect(self):
+        return self._file.connect()
+
+    def get(self, key):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[1] <= time.time():
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def put(self, key, value, expires_at):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                             (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at))
+                # Keep the file from growing without bound
+                conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        finally:
+            conn.close()
+
+    def generation(self, scope):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT generation FROM cache_generations WHERE scope = ?", (scope,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def bump(self, scope):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO cache_generations (scope, generation) VALUES (?, 1)
+                    ON CONFLICT(scope) DO UPDATE SET generation = generation + 1
+                """, (scope,))
+        finally:
+            conn.close()
+
+
+class ReadThroughCache:
+    """In-process LRU read-through cache with per-namespace TTLs.
+
+    Keys are (namespace, scope, *parts); scope is usually a restaurant id.
+    invalidate(namespace, scope) bumps a generation counter that is part of every
+    key, so all entries of that scope (e.g. every cached review page of one
+    restaurant) are dropped in O(1) and simply age out of the LRU; invalidate(namespace)
+    drops every scope of the namespace the same way. With a shared
+    store the values and generations live in SQLite too, so workers share both.
+    Each worker re-reads a shared generation at most every `generation_ttl`
+    seconds, so in-process hits don't touch SQLite; another worker's
+    invalidate() can take that long to show up here. Concurrent misses for the
+    same key share one loader call.
+    """
+
+    def __init__(self, max_entries=2048, ttls=None, default_ttl=300, store=None, generation_ttl=1.0):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.store = store
+        self.generation_ttl = generation_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self._generations = {}          # (namespace, scope) -> generation, when there is no store
+        self._shared_generations = {}   # store scope -> (generation, read_at), with a store
+        self._inflight = {}             # key -> Future
+        self._stats = {}                # namespace -> counters
+
+    def _count(self, namespace, stat):
+        counters = self._stats.get(namespace)
+        if counters is None:
+            counters = self._stats[namespace] = dict.fromkeys(
+                ('hits', 'shared_hits', 'misses', 'coalesced', 'invalidations', 'evictions'), 0)
+        counters[stat] += 1
+
+    def _scope_generation(self, namespace, scope):
+        if not self.store:
+            return self._generations.get((namespace, scope), 0)
+        name = f"{namespace}:{scope}"
+        now = time.monotonic()
+        cached = self._shared_generations.get(name)
+        if cached is not None and now - cached[1] < self.generation_ttl:
+            return cached[0]
+        generation = self.store.generation(name)
+        self._shared_generations[name] = (generation, now)
+        return generation
+
+    # Part of every key: bumped by invalidate(namespace, scope) and, for every scope, by invalidate(namespace)
+    def _generation(self, namespace, scope):
+        whole = self._scope_generation(namespace, None)
+        return whole if scope is None else (whole, self._scope_generation(namespace, scope))
+
+    def get(self, namespace, scope, parts, loader):
+        """Cached value for (namespace, scope, parts), calling loader() on a miss.
+
+        Loader results of None are returned but not cached (e.g. a DB error).
+        The value is shared with other callers, so treat it as read-only.
+        """
+        key = (namespace, scope, self._generation(namespace, scope)) + tuple(parts)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._count(namespace, 'hits')
+                return entry[0]
+
+        store_key = repr(key)
+        if self.store:
+            stored = self.store.get(store_key)
+            if stored is not None:
+                with self._lock:
+                    self._count(namespace, 'shared_hits')
+                    self._put(key, *stored)
+                return stored[0]
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self._count(namespace, 'misses')
+                self._inflight[key] = future = Future()
+            else:
+                self._count(namespace, 'coalesced')
+        if not leader:
+            return future.result()
+
+        value = None
+        try:
+            value = loader()
+        finally:
+            expires_at = time.time() + self.ttls.get(namespace, self.default_ttl)
+            with self._lock:
+                self._inflight.pop(key, None)
+                if value is not None:
+                    self._put(key, value, expires_at)
+            future.set_result(value)
+        if value is not None and self.store:
+            self.store.put(store_key, value, expires_at)
+        return value
+
+    def _put(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._count(evicted[0], 'evictions')
+
+    def invalidate(self, namespace, scope=None):
+        if self.store:
+            self.store.bump(f"{namespace}:{scope}")
+            # This worker sees its own invalidations right away
+            self._shared_generations.pop(f"{namespace}:{scope}", None)
+        with self._lock:
+            self._generations[(namespace, scope)] = self._generations.get((namespace, scope), 0) + 1
+            self._count(namespace, 'invalidations')
+
+    def stats(self):
+        with self._lock:
+            stats = {'entries': len(self._entries), 'max_entries': self.max_entries,
+                     'shared': self.store is not None, 'namespaces': {}}
+            for namespace, counters in self._stats.items():
+                counters = dict(counters)
+                lookups = counters['hits'] + counters['shared_hits'] + counters['misses'] + counters['coalesced']
+                counters['hit_rate'] = round((lookups - counters['misses']) / lookups, 4) if lookups else None
+                counters['ttl'] = self.ttls.get(namespace, self.default_ttl)
+                stats['namespaces'][namespace] = counters
+        return stats
+
+
+def _build_cache(config):
+    config = dict(config)
+    shared_path = config.pop('shared_path', None)
+    return ReadThroughCache(store=SharedCacheStore(shared_path) if shared_path else None, **config)
+
+
+cache = _build_cache(READ_CACHE_CONFIG)
@@ -287,3 +287,354 @@ BEGIN
     RETURN score;
 END //
 DELIMITER ;
+
+-- Unique identity for restaurants so OSM results can be bulk upserted atomically
+ALTER TABLE restaurants
+ADD UNIQUE KEY uniq_restaurant_identity (source, name, location);
+
+-- Stable OpenStreetMap identity for OSM restaurants
+ALTER TABLE restaurants
+ADD COLUMN osm_type VARCHAR(10),
+ADD COLUMN osm_id BIGINT,
+ADD UNIQUE KEY uniq_osm_element (osm_type, osm_id);
+
+-- Coordinates for nearby-restaurant queries; updated_at lets the in-process geo index sync incrementally
+ALTER TABLE restaurants
+ADD COLUMN latitude DECIMAL(9,6),
+ADD COLUMN longitude DECIMAL(9,6),
+ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+ADD INDEX idx_restaurants_coords (latitude, longitude),
+ADD INDEX idx_restaurants_updated_at (updated_at);
+
+-- Backfill coordinates for OSM rows from their "Lat: x, Lon: y" location
+UPDATE restaurants
+SET latitude = CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(location, 'Lat: ', -1), ',', 1) AS DECIMAL(9,6)),
+    longitude = CAST(SUBSTRING_INDEX(location, 'Lon: ', -1) AS DECIMAL(9,6))
+WHERE source = 'osm' AND location LIKE 'Lat: %, Lon: %';
+
+-- Approximate coordinates for the seeded Pune restaurants
+UPDATE restaurants SET latitude = 18.515800, longitude = 73.878000 WHERE name = 'Spice Villa';
+UPDATE restaurants SET latitude = 18.536200, longitude = 73.894000 WHERE name = 'The Curry House';
+UPDATE restaurants SET latitude = 18.523600, longitude = 73.841400 WHERE name = 'Tandoori Nights';
+UPDATE restaurants SET latitude = 18.559000, longitude = 73.786800 WHERE name = 'Veggie Treat';
+UPDATE restaurants SET latitude = 18.558000, longitude = 73.807500 WHERE name = 'Flavours of South';
+UPDATE restaurants SET latitude = 18.567900, longitude = 73.914300 WHERE name = 'Urban Bites';
+UPDATE restaurants SET latitude = 18.546300, longitude = 73.903300 WHERE name = 'Grill & Chill';
+UPDATE restaurants SET latitude = 18.512200, longitude = 73.886000 WHERE name = 'Maharaja Bhoj';
+UPDATE restaurants SET latitude = 18.591300, longitude = 73.738900 WHERE name = 'Pasta Point';
+UPDATE restaurants SET latitude = 18.508900, longitude = 73.926000 WHERE name = 'Saffron Spice';
+
+-- Replace the full SUM over reservations with an O(1) increment.
+-- The application locks the restaurant row (SELECT ... FOR UPDATE) before inserting,
+-- so the capacity check and this increment happen atomically.
+DROP TRIGGER IF EXISTS after_reservation_insert;
+DELIMITER //
+CREATE TRIGGER after_reservation_insert
+AFTER INSERT ON reservations
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Confirmed' THEN
+        UPDATE restaurants
+        SET current_occupancy = current_occupancy + NEW.num_people
+        WHERE restaurant_id = NEW.restaurant_id;
+    END IF;
+
+    -- Log the reservation activity
+    INSERT INTO activity_log (user_id, activity_type, entity_id, details, created_at)
+    VALUES (NEW.user_id, 'reservation_created', NEW.reservation_id, 
+            CONCAT('Restaurant ID: ', NEW.restaurant_id, ', People: ', NEW.num_people), 
+            NOW());
+END//
+DELIMITER ;
+
+-- Per-restaurant, per-weekday booking counters so /stats does not scan all reservations.
+-- day_of_week follows DAYOFWEEK(): 1=Sunday ... 7=Saturday
+CREATE TABLE restaurant_booking_stats (
+    restaurant_id INT NOT NULL,
+    day_of_week TINYINT NOT NULL,
+    booking_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (restaurant_id, day_of_week),
+    FOREIGN KEY (restaurant_id) REFERENCES restaurants(restaurant_id)
+);
+
+INSERT INTO restaurant_booking_stats (restaurant_id, day_of_week, booking_count)
+SELECT restaurant_id, DAYOFWEEK(reservation_time), COUNT(*)
+FROM reservations
+WHERE reservation_time IS NOT NULL
+GROUP BY restaurant_id, DAYOFWEEK(reservation_time);
+
+-- after_reservation_insert now also bumps the booking counters
+DROP TRIGGER IF EXISTS after_reservation_insert;
+DELIMITER //
+CREATE TRIGGER after_reservation_insert
+AFTER INSERT ON reservations
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Confirmed' THEN
+        UPDATE restaurants
+        SET current_occupancy = current_occupancy + NEW.num_people
+        WHERE restaurant_id = NEW.restaurant_id;
+    END IF;
+
+    IF NEW.reservation_time IS NOT NULL THEN
+        INSERT INTO restaurant_booking_stats (restaurant_id, day_of_week, booking_count)
+        VALUES (NEW.restaurant_id, DAYOFWEEK(NEW.reservation_time), 1)
+        ON DUPLICATE KEY UPDATE booking_count = booking_count + 1;
+    END IF;
+
+    -- Log the reservation activity
+    INSERT INTO activity_log (user_id, activity_type, entity_id, details, created_at)
+    VALUES (NEW.user_id, 'reservation_created', NEW.reservation_id, 
+            CONCAT('Restaurant ID: ', NEW.restaurant_id, ', People: ', NEW.num_people), 
+            NOW());
+END//
+DELIMITER ;
+
+-- Seats taken per (slot, date) for availability lookups
+ALTER TABLE reservations
+ADD INDEX idx_reservations_restaurant_date (restaurant_id, reservation_date, slot_id, status, num_people);
+
+-- Materialized ranking aggregates so suggestions are a plain indexed sort.
+-- rating_sum/rating_count are bumped by add_review, reservations_30d by the
+-- reservation insert trigger; rebuild_restaurant_aggregates() (python stats_cache.py)
+-- recomputes all three and ages reservations out of the 30-day window.
+ALTER TABLE restaurants
+ADD COLUMN rating_sum INT NOT NULL DEFAULT 0,
+ADD COLUMN rating_count INT NOT NULL DEFAULT 0,
+ADD COLUMN reservations_30d INT NOT NULL DEFAULT 0,
+ADD COLUMN avg_rating DECIMAL(3,2) AS (IF(rating_count = 0, 0, rating_sum / rating_count)) STORED,
+ADD COLUMN occupancy_rate DECIMAL(8,4) AS (IF(seating_capacity > 0, current_occupancy / seating_capacity, 1)) STORED,
+ADD INDEX idx_restaurants_ranking (occupancy_rate, avg_rating DESC),
+ADD INDEX idx_restaurants_category_ranking (category_id, occupancy_rate, avg_rating DESC);
+
+UPDATE restaurants r
+JOIN (
+    SELECT restaurant_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+    FROM reviews
+    GROUP BY restaurant_id
+) rv ON rv.restaurant_id = r.restaurant_id
+SET r.rating_sum = rv.rating_sum, r.rating_count = rv.rating_count;
+
+UPDATE restaurants r
+JOIN (
+    SELECT restaurant_id, COUNT(*) AS reservations_30d
+    FROM reservations
+    WHERE reservation_time >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+    GROUP BY restaurant_id
+) rs ON rs.restaurant_id = r.restaurant_id
+SET r.reservations_30d = rs.reservations_30d;
+
+-- after_reservation_insert now also counts the reservation towards reservations_30d
+DROP TRIGGER IF EXISTS after_reservation_insert;
+DELIMITER //
+CREATE TRIGGER after_reservation_insert
+AFTER INSERT ON reservations
+FOR EACH ROW
+BEGIN
+    UPDATE restaurants
+    SET current_occupancy = current_occupancy + IF(NEW.status = 'Confirmed', NEW.num_people, 0),
+        reservations_30d = reservations_30d + IF(NEW.reservation_time >= DATE_SUB(NOW(), INTERVAL 30 DAY), 1, 0)
+    WHERE restaurant_id = NEW.restaurant_id;
+
+    IF NEW.reservation_time IS NOT NULL THEN
+        INSERT INTO restaurant_booking_stats (restaurant_id, day_of_week, booking_count)
+        VALUES (NEW.restaurant_id, DAYOFWEEK(NEW.reservation_time), 1)
+        ON DUPLICATE KEY UPDATE booking_count = booking_count + 1;
+    END IF;
+
+    -- Log the reservation activity
+    INSERT INTO activity_log (user_id, activity_type, entity_id, details, created_at)
+    VALUES (NEW.user_id, 'reservation_created', NEW.reservation_id, 
+            CONCAT('Restaurant ID: ', NEW.restaurant_id, ', People: ', NEW.num_people), 
+            NOW());
+END//
+DELIMITER ;
+
+-- Read the materialized aggregates instead of scanning reviews/reservations
+DROP FUNCTION IF EXISTS GetRestaurantRating;
+DELIMITER //
+CREATE FUNCTION GetRestaurantRating(p_restaurant_id INT) 
+RETURNS DECIMAL(3,2)
+READS SQL DATA
+BEGIN
+    DECLARE avg_rating DECIMAL(3,2);
+    
+    SELECT COALESCE(MAX(r.avg_rating), 0) INTO avg_rating
+    FROM restaurants r
+    WHERE r.restaurant_id = p_restaurant_id;
+    
+    RETURN avg_rating;
+END //
+DELIMITER ;
+
+DROP FUNCTION IF EXISTS CalculatePopularityScore;
+DELIMITER //
+CREATE FUNCTION CalculatePopularityScore(
+    p_restaurant_id INT
+) 
+RETURNS DECIMAL(10,2)
+READS SQL DATA
+BEGIN
+    DECLARE score DECIMAL(10,2);
+    
+    -- 60% reservations, 40% ratings (average rating * number of reviews = rating_sum)
+    SELECT (r.reservations_30d * 0.6) + (r.rating_sum * 0.4) INTO score
+    FROM restaurants r
+    WHERE r.restaurant_id = p_restaurant_id;
+    
+    RETURN COALESCE(score, 0);
+END //
+DELIMITER ;
+
+-- Sort on the indexed aggregate columns; a NULL city no longer filters out every row
+DROP PROCEDURE IF EXISTS SuggestRestaurants;
+DELIMITER //
+CREATE PROCEDURE SuggestRestaurants(
+    IN p_city VARCHAR(100),
+    IN p_max_results INT,
+    IN p_category_id INT
+)
+BEGIN
+    SELECT 
+        r.restaurant_id, 
+        r.name, 
+        r.location,
+        r.current_occupancy,
+        r.seating_capacity,
+        r.occupancy_rate,
+        r.avg_rating
+    FROM restaurants r
+    WHERE 
+        (p_city IS NULL OR r.location LIKE CONCAT('%', p_city, '%'))
+        AND (p_category_id IS NULL OR r.category_id = p_category_id)
+    ORDER BY 
+        r.occupancy_rate ASC,
+        r.avg_rating DESC
+    LIMIT p_max_results;
+END //
+DELIMITER ;
+
+-- City for exact-match listing filters (location LIKE '%city%' cannot use an index).
+-- OSM rows get it from the city they were searched under; local rows from the end of their address.
+ALTER TABLE restaurants
+ADD COLUMN city VARCHAR(100);
+
+UPDATE restaurants
+SET city = TRIM(SUBSTRING_INDEX(location, ',', -1))
+WHERE source = 'local' AND location LIKE '%,%';
+
+-- Keyset pagination on (occupancy_rate, restaurant_id) for /api/restaurants, with and without filters
+ALTER TABLE restaurants
+ADD INDEX idx_restaurants_listing (occupancy_rate, restaurant_id),
+ADD INDEX idx_restaurants_category_listing (category_id, occupancy_rate, restaurant_id),
+ADD INDEX idx_restaurants_source_listing (source, occupancy_rate, restaurant_id),
+ADD INDEX idx_restaurants_city_listing (city, occupancy_rate, restaurant_id);
+
+-- Vegetarian-menu filter probes menu_items per candidate restaurant
+ALTER TABLE menu_items
+ADD INDEX idx_menu_items_vegetarian (restaurant_id, is_vegetarian, is_available);
+
+-- Change tracking for the in-process search index
+ALTER TABLE menu_items
+ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+ADD INDEX idx_menu_items_updated_at (updated_at);
+
+-- Deleted menu items leave nothing to find by updated_at, so touch their restaurant instead
+DELIMITER //
+CREATE TRIGGER after_menu_item_delete
+AFTER DELETE ON menu_items
+FOR EACH ROW
+BEGIN
+    UPDATE restaurants SET updated_at = CURRENT_TIMESTAMP WHERE restaurant_id = OLD.restaurant_id;
+END//
+DELIMITER ;
+
+-- Newest-first review pages, keyset on (review_date, review_id)
+ALTER TABLE reviews
+ADD INDEX idx_reviews_restaurant_date (restaurant_id, review_date DESC, review_id DESC);
+
+-- Per-restaurant star histogram, bumped by add_review alongside restaurants.rating_sum/rating_count
+CREATE TABLE restaurant_rating_stats (
+    restaurant_id INT NOT NULL,
+    rating TINYINT NOT NULL,
+    review_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (restaurant_id, rating),
+    FOREIGN KEY (restaurant_id) REFERENCES restaurants(restaurant_id)
+);
+
+INSERT INTO restaurant_rating_stats (restaurant_id, rating, review_count)
+SELECT restaurant_id, rating, COUNT(*)
+FROM reviews
+GROUP BY restaurant_id, rating;
+
+-- Write-behind bookings (booking_queue.py): each queued reservation carries a unique id,
+-- so a batch replayed after a crash is not inserted twice
+ALTER TABLE reservations
+ADD COLUMN queue_id CHAR(32) NULL,
+ADD UNIQUE KEY uq_reservations_queue_id (queue_id);
+
+-- Activity logging moves out of the reservation triggers into the application
+-- (activity_log.py buffers events and writes them in batches), so booking
+-- transactions no longer insert into activity_log.
+DROP TRIGGER IF EXISTS after_reservation_insert;
+DELIMITER //
+CREATE TRIGGER after_reservation_insert
+AFTER INSERT ON reservations
+FOR EACH ROW
+BEGIN
+    UPDATE restaurants
+    SET current_occupancy = current_occupancy + IF(NEW.status = 'Confirmed', NEW.num_people, 0),
+        reservations_30d = reservations_30d + IF(NEW.reservation_time >= DATE_SUB(NOW(), INTERVAL 30 DAY), 1, 0)
+    WHERE restaurant_id = NEW.restaurant_id;
+
+    IF NEW.reservation_time IS NOT NULL THEN
+        INSERT INTO restaurant_booking_stats (restaurant_id, day_of_week, booking_count)
+        VALUES (NEW.restaurant_id, DAYOFWEEK(NEW.reservation_time), 1)
+        ON DUPLICATE KEY UPDATE booking_count = booking_count + 1;
+    END IF;
+END//
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS after_reservation_update;
+DELIMITER //
+CREATE TRIGGER after_reservation_update
+AFTER UPDATE ON reservations
+FOR EACH ROW
+BEGIN
+    IF OLD.status != 'Cancelled' AND NEW.status = 'Cancelled' THEN
+        UPDATE restaurants
+        SET current_occupancy = current_occupancy - NEW.num_people
+        WHERE restaurant_id = NEW.restaurant_id;
+    END IF;
+END//
+DELIMITER ;
+
+-- Partition activity_log by month so old months can be dropped instead of deleted.
+-- Partitioned tables cannot have foreign keys, and the partitioning column must be
+-- part of the primary key. `python activity_log.py` (run daily) splits pmax into
+-- monthly partitions; the first one it creates also holds all earlier rows.
+ALTER TABLE activity_log DROP FOREIGN KEY activity_log_ibfk_1;
+ALTER TABLE activity_log
+DROP INDEX user_id,
+MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+DROP PRIMARY KEY,
+ADD PRIMARY KEY (log_id, created_at),
+ADD INDEX idx_activity_log_created (created_at),
+ADD INDEX idx_activity_log_type_created (activity_type, created_at),
+ADD INDEX idx_activity_log_user_created (user_id, created_at);
+
+ALTER TABLE activity_log
+PARTITION BY RANGE COLUMNS (created_at) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Daily counts of months that have aged out of activity_log
+CREATE TABLE activity_daily (
+    activity_date DATE NOT NULL,
+    activity_type VARCHAR(50) NOT NULL,
+    event_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (activity_date, activity_type)
+);
+
+-- Later schema changes are numbered migrations in migrations.py; run `python migrations.py`
+-- after this script (it records what it applied in schema_migrations).
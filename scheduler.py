@@ -0,0 +1,177 @@
+import bisect
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import mysql.connector
+import db_pool
+import occupancy
+from config import SCHEDULER_CONFIG
+
+
+class SuggestionScheduler:
+    """Picks the restaurant to suggest, spreading simultaneous users out.
+
+    Every suggestion is counted as pending for `pending_ttl` seconds, or until a
+    booking at that restaurant lands, and strategies rank restaurants by their
+    effective load: (occupancy + pending * pending_seats) / capacity. Without it
+    every user asking in the same instant would be sent to the same restaurant.
+
+    Strategies (select one per call with `strategy=`):
+      least_rate      lowest effective occupancy rate
+      power_of_two    two random restaurants, the less loaded one wins
+      weighted_free   random, weighted by free seats
+      predicted_load  effective rate plus the busy_hours score for this hour
+    """
+
+    def __init__(self, engine, pending_ttl=120, pending_seats=2, busy_weight=0.5,
+                 busy_refresh=3600, default_strategy='least_rate', busy_loader=None, rng=None,
+                 clock=time.monotonic):
+        self.engine = engine
+        self.pending_ttl = pending_ttl
+        self.pending_seats = pending_seats
+        self.busy_weight = busy_weight
+        self.busy_refresh = busy_refresh
+        self.default_strategy = default_strategy
+        self._busy_loader = busy_loader or load_busy_hours
+        self._busy = (None, 0, {})    # ((day, hour), loaded_at, {restaurant_id: score})
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}            # restaurant_id -> deque of expiry times, oldest first
+        self._expiries = deque()      # (expiry, restaurant_id) in suggestion order
+        self.stats = {'suggestions': 0, 'released': 0, 'expired': 0}
+        self.strategies = {
+            'least_rate': self._least_rate,
+            'power_of_two': self._power_of_two,
+            'weighted_free': self._weighted_free,
+            'predicted_load': self._predicted_load,
+        }
+
+    # --- pending suggestions ------------------------------------------------------
+
+    def _expire(self, now):
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            _, restaurant_id = expiries.popleft()
+            pending = self._pending.get(restaurant_id)
+            # Entries already released by a booking are gone from the per-restaurant deque
+            if pending and pending[0] <= now:
+                pending.popleft()
+                self.stats['expired'] += 1
+                if not pending:
+                    del self._pending[restaurant_id]
+
+    def release(self, restaurant_id):
+        """A booking landed at restaurant_id; it no longer needs its oldest pending slot."""
+        with self._lock:
+            pending = self._pending.get(restaurant_id)
+            if pending:
+                pending.popleft()
+                self.stats['released'] += 1
+                if not pending:
+                    del self._pending[restaurant_id]
+
+    def pending(self):
+        with self._lock:
+            self._expire(self._clock())
+            return {restaurant_id: len(times) for restaurant_id, times in self._pending.items()}
+
+    def _load(self, restaurant_id, capacity, current):
+        if capacity <= 0:
+            return 1.0
+        pending = self._pending.get(restaurant_id)
+        return (current + (len(pending) * self.pending_seats if pending else 0)) / capacity
+
+    # --- strategies (called with self._lock held) ------------------------------------
+
+    def _least_rate(self):
+        # Pending only raises a restaurant's load, so the winner is among the first
+        # len(pending) + 1 restaurants by raw rate: at least one of those has nothing pending
+        candidates = self.engine.least_crowded(len(self._pending) + 1)
+        rows = self.engine.rows(candidates)
+        return min(rows, key=lambda row: self._load(*row), default=None)
+
+    def _power_of_two(self):
+        return min(self.engine.sample(2, self._rng), key=lambda row: self._load(*row), default=None)
+
+    def _weighted_free(self):
+        rows = self.engine.rows()
+        free = [max(0, capacity - current - len(self._pending.get(restaurant_id, ())) * self.pending_seats)
+                for restaurant_id, capacity, current in rows]
+        cumulative = list(itertools.accumulate(free))
+        if not cumulative or cumulative[-1] == 0:
+            return self._least_rate()
+        return rows[bisect.bisect_right(cumulative, self._rng.random() * cumulative[-1])]
+
+    def _predicted_load(self):
+        scores = self._busy[2]
+        return min(self.engine.rows(),
+                   key=lambda row: self._load(*row) + self.busy_weight * scores.get(row[0], 0.0),
+                   default=None)
+
+    # Called without self._lock: the loader queries MySQL. On an error the old
+    # scores stay and loaded_at is left alone, so the next suggestion retries.
+    def _refresh_busy_scores(self):
+        # busy_hours uses 0 = Monday, like datetime.weekday()
+        now = datetime.now()
+        key = (now.weekday(), now.hour)
+        cached_key, loaded_at, _ = self._busy
+        if cached_key == key and time.monotonic() - loaded_at <= self.busy_refresh:
+            return
+        try:
+            scores = self._busy_loader(*key)
+        except mysql.connector.Error as e:
+            print(f"Error loading busy hours: {e}")
+            return
+        self._busy = (key, time.monotonic(), scores)
+
+    # --- entry point ----------------------------------------------------------------
+
+    def suggest(self, strategy=None):
+        """Restaurant id to suggest, or None if no restaurants are loaded.
+
+        Raises KeyError for an unknown strategy name.
+        """
+        strategy = strategy or self.default_strategy
+        choose = self.strategies[strategy]
+        if strategy == 'predicted_load':
+            self._refresh_busy_scores()
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            row = choose()
+            if row is None:
+                return None
+            restaurant_id = row[0]
+            expiry = now + self.pending_ttl
+            self._pending.setdefault(restaurant_id, deque()).append(expiry)
+            self._expiries.append((expiry, restaurant_id))
+            self.stats['suggestions'] += 1
+            return restaurant_id
+
+
+# busy_hours scores for one (day_of_week, hour_of_day)
+def load_busy_hours(day, hour):
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT restaurant_id, busyness_score FROM busy_hours
+            WHERE day_of_week = %s AND hour_of_day = %s
+        """, (day, hour))
+        return {restaurant_id: float(score) for restaurant_id, score in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+scheduler = SuggestionScheduler(occupancy.engine,
+                                pending_ttl=SCHEDULER_CONFIG['pending_ttl'],
+                                pending_seats=SCHEDULER_CONFIG['pending_seats'],
+                                busy_weight=SCHEDULER_CONFIG['busy_weight'],
+                                busy_refresh=SCHEDULER_CONFIG['busy_refresh'],
+                                default_strategy=SCHEDULER_CONFIG['strategy'])
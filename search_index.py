@@ -0,0 +1,341 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+
+import mysql.connector
+import db_pool
+import occupancy
+from config import SEARCH_CONFIG
+
+# How much a term counts depending on where it appears
+FIELD_WEIGHTS = {'name': 3.0, 'category': 2.0, 'item_name': 2.0, 'item_description': 1.0, 'menu': 1.0}
+PREFIX_PENALTY = 0.8  # "pan" matching "paneer" ranks below an exact "pan"
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class MenuSearchIndex:
+    """In-process inverted index over restaurant names, categories and menus.
+
+    One document per restaurant; its terms come from the restaurant name, the
+    free-text menu column, its category name and its available menu items, each
+    weighted by FIELD_WEIGHTS. The vocabulary is also kept sorted so the last
+    query word can be matched as a prefix (autocomplete).
+
+    set_restaurant() replaces a restaurant's document in place, so the index is
+    updated incrementally when a restaurant or its menu items change.
+    """
+
+    def __init__(self, max_expansions=50):
+        self.max_expansions = max_expansions
+        self._postings = {}   # term -> {restaurant_id: weight}
+        self._terms = []      # sorted vocabulary, for prefix lookups
+        self._docs = {}       # restaurant_id -> {term: weight}
+        self._info = {}       # restaurant_id -> {'name', 'city', 'category'}
+        self._items = {}      # restaurant_id -> [(item_id, name, set of terms)]
+        self._ranked_cache = {}  # term -> [(weight, restaurant_id)] sorted descending
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add_term(self, term, restaurant_id, weight):
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = {}
+            bisect.insort(self._terms, term)
+        postings[restaurant_id] = weight
+        self._ranked_cache.pop(term, None)
+
+    def _drop_term(self, term, restaurant_id):
+        postings = self._postings[term]
+        del postings[restaurant_id]
+        self._ranked_cache.pop(term, None)
+        if not postings:
+            del self._postings[term]
+            del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def set_restaurant(self, restaurant_id, name, city=None, category=None, menu=None, items=()):
+        """(Re)index a restaurant. items is an iterable of (item_id, name, description)."""
+        doc = {}
+
+        def add(text, field):
+            for term in tokenize(text):
+                doc[term] = doc.get(term, 0.0) + FIELD_WEIGHTS[field]
+
+        add(name, 'name')
+        add(category, 'category')
+        add(menu, 'menu')
+        item_terms = []
+        for item_id, item_name, description in items:
+            add(item_name, 'item_name')
+            add(description, 'item_description')
+            item_terms.append((item_id, item_name, set(tokenize(item_name)) | set(tokenize(description))))
+
+        old = self._docs.get(restaurant_id, {})
+        for term in old.keys() - doc.keys():
+            self._drop_term(term, restaurant_id)
+        for term, weight in doc.items():
+            if old.get(term) != weight:
+                self._add_term(term, restaurant_id, weight)
+
+        self._docs[restaurant_id] = doc
+        self._info[restaurant_id] = {'name': name, 'city': city, 'category': category}
+        self._items[restaurant_id] = item_terms
+
+    def remove_restaurant(self, restaurant_id):
+        for term in self._docs.pop(restaurant_id, {}):
+            self._drop_term(term, restaurant_id)
+        self._info.pop(restaurant_id, None)
+        self._items.pop(restaurant_id, None)
+
+    def _expand(self, token, prefix):
+        if token in self._postings:
+            yield token, 1.0
+        if not prefix:
+            return
+        start = bisect.bisect_right(self._terms, token)
+        for term in self._terms[start:start + self.max_expansions]:
+            if not term.startswith(token):
+                break
+            yield term, PREFIX_PENALTY
+
+    def _ranked(self, term):
+        # Postings by descending weight, cached until the term's postings change
+        ranked = self._ranked_cache.get(term)
+        if ranked is None:
+            ranked = self._ranked_cache[term] = sorted(
+                ((weight, restaurant_id) for restaurant_id, weight in self._postings[term].items()), reverse=True)
+        return ranked
+
+    @staticmethod
+    def _scored(ranked, scale):
+        for weight, restaurant_id in ranked:
+            yield scale * weight / (weight + 1.2), restaurant_id
+
+    def _token_terms(self, token, prefix):
+        # [(term, scale)] for a query word; BM25-style saturation is applied per posting
+        n = len(self._docs)
+        return [(term, factor * math.log(1 + n / len(self._postings[term])))
+                for term, factor in self._expand(token, prefix)]
+
+    def _token_score(self, terms, restaurant_id):
+        best = 0.0
+        for term, scale in terms:
+            weight = self._postings[term].get(restaurant_id)
+            if weight:
+                best = max(best, scale * weight / (weight + 1.2))
+        return best
+
+    def search(self, query, limit=10, load_of=None, capacity_weight=1.0, max_candidates=1000):
+        """Restaurants matching every word of query, best first.
+
+        The last word is matched as a prefix unless the query ends in a space.
+        Relevance is multiplied by (1 + capacity_weight * free share of seats);
+        load_of(restaurant_id) returns the occupancy rate, or None if unknown.
+
+        Candidates are pulled from the rarest word's postings in descending score
+        order and the scan stops as soon as nothing further down can reach the
+        current top `limit`, or after max_candidates matches.
+        """
+        tokens = tokenize(query)
+        if not tokens or limit <= 0:
+            return []
+        prefix_last = not query[-1:].isspace()
+
+        per_token = [self._token_terms(token, prefix_last and i == len(tokens) - 1)
+                     for i, token in enumerate(tokens)]
+        if not all(per_token):
+            return []
+        per_token.sort(key=lambda terms: sum(len(self._postings[term]) for term, _ in terms))
+        driver, others = per_token[0], per_token[1:]
+        others_max = sum(max(scale * self._ranked(term)[0][0] / (self._ranked(term)[0][0] + 1.2)
+                             for term, scale in terms)
+                         for terms in others)
+        boost = 1 + capacity_weight
+
+        stream = heapq.merge(*(self._scored(self._ranked(term), scale) for term, scale in driver), reverse=True)
+        top = []   # min-heap of (score, relevance, free, restaurant_id)
+        seen = set()
+        for score, restaurant_id in stream:
+            if len(top) == limit and (score + others_max) * boost <= top[0][0]:
+                break
+            if restaurant_id in seen:
+                continue  # already scored via a better-matching expansion
+            seen.add(restaurant_id)
+
+            relevance = score
+            for terms in others:
+                other = self._token_score(terms, restaurant_id)
+                if not other:
+                    break
+                relevance += other
+            else:
+                rate = load_of(restaurant_id) if load_of else None
+                free = 0.5 if rate is None else min(max(1.0 - rate, 0.0), 1.0)
+                entry = (relevance * (1 + capacity_weight * free), relevance, free, restaurant_id)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+                if len(seen) >= max_candidates:
+                    break
+
+        matched = {term for terms in per_token for term, _ in terms}
+        results = []
+        for score, relevance, free, restaurant_id in sorted(top, reverse=True):
+            items = [item_name for _, item_name, terms in self._items[restaurant_id] if terms & matched][:3]
+            results.append(dict(self._info[restaurant_id], restaurant_id=restaurant_id,
+                                score=round(score, 4), relevance=round(relevance, 4),
+                                free_share=round(free, 4), matching_items=items))
+        return results
+
+
+class RestaurantSearchIndex:
+    """MenuSearchIndex kept in sync with MySQL.
+
+    Restaurants whose row (restaurants.updated_at) or menu items
+    (menu_items.updated_at; deletions touch the restaurant via a trigger) changed
+    since the last sync are re-read and re-indexed. Restaurants deleted outright
+    disappear at the next full rebuild.
+    """
+
+    def __init__(self, refresh_interval=5.0, rebuild_interval=3600.0, capacity_weight=1.0, max_expansions=50):
+        self.index = MenuSearchIndex(max_expansions)
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity_weight = capacity_weight
+        self._lock = threading.Lock()          # guards the index
+        self._sync_lock = threading.Lock()     # only one thread talks to the DB at a time
+        self._watermark = None
+        self._last_sync = 0.0
+        self._last_rebuild = 0.0
+
+    def _changed_ids(self, cursor):
+        cursor.execute("""
+            SELECT restaurant_id, updated_at FROM restaurants WHERE updated_at >= %s
+            UNION ALL
+            SELECT restaurant_id, updated_at FROM menu_items WHERE updated_at >= %s
+        """, (self._watermark, self._watermark))
+        ids = set()
+        watermark = self._watermark
+        for restaurant_id, updated_at in cursor.fetchall():
+            ids.add(restaurant_id)
+            if updated_at is not None and updated_at > watermark:
+                watermark = updated_at
+        return ids, watermark
+
+    def _load_documents(self, cursor, ids=None):
+        restaurant_filter = item_filter = ""
+        params = ()
+        if ids is not None:
+            placeholders = ", ".join(["%s"] * len(ids))
+            restaurant_filter = f"WHERE r.restaurant_id IN ({placeholders})"
+            item_filter = f"AND m.restaurant_id IN ({placeholders})"
+            params = tuple(ids)
+        cursor.execute(f"""
+            SELECT r.restaurant_id, r.name, r.city, r.menu, c.category_name
+            FROM restaurants r
+            LEFT JOIN restaurant_categories c ON c.category_id = r.category_id
+            {restaurant_filter}
+        """, params)
+        restaurants = cursor.fetchall()
+
+        cursor.execute(f"""
+            SELECT m.item_id, m.restaurant_id, m.name, m.description
+            FROM menu_items m
+            WHERE m.is_available = TRUE {item_filter}
+        """, params)
+        items = {}
+        for item_id, restaurant_id, name, description in cursor.fetchall():
+            items.setdefault(restaurant_id, []).append((item_id, name, description))
+        return restaurants, items
+
+    @staticmethod
+    def _apply(index, documents, ids=None):
+        seen = set()
+        for restaurants, items in documents:
+            for restaurant_id, name, city, menu, category in restaurants:
+                seen.add(restaurant_id)
+                index.set_restaurant(restaurant_id, name, city, category, menu, items.get(restaurant_id, ()))
+        for restaurant_id in (ids or set()) - seen:
+            index.remove_restaurant(restaurant_id)
+
+    # Pull changed restaurants since the last sync; a full rebuild on first use and every rebuild_interval
+    def sync(self, full=False):
+        with self._sync_lock:
+            full = full or self._watermark is None or time.monotonic() - self._last_rebuild > self.rebuild_interval
+            try:
+                conn = db_pool.get_connection()
+            except mysql.connector.Error as e:
+                print(f"Search index sync error: {e}")
+                return False
+
+            cursor = conn.cursor()
+            try:
+                started = time.monotonic()
+                cursor.execute("SELECT NOW()")
+                now = cursor.fetchone()[0]
+                if full:
+                    ids, watermark = None, now
+                else:
+                    ids, watermark = self._changed_ids(cursor)
+                documents = []
+                # Chunk the IN lists for large change sets
+                for chunk in ([None] if ids is None else
+                              [list(ids)[i:i + 1000] for i in range(0, len(ids), 1000)]):
+                    documents.append(self._load_documents(cursor, chunk))
+            except mysql.connector.Error as e:
+                print(f"Search index sync error: {e}")
+                return False
+            finally:
+                cursor.close()
+                conn.close()
+
+            if full:
+                # Build the replacement off to the side so searches keep running meanwhile
+                index = MenuSearchIndex(self.index.max_expansions)
+                self._apply(index, documents)
+                with self._lock:
+                    self.index = index
+            else:
+                with self._lock:
+                    self._apply(self.index, documents, ids)
+            self._watermark = watermark
+            self._last_sync = started
+            if full:
+                self._last_rebuild = started
+            return True
+
+    def _ensure_fresh(self):
+        if self._watermark is None:
+            self.sync()
+        elif time.monotonic() - self._last_sync > self.refresh_interval and not self._sync_lock.locked():
+            # Someone else already refreshing: serve what we have
+            self.sync()
+
+    def search(self, query, limit=10):
+        self._ensure_fresh()
+        with self._lock:
+            return self.index.search(query, limit, load_of=_engine_load, capacity_weight=self.capacity_weight)
+
+
+# Live occupancy rate from the occupancy engine, None if it does not know the restaurant
+def _engine_load(restaurant_id):
+    row = occupancy.engine.get(restaurant_id)
+    if row is None or row['seating_capacity'] <= 0:
+        return None
+    return row['current_occupancy'] / row['seating_capacity']
+
+
+_index = RestaurantSearchIndex(**SEARCH_CONFIG)
+
+
+def search_restaurants_and_menus(query, limit=10):
+    return _index.search(query, limit)
@@ -0,0 +1,293 @@
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+
+from config import SESSION_CONFIG
+from sqlite_file import SQLiteFile
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
+"""
+
+
+class MemorySessionStore:
+    """Sessions held in this process, ordered by last write.
+
+    Every write uses the same TTL, so the oldest entries expire first and a
+    sweep only looks at the sessions it removes. Only valid with one worker
+    process; use SQLiteSessionStore when there are several.
+    """
+
+    def __init__(self, max_sessions=100000):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # token -> (data, expires_at)
+        self._evictions = 0
+
+    # Returns (data, expires_at) or None if missing or expired
+    def load(self, token):
+        with self._lock:
+            entry = self._sessions.get(token)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry
+
+    def save(self, token, data, expires_at):
+        with self._lock:
+            self._sessions[token] = (data, expires_at)
+            self._sessions.move_to_end(token)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def sweep(self):
+        now = time.time()
+        removed = 0
+        with self._lock:
+            while self._sessions:
+                token, (_, expires_at) = next(iter(self._sessions.items()))
+                if expires_at > now:
+                    break
+                del self._sessions[token]
+                removed += 1
+        return removed
+
+    def stats(self):
+        return {'active': len(self._sessions), 'max_sessions': self.max_sessions, 'evictions': self._evictions}
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file shared by every worker process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = SQLiteFile(path, SCHEMA)
+
+    def _connect(self):
+        return self._file.connect()
+
+    def load(self, token):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT data, expires_at FROM sessions WHERE token = ? AND expires_at > ?",
+                                (token, time.time())).fetchone()
+        finally:
+            conn.close()
+
+    def save(self, token, data, expires_at):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO sessions (token, data, expires_at) VALUES (?, ?, ?)",
+                             (token, data, expires_at))
+        finally:
+            conn.close()
+
+    def delete(self, token):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+        finally:
+            conn.close()
+
+    def sweep(self):
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            return {'active': conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0], 'path': self.path}
+        finally:
+            conn.close()
+
+
+class ServerSession(SessionMixin):
+    """Session whose data is only fetched from the store on first access.
+
+    Requests that never touch `session` (most /api/ routes) cost nothing.
+    """
+
+    def __init__(self, interface, token):
+        self.interface = interface
+        self.token = token           # from the cookie; may be unknown or expired
+        self.expires_at = None
+        self.rotate = False
+        self.modified = False
+        self.accessed = False
+        self._data = None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def _load(self):
+        if self._data is None:
+            self.accessed = True
+            self._data, self.expires_at = self.interface.load(self.token)
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __contains__(self, key):
+        return key in self._load()
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session backend keeping session data server-side.
+
+    The cookie only carries a random token, so there is nothing to decode or
+    HMAC-verify per request; values are pickled (the store is only written by
+    this app). Expiry slides: a session is rewritten once less than half its
+    TTL is left. A background thread sweeps expired sessions in bulk.
+    """
+
+    def __init__(self, store, ttl=7 * 86400, sweep_interval=60):
+        self.store = store
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stats = dict.fromkeys(
+            ('opened', 'untouched', 'loads', 'misses', 'saves', 'refreshes', 'deletes', 'swept', 'sweeps'), 0)
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self._stats[stat] += n
+
+    def open_session(self, app, request):
+        if self._sweeper is None:
+            self._start_sweeper()
+        self._count('opened')
+        return ServerSession(self, request.cookies.get(self.get_cookie_name(app)))
+
+    # Returns (data dict, expires_at); an empty dict for new, unknown or expired tokens
+    def load(self, token):
+        if not token:
+            return {}, None
+        entry = self.store.load(token)
+        self._count('loads' if entry else 'misses')
+        if entry is None:
+            return {}, None
+        return pickle.loads(entry[0]), entry[1]
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            self._count('untouched')
+            return
+        response.vary.add('Cookie')
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+
+        if not session:
+            # Logged out (or never had data): drop the stored session and the cookie
+            if session.token:
+                self.store.delete(session.token)
+                self._count('deletes')
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite)
+            return
+
+        now = time.time()
+        if session.rotate and session.token:
+            self.store.delete(session.token)
+            self._count('deletes')
+        elif session.expires_at is not None and not session.modified:
+            if session.expires_at - now > self.ttl / 2:
+                return
+            self._count('refreshes')
+        token = session.token if session.expires_at is not None and not session.rotate else secrets.token_urlsafe(32)
+
+        self.store.save(token, pickle.dumps(session._data, pickle.HIGHEST_PROTOCOL), now + self.ttl)
+        self._count('saves')
+        response.set_cookie(name, token, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=secure, samesite=samesite)
+
+    def _start_sweeper(self):
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='session-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def sweep(self):
+        try:
+            removed = self.store.sweep()
+        except sqlite3.Error as e:
+            print(f"Session sweep error: {e}")
+            return 0
+        self._count('swept', removed)
+        self._count('sweeps')
+        return removed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(self.store.stats())
+        stats['ttl'] = self.ttl
+        return stats
+
+
+# Issue a new session token, e.g. on login, so a token planted before login is useless afterwards.
+# No-op for Flask's cookie sessions.
+def regenerate(session):
+    if isinstance(session, ServerSession):
+        session._load()
+        session.rotate = True
+        session.modified = True
+
+
+def build_session_interface(config):
+    if config['backend'] == 'memory':
+        store = MemorySessionStore(config['max_sessions'])
+    elif config['backend'] == 'sqlite':
+        store = SQLiteSessionStore(config['path'])
+    else:
+        return None  # Flask's signed-cookie sessions
+    return ServerSessionInterface(store, config['ttl'], config['sweep_interval'])
+
+
+session_interface = build_session_interface(SESSION_CONFIG)
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteFile:
+    """A local SQLite file used by one of the app's stores.
+
+    The first connection creates the file's directory, switches it to WAL (so
+    readers in other processes don't block the writer) and runs `schema`, which
+    should only hold CREATE ... IF NOT EXISTS statements.
+    """
+
+    def __init__(self, path, schema, synchronous=None):
+        self.path = path
+        self.schema = schema
+        self.synchronous = synchronous  # e.g. 'FULL' for files that must survive a power loss
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self, check_same_thread=True):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, timeout=10)
+                    try:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(self.schema)
+                    finally:
+                        conn.close()
+                    self._initialized = True
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=check_same_thread)
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
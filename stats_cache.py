@@ -0,0 +1,174 @@
+import threading
+import time
+
+import mysql.connector
+import db_pool
+from config import STATS_CONFIG
+from read_cache import cache
+
+# Booking aggregates come from restaurant_booking_stats, a (restaurant, weekday) counter
+# table kept up to date by the after_reservation_insert trigger, so building the page
+# costs the same no matter how many reservations exist. Restaurant-level aggregates
+# (occupancy, sources) scan only the restaurants table. The assembled stats are cached
+# in-process for STATS_CACHE_TTL seconds.
+
+_lock = threading.Lock()
+_cached = None       # (stats, built_at)
+
+
+def _build_stats(cursor):
+    stats = {}
+
+    cursor.execute("""
+        SELECT r.name, CAST(SUM(s.booking_count) AS UNSIGNED) as booking_count
+        FROM restaurant_booking_stats s
+        JOIN restaurants r ON s.restaurant_id = r.restaurant_id
+        GROUP BY s.restaurant_id
+        ORDER BY booking_count DESC
+        LIMIT 5
+    """)
+    stats['top_restaurants'] = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT
+            AVG(current_occupancy) as avg_occupancy,
+            MAX(current_occupancy) as max_occupancy,
+            SUM(current_occupancy) as total_customers,
+            AVG(current_occupancy / seating_capacity * 100) as avg_occupancy_percent
+        FROM restaurants
+    """)
+    stats['occupancy'] = cursor.fetchone()
+
+    cursor.execute("""
+        SELECT
+            ELT(day_of_week, 'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday') as day_name,
+            CAST(SUM(booking_count) AS UNSIGNED) as booking_count
+        FROM restaurant_booking_stats
+        GROUP BY day_of_week
+        HAVING booking_count > 0
+        ORDER BY FIELD(day_name, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+    """)
+    stats['booking_by_day'] = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT
+            COALESCE(source, 'local') as source,
+            COUNT(*) as restaurant_count,
+            SUM(current_occupancy) as total_customers
+        FROM restaurants
+        GROUP BY source
+    """)
+    stats['source_stats'] = cursor.fetchall()
+    return stats
+
+
+# Stats for the /stats page, served from cache unless older than the TTL or force=True.
+# Returns {} if the database is unavailable and nothing is cached.
+def get_stats(force=False):
+    global _cached
+    cached = _cached
+    if not force and cached is not None and time.monotonic() - cached[1] < STATS_CONFIG['ttl']:
+        return cached[0]
+
+    with _lock:
+        # Another thread may have rebuilt it while we waited
+        cached = _cached
+        if not force and cached is not None and time.monotonic() - cached[1] < STATS_CONFIG['ttl']:
+            return cached[0]
+
+        try:
+            conn = db_pool.get_connection()
+        except mysql.connector.Error as e:
+            print(f"DB Connection Error: {e}")
+            return cached[0] if cached else {}
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            stats = _build_stats(cursor)
+        except mysql.connector.Error as e:
+            print(f"Error building stats: {e}")
+            return cached[0] if cached else {}
+        finally:
+            cursor.close()
+            conn.close()
+
+        _cached = (stats, time.monotonic())
+        return stats
+
+
+def invalidate():
+    global _cached
+    _cached = None
+
+
+# Recompute restaurant_booking_stats from the full reservations history
+def rebuild_summaries():
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM restaurant_booking_stats")
+        cursor.execute("""
+            INSERT INTO restaurant_booking_stats (restaurant_id, day_of_week, booking_count)
+            SELECT restaurant_id, DAYOFWEEK(reservation_time), COUNT(*)
+            FROM reservations
+            WHERE reservation_time IS NOT NULL
+            GROUP BY restaurant_id, DAYOFWEEK(reservation_time)
+        """)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    invalidate()
+
+
+# Recompute the ranking aggregates on restaurants (rating_sum, rating_count, reservations_30d)
+# and the per-restaurant star histogram in restaurant_rating_stats.
+# add_review and the reservation trigger keep them current between runs, but only a
+# rebuild drops reservations that have aged out of the 30-day window, so run this daily.
+def rebuild_restaurant_aggregates():
+    conn = db_pool.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE restaurants r
+            LEFT JOIN (
+                SELECT restaurant_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+                FROM reviews
+                GROUP BY restaurant_id
+            ) rv ON rv.restaurant_id = r.restaurant_id
+            LEFT JOIN (
+                SELECT restaurant_id, COUNT(*) AS reservations_30d
+                FROM reservations
+                WHERE reservation_time >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+                GROUP BY restaurant_id
+            ) rs ON rs.restaurant_id = r.restaurant_id
+            SET r.rating_sum = COALESCE(rv.rating_sum, 0),
+                r.rating_count = COALESCE(rv.rating_count, 0),
+                r.reservations_30d = COALESCE(rs.reservations_30d, 0)
+        """)
+        cursor.execute("DELETE FROM restaurant_rating_stats")
+        cursor.execute("""
+            INSERT INTO restaurant_rating_stats (restaurant_id, rating, review_count)
+            SELECT restaurant_id, rating, COUNT(*)
+            FROM reviews
+            GROUP BY restaurant_id, rating
+        """)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    # Cached review summaries are built from restaurant_rating_stats
+    cache.invalidate('reviews')
+
+
+# Run a full rebuild if the script is executed directly
+if __name__ == "__main__":
+    rebuild_summaries()
+    rebuild_restaurant_aggregates()
+    print("Booking summaries and restaurant aggregates rebuilt")
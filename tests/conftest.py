@@ -0,0 +1,6 @@
+# Tests run without MySQL. Make the top-level modules importable from tests/,
+# as the benchmarks do.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,138 @@
+# booking_queue.ReservationQueue with a temporary SQLite file and a stand-in for the MySQL pool
+
+import mysql.connector
+import pytest
+
+import booking_queue
+import db_pool
+import occupancy
+
+
+class FakeMySQL:
+    """Just enough of a pooled connection for ReservationQueue: INSERT_RESERVATION
+    rows land in `reservations`, keyed by queue_id like the unique key in MySQL.
+    Rows for restaurants in `missing` fail like a foreign key violation."""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.reservations = {}
+        self.pending = {}
+        self.batches = 0
+
+    def get_connection(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def _insert(self, params):
+        user_id, restaurant_id, num_people, reserved_at, queue_id = params
+        if restaurant_id in self.missing:
+            raise mysql.connector.IntegrityError("Cannot add or update a child row")
+        self.pending.setdefault(queue_id, (user_id, restaurant_id, num_people))
+
+    def executemany(self, query, rows):
+        self.batches += 1
+        for params in rows:
+            self._insert(params)
+
+    def execute(self, query, params):
+        self._insert(params)
+
+    def commit(self):
+        self.reservations.update(self.pending)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+    def close(self):
+        pass
+
+
+def mysql_down():
+    raise mysql.connector.InterfaceError("Can't connect to MySQL server")
+
+
+@pytest.fixture
+def engine():
+    engine = occupancy.OccupancyEngine()
+    engine._fetch_rows = lambda: [(1, 10, 0), (2, 10, 0)]
+    engine.reconcile()
+    return engine
+
+
+@pytest.fixture
+def make_queue(tmp_path, engine, monkeypatch):
+    # Flush by hand instead of from the writer thread
+    monkeypatch.setattr(booking_queue.ReservationQueue, 'start', lambda self: None)
+    path = str(tmp_path / 'queue' / 'bookings.sqlite3')
+    return lambda **options: booking_queue.ReservationQueue(path, engine=engine, **options)
+
+
+def test_leftover_rows_are_replayed_after_a_restart(make_queue, engine, monkeypatch):
+    monkeypatch.setattr(db_pool, 'get_connection', mysql_down)
+    queue = make_queue()
+    assert queue.submit(7, 1, 2) is True
+    assert queue.submit(8, 1, 3) is True
+    assert queue.submit(9, 2, 4) is True
+    assert queue.flush() == 0
+    assert queue.stats()['flush_errors'] == 1
+
+    # A new process finds the rows still in the file
+    restarted = make_queue()
+    assert restarted.stats()['replayed'] == 3
+    assert restarted.stats()['depth'] == 3
+    assert restarted.unflushed() == {1: 5, 2: 4}
+    assert engine.unflushed == restarted.unflushed
+
+    mysql_db = FakeMySQL()
+    monkeypatch.setattr(db_pool, 'get_connection', mysql_db.get_connection)
+    assert restarted.drain() == 0
+    assert sorted(mysql_db.reservations.values()) == [(7, 1, 2), (8, 1, 3), (9, 2, 4)]
+    assert restarted.unflushed() == {}
+    assert make_queue().stats()['replayed'] == 0
+
+
+def test_rejected_rows_are_dropped_one_by_one(make_queue, engine, monkeypatch):
+    mysql_db = FakeMySQL(missing={2})
+    monkeypatch.setattr(db_pool, 'get_connection', mysql_db.get_connection)
+    queue = make_queue()
+    queue.submit(7, 1, 2)
+    queue.submit(8, 2, 3)
+    queue.submit(9, 1, 1)
+    assert engine.get(2)['current_occupancy'] == 3
+
+    assert queue.flush() == 3
+    assert sorted(mysql_db.reservations.values()) == [(7, 1, 2), (9, 1, 1)]
+    stats = queue.stats()
+    assert stats['flushed'] == 2
+    assert stats['rejected'] == 1
+    assert stats['depth'] == 0
+    # The rejected booking's seats are handed back
+    assert engine.get(2)['current_occupancy'] == 0
+    assert engine.get(1)['current_occupancy'] == 3
+    assert queue.unflushed() == {}
+
+
+def test_batches_are_written_in_order(make_queue, monkeypatch):
+    mysql_db = FakeMySQL()
+    monkeypatch.setattr(db_pool, 'get_connection', mysql_db.get_connection)
+    queue = make_queue(batch_size=2)
+    for user_id in range(5):
+        queue.submit(user_id, 1, 1)
+
+    assert queue.flush() == 2
+    assert queue.stats()['depth'] == 3
+    assert queue.drain() == 0
+    assert mysql_db.batches == 3
+    assert sorted(row[0] for row in mysql_db.reservations.values()) == list(range(5))
+
+
+def test_full_restaurant_is_not_queued(make_queue):
+    queue = make_queue()
+    assert queue.submit(7, 1, 10) is True
+    assert queue.submit(8, 1, 1) is False
+    assert queue.submit(9, 99, 1) is None
+    assert queue.stats()['depth'] == 1
+    assert queue.unflushed() == {1: 10}
@@ -0,0 +1,98 @@
+# occupancy.ChangeFeed and OccupancyEngine, loaded from canned rows instead of MySQL
+
+import threading
+
+import occupancy
+
+
+def engine_with(rows):
+    engine = occupancy.OccupancyEngine()
+    engine._fetch_rows = lambda: rows
+    assert engine.reconcile()
+    return engine
+
+
+def test_token_round_trip():
+    feed = occupancy.ChangeFeed()
+    assert feed.parse_token(feed.token(42)) == 42
+
+
+def test_token_from_another_feed_or_garbage_does_not_parse():
+    feed = occupancy.ChangeFeed()
+    other = occupancy.ChangeFeed()
+    assert feed.parse_token(other.token(3)) is None
+    for token in [None, '', '3', feed.epoch, feed.epoch + '-', feed.epoch + '-x', feed.epoch + '--1']:
+        assert feed.parse_token(token) is None, token
+
+
+def test_changes_since_keeps_latest_value_per_restaurant():
+    feed = occupancy.ChangeFeed()
+    feed.publish(1, 5, 10)
+    feed.publish(2, 1, 4)
+    feed.publish(1, 6, 10)
+
+    version, changes = feed.changes_since(0)
+    assert version == 3
+    assert sorted(changes, key=lambda c: c['restaurant_id']) == [
+        {'restaurant_id': 1, 'current_occupancy': 6, 'seating_capacity': 10},
+        {'restaurant_id': 2, 'current_occupancy': 1, 'seating_capacity': 4},
+    ]
+    assert feed.changes_since(2) == (3, [{'restaurant_id': 1, 'current_occupancy': 6, 'seating_capacity': 10}])
+    assert feed.changes_since(3) == (3, [])
+
+
+def test_subscriber_that_fell_behind_must_resync():
+    feed = occupancy.ChangeFeed(maxlen=3)
+    for n in range(5):
+        feed.publish(n, n, 10)
+
+    # Versions 1 and 2 have been dropped from the log
+    assert feed.changes_since(1) == (5, None)
+    assert feed.changes_since(2)[1] is not None
+    # A version from the future (e.g. a token from before a restart) also forces a resync
+    assert feed.changes_since(9) == (5, None)
+
+
+def test_wait_returns_on_publish():
+    feed = occupancy.ChangeFeed()
+    timer = threading.Timer(0.05, feed.publish, (1, 2, 10))
+    timer.start()
+    version, changes = feed.wait(0, timeout=5)
+    timer.join()
+    assert version == 1
+    assert changes == [{'restaurant_id': 1, 'current_occupancy': 2, 'seating_capacity': 10}]
+
+
+def test_reserve_only_takes_seats_that_fit():
+    engine = engine_with([(1, 10, 8), (2, 0, 0)])
+    assert engine.reserve(1, 2) is True
+    assert engine.reserve(1, 1) is False
+    assert engine.reserve(2, 1) is False
+    assert engine.reserve(99, 1) is None
+    assert engine.get(1)['current_occupancy'] == 10
+
+
+def test_concurrent_reserve_never_overbooks():
+    engine = engine_with([(1, 50, 0), (2, 7, 3)])
+    taken = {1: [], 2: []}
+    start = threading.Barrier(16)
+
+    def book():
+        start.wait()
+        for _ in range(20):
+            for restaurant_id in (1, 2):
+                if engine.reserve(restaurant_id, 2):
+                    taken[restaurant_id].append(2)
+
+    threads = [threading.Thread(target=book) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(taken[1]) == 50
+    assert sum(taken[2]) == 4
+    assert engine.get(1)['current_occupancy'] == 50
+    assert engine.get(2)['current_occupancy'] == 7
+    # Every successful reserve was published, once
+    assert engine.feed.version == 2 + len(taken[1]) + len(taken[2])
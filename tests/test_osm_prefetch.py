@@ -0,0 +1,156 @@
+# OverpassClient.fetch_many and osm_prefetch against the local fake Overpass server
+
+import sqlite3
+import time
+
+import pytest
+import requests
+
+import fake_overpass
+import osm_api
+import osm_prefetch
+
+CITIES = ['Pune', 'Mumbai', 'Delhi', 'Chennai', 'Kolkata', 'Jaipur', 'Surat', 'Indore']
+
+
+@pytest.fixture
+def overpass():
+    servers = []
+
+    def start(**options):
+        server, url = fake_overpass.start_server(**options)
+        servers.append(server)
+        return server, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def client(url, **options):
+    options.setdefault('rate_limit', 0)
+    options.setdefault('backoff', 0.01)
+    return osm_api.OverpassClient(url, timeout=5, **options)
+
+
+def fetch_all(overpass_client, targets, concurrency=None):
+    return {target: (results, error)
+            for target, results, error in overpass_client.fetch_many(targets, concurrency=concurrency)}
+
+
+def test_fetch_many_runs_at_most_concurrency_requests_at_once(overpass):
+    server, url = overpass(latency=0.2)
+    results = fetch_all(client(url), CITIES, concurrency=3)
+
+    assert server.max_active == 3
+    assert set(results) == set(CITIES)
+    for restaurants, error in results.values():
+        assert error is None
+        assert len(restaurants) == 20
+
+
+def test_fetch_many_defaults_to_client_concurrency(overpass):
+    server, url = overpass(latency=0.2)
+    fetch_all(client(url, concurrency=2), CITIES[:4])
+    assert server.max_active == 2
+
+
+def test_429_is_retried_after_retry_after(overpass):
+    server, url = overpass(fail_first=1, fail_status=429, retry_after='1')
+    overpass_client = client(url, backoff=30)  # a backoff sleep instead of Retry-After would time the test out
+
+    start = time.monotonic()
+    results = fetch_all(overpass_client, ['Pune'])
+    elapsed = time.monotonic() - start
+
+    restaurants, error = results['Pune']
+    assert error is None and len(restaurants) == 20
+    assert 1 <= elapsed < 5
+    assert server.requests == 2
+    assert overpass_client.stats()['retries'] == 1
+
+
+def test_retries_back_off_exponentially_without_retry_after(overpass):
+    server, url = overpass(fail_first=2, fail_status=503, retry_after=None)
+    overpass_client = client(url, backoff=0.2)
+
+    start = time.monotonic()
+    restaurants, error = fetch_all(overpass_client, ['Pune'])['Pune']
+    elapsed = time.monotonic() - start
+
+    # 0.2 s then 0.4 s, each with 0.5-1.5x jitter
+    assert error is None and restaurants
+    assert 0.3 <= elapsed < 2
+    assert server.requests == 3
+
+
+def test_target_that_keeps_failing_is_reported_after_the_last_retry(overpass):
+    server, url = overpass(fail_targets={'Nowhere'}, fail_status=429)
+    results = fetch_all(client(url, retries=2), ['Pune', 'Nowhere'])
+
+    assert results['Pune'][1] is None
+    restaurants, error = results['Nowhere']
+    assert restaurants is None
+    assert isinstance(error, requests.HTTPError)
+    assert error.response.status_code == 429
+    assert server.requests == 1 + 3
+
+
+def test_rate_limit_spaces_out_request_starts(overpass):
+    server, url = overpass()
+    fetch_all(client(url, rate_limit=10), CITIES[:5], concurrency=5)
+
+    # Five starts 0.1 s apart span 0.4 s; arrival times at the server jitter a little
+    starts = server.request_times
+    assert len(starts) == 5
+    assert starts[-1] - starts[0] >= 0.35
+    assert min(later - earlier for earlier, later in zip(starts, starts[1:])) >= 0.05
+
+
+def test_rate_limiter_is_per_host():
+    limiter = osm_api.HostRateLimiter(5)
+    start = time.monotonic()
+    limiter.wait('a.example')
+    limiter.wait('b.example')
+    assert time.monotonic() - start < 0.1
+    limiter.wait('a.example')
+    assert time.monotonic() - start >= 0.19
+
+
+def test_prefetch_reports_failed_targets_and_keeps_going(overpass, monkeypatch, capsys):
+    server, url = overpass(fail_targets={'Nowhere'})
+    monkeypatch.setattr(osm_api, '_client', client(url, retries=1))
+
+    saved, failed = osm_prefetch.prefetch(['Pune', 'Nowhere', (18.4, 73.7, 18.6, 73.9)], save=False)
+
+    assert saved == 40
+    assert failed == ['Nowhere']
+    output = capsys.readouterr().out
+    assert 'Nowhere: failed (' in output
+    assert 'Pune: 20 restaurants' in output
+    # Fetched cities are served from the cache afterwards, without another request
+    requests_before = server.requests
+    assert len(osm_api.search_restaurants('Pune')) == 20
+    assert server.requests == requests_before
+
+
+def test_prefetch_keeps_going_when_the_osm_store_fails(overpass, monkeypatch, capsys):
+    server, url = overpass()
+    monkeypatch.setattr(osm_api, '_client', client(url))
+    remembered = []
+
+    def remember(city, results, started):
+        if city == 'Pune':
+            raise sqlite3.OperationalError("database is locked")
+        remembered.append(city)
+
+    monkeypatch.setattr(osm_api, 'remember', remember)
+    saved, failed = osm_prefetch.prefetch(['Pune', 'Mumbai'], save=False)
+
+    assert saved == 40
+    assert failed == []
+    assert remembered == ['Mumbai']
+    output = capsys.readouterr().out
+    assert 'Pune: could not cache (database is locked)' in output
+    assert 'Pune: 20 restaurants' in output
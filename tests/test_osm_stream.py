@@ -0,0 +1,83 @@
+# osm_api.iter_elements: incremental decoding of Overpass responses across chunk boundaries
+
+import json
+
+import pytest
+
+import fake_overpass
+import osm_api
+
+DOCUMENT = {
+    'version': 0.6,
+    'generator': 'Overpass API 0.7.62',
+    'osm3s': {'timestamp_osm_base': '2026-10-18T10:00:00Z', 'copyright': 'ODbL'},
+    'elements': [
+        {'type': 'node', 'id': 101, 'lat': 18.5204, 'lon': 73.8567,
+         'tags': {'amenity': 'restaurant', 'name': 'Café Goodluck'}},
+        {'type': 'way', 'id': 2, 'center': {'lat': -0.6, 'lon': 1e-3},
+         'tags': {'amenity': 'restaurant', 'name': '東京ラーメン 🍜', 'cuisine': 'ramen'}},
+        {'type': 'relation', 'id': 30000000003, 'center': {'lat': 19, 'lon': 72.8777},
+         'tags': {'amenity': 'restaurant', 'name': 'Ñandú "Grill"', 'outdoor_seating': True}},
+        7,
+        None,
+    ],
+}
+BODY = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode()
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 7, 64, len(BODY)])
+def test_same_elements_whatever_the_chunk_size(size):
+    assert list(osm_api.iter_elements(chunked(BODY, size))) == DOCUMENT['elements']
+
+
+def test_split_inside_a_multibyte_character():
+    # Split the body in two at every byte, including inside multi-byte UTF-8 sequences
+    multibyte = [i for i in range(len(BODY)) if BODY[i] & 0xC0 == 0x80]
+    assert multibyte
+    for cut in range(1, len(BODY)):
+        elements = list(osm_api.iter_elements([BODY[:cut], BODY[cut:]]))
+        assert elements == DOCUMENT['elements'], cut
+
+
+def test_number_split_at_chunk_boundary_is_not_cut_short():
+    body = b'{"elements": [0.6, -12e3, 42]}'
+    for size in range(1, len(body) + 1):
+        assert list(osm_api.iter_elements(chunked(body, size))) == [0.6, -12e3, 42]
+
+
+def test_truncated_body_raises():
+    end = BODY.rindex(b']')  # once the array is closed the rest of the document is not read
+    for cut in range(end):
+        with pytest.raises(ValueError):
+            list(osm_api.iter_elements(chunked(BODY[:cut], 3)))
+
+
+def test_truncated_body_yields_complete_elements_first():
+    second = BODY.index(b'"way"')
+    elements = osm_api.iter_elements([BODY[:second]])
+    assert next(elements) == DOCUMENT['elements'][0]
+    with pytest.raises(ValueError):
+        next(elements)
+
+
+def test_empty_and_missing_elements():
+    assert list(osm_api.iter_elements([b'{"version": 0.6, "elements": []}'])) == []
+    assert list(osm_api.iter_elements([b'{"version": 0.6}'])) == []
+    with pytest.raises(ValueError):
+        list(osm_api.iter_elements([b'[]']))
+
+
+def test_streamed_fetch_matches_json_parse():
+    server, url = fake_overpass.start_server(elements=50, chunk_size=7)
+    try:
+        streamed = osm_api.OverpassClient(url, timeout=5, rate_limit=0, max_results=50).fetch('Pune')
+        buffered = osm_api.OverpassClient(url, timeout=5, rate_limit=0, max_results=50, stream=False).fetch('Pune')
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(streamed) == 50
+    assert streamed == buffered
@@ -0,0 +1,155 @@
+# read_cache.ReadThroughCache: coalesced misses and generation-based invalidation
+
+import threading
+import time
+
+import read_cache
+
+
+class Loader:
+    def __init__(self, value='value', release=None):
+        self.value = value
+        self.release = release
+        self.calls = 0
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        if self.release:
+            assert self.release.wait(5)
+        return self.value
+
+
+def test_hit_after_miss():
+    cache = read_cache.ReadThroughCache()
+    loader = Loader()
+    assert cache.get('menu', 1, (), loader) == 'value'
+    assert cache.get('menu', 1, (), loader) == 'value'
+    assert loader.calls == 1
+    counters = cache.stats()['namespaces']['menu']
+    assert (counters['misses'], counters['hits']) == (1, 1)
+
+
+def test_concurrent_misses_share_one_loader_call():
+    cache = read_cache.ReadThroughCache()
+    loader = Loader(release=threading.Event())
+    results = []
+
+    def get():
+        results.append(cache.get('reviews', 1, ('page', None, 20), loader))
+
+    leader = threading.Thread(target=get)
+    leader.start()
+    assert loader.started.wait(5)
+    followers = [threading.Thread(target=get) for _ in range(8)]
+    for thread in followers:
+        thread.start()
+    # Let the followers queue up on the leader's future before it finishes
+    deadline = time.monotonic() + 5
+    while cache.stats()['namespaces']['reviews']['coalesced'] < 8 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    loader.release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert loader.calls == 1
+    assert results == ['value'] * 9
+
+
+def test_none_is_returned_but_not_cached():
+    cache = read_cache.ReadThroughCache()
+    failing = Loader(value=None)
+    assert cache.get('menu', 1, (), failing) is None
+    assert cache.get('menu', 1, (), Loader()) == 'value'
+    assert failing.calls == 1
+
+
+def test_invalidate_drops_every_entry_of_the_scope_only():
+    cache = read_cache.ReadThroughCache()
+    cache.get('reviews', 1, ('page', None, 20), Loader('old 1'))
+    cache.get('reviews', 1, ('page', 'cursor', 20), Loader('old 1b'))
+    cache.get('reviews', 2, ('page', None, 20), Loader('old 2'))
+    cache.get('menu', 1, (), Loader('menu 1'))
+
+    cache.invalidate('reviews', 1)
+
+    assert cache.get('reviews', 1, ('page', None, 20), Loader('new 1')) == 'new 1'
+    assert cache.get('reviews', 1, ('page', 'cursor', 20), Loader('new 1b')) == 'new 1b'
+    assert cache.get('reviews', 2, ('page', None, 20), Loader('new 2')) == 'old 2'
+    assert cache.get('menu', 1, (), Loader('new menu')) == 'menu 1'
+
+
+def test_invalidate_without_scope_drops_the_whole_namespace():
+    cache = read_cache.ReadThroughCache()
+    for scope in (1, 2, None):
+        cache.get('reviews', scope, ('summary',), Loader('old'))
+    cache.get('menu', 1, (), Loader('menu 1'))
+
+    cache.invalidate('reviews')
+
+    for scope in (1, 2, None):
+        assert cache.get('reviews', scope, ('summary',), Loader('new')) == 'new'
+    assert cache.get('menu', 1, (), Loader('new menu')) == 'menu 1'
+    # Scoped invalidation keeps working afterwards
+    cache.invalidate('reviews', 1)
+    assert cache.get('reviews', 1, ('summary',), Loader('newer')) == 'newer'
+    assert cache.get('reviews', 2, ('summary',), Loader('newer')) == 'new'
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = read_cache.ReadThroughCache(max_entries=2)
+    cache.get('menu', 1, (), Loader('one'))
+    cache.get('menu', 2, (), Loader('two'))
+    cache.get('menu', 1, (), Loader())
+    cache.get('menu', 3, (), Loader('three'))
+
+    assert cache.get('menu', 1, (), Loader('reloaded')) == 'one'
+    assert cache.get('menu', 2, (), Loader('reloaded')) == 'reloaded'
+    assert cache.stats()['namespaces']['menu']['evictions'] == 2
+
+
+def test_shared_store_carries_values_and_invalidations_between_workers(tmp_path):
+    path = str(tmp_path / 'read_cache.sqlite3')
+    worker_a = read_cache.ReadThroughCache(store=read_cache.SharedCacheStore(path), generation_ttl=0)
+    worker_b = read_cache.ReadThroughCache(store=read_cache.SharedCacheStore(path), generation_ttl=0)
+
+    assert worker_a.get('reviews', 1, (), Loader('from a')) == 'from a'
+    loader = Loader('from b')
+    assert worker_b.get('reviews', 1, (), loader) == 'from a'
+    assert loader.calls == 0
+    assert worker_b.stats()['namespaces']['reviews']['shared_hits'] == 1
+
+    worker_a.invalidate('reviews', 1)
+    assert worker_b.get('reviews', 1, (), Loader('fresh')) == 'fresh'
+
+
+class CountingStore(read_cache.SharedCacheStore):
+    generation_reads = 0
+
+    def generation(self, scope):
+        self.generation_reads += 1
+        return super().generation(scope)
+
+
+def test_shared_generations_are_reread_after_generation_ttl(tmp_path):
+    path = str(tmp_path / 'read_cache.sqlite3')
+    store = CountingStore(path)
+    worker_a = read_cache.ReadThroughCache(store=read_cache.SharedCacheStore(path))
+    worker_b = read_cache.ReadThroughCache(store=store, generation_ttl=0.2)
+
+    assert worker_b.get('reviews', 1, (), Loader('old')) == 'old'
+    reads = store.generation_reads
+    for _ in range(10):
+        assert worker_b.get('reviews', 1, (), Loader()) == 'old'
+    assert store.generation_reads == reads
+
+    # Another worker's invalidation shows up once the cached generation expires
+    worker_a.invalidate('reviews', 1)
+    assert worker_b.get('reviews', 1, (), Loader('new')) == 'old'
+    time.sleep(0.25)
+    assert worker_b.get('reviews', 1, (), Loader('new')) == 'new'
+
+    # Our own invalidation is seen right away
+    worker_b.invalidate('reviews', 1)
+    assert worker_b.get('reviews', 1, (), Loader('newer')) == 'newer'
@@ -0,0 +1,120 @@
+# session_store: lazy server-side sessions and token rotation, on a throwaway Flask app
+
+import pytest
+from flask import Flask, session
+
+import session_store
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def interface(request, tmp_path):
+    if request.param == 'memory':
+        store = session_store.MemorySessionStore()
+    else:
+        store = session_store.SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'))
+    return session_store.ServerSessionInterface(store, ttl=3600, sweep_interval=3600)
+
+
+@pytest.fixture
+def client(interface):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = interface
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        session_store.regenerate(session)
+        session['user_id'] = user_id
+        return 'ok'
+
+    @app.route('/whoami')
+    def whoami():
+        return str(session.get('user_id'))
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return 'ok'
+
+    return app.test_client()
+
+
+def session_cookie(client):
+    return next((cookie.value for cookie in client.cookie_jar if cookie.name == 'session'), None)
+
+
+class CountingInterface:
+    def __init__(self):
+        self.loads = 0
+
+    def load(self, token):
+        self.loads += 1
+        return {'user_id': 1}, 123.0
+
+
+def test_session_is_loaded_on_first_access_only():
+    interface = CountingInterface()
+    server_session = session_store.ServerSession(interface, 'token')
+    assert not server_session.loaded and not server_session.accessed
+    assert interface.loads == 0
+
+    assert server_session['user_id'] == 1
+    assert 'user_id' in server_session
+    assert server_session.get('missing') is None
+    assert interface.loads == 1
+    assert server_session.loaded and server_session.accessed
+    assert server_session.expires_at == 123.0
+    assert not server_session.modified
+
+
+def test_request_that_ignores_the_session_does_not_touch_the_store(client, interface):
+    client.get('/login/5')
+    loads = interface.stats()['loads']
+
+    response = client.get('/ping')
+    assert 'Set-Cookie' not in response.headers
+    stats = interface.stats()
+    assert stats['loads'] == loads
+    assert stats['untouched'] == 1
+
+
+def test_login_and_logout(client, interface):
+    assert client.get('/whoami').data == b'None'
+    assert session_cookie(client) is None
+
+    client.get('/login/5')
+    assert session_cookie(client)
+    assert client.get('/whoami').data == b'5'
+
+    client.get('/logout')
+    assert session_cookie(client) is None
+    assert interface.stats()['active'] == 0
+
+
+def test_regenerate_rotates_the_token(client, interface):
+    client.get('/login/5')
+    first = session_cookie(client)
+    client.get('/login/6')
+    second = session_cookie(client)
+
+    assert second and second != first
+    assert interface.store.load(first) is None
+    assert client.get('/whoami').data == b'6'
+    assert interface.stats()['active'] == 1
+
+
+def test_planted_token_is_not_kept_on_login(client, interface):
+    client.set_cookie('localhost', 'session', 'planted-by-attacker')
+    client.get('/login/5')
+    assert session_cookie(client) != 'planted-by-attacker'
+    assert interface.store.load('planted-by-attacker') is None
+
+
+def test_regenerate_is_a_no_op_for_cookie_sessions():
+    cookie_session = {'user_id': 1}
+    session_store.regenerate(cookie_session)
+    assert cookie_session == {'user_id': 1}